@@ -4,6 +4,10 @@ ID = "_id"
 START = 'start'
 END = 'end'
 HASH_FILE = "document_summary_hash.md5"
+HASH_MANIFEST_FILE = "file_hashes.json"
+DOCUMENTS_MANIFEST_FILE = "documents_manifest.json"
+TEXT_INDEX_FILE = "text_index.npz"
+SYNC_MANIFEST_FILE = ".sync_manifest.jsonl"
 
 IMG_EXTENSION = 'jpeg'
 OCR_DATA_EXTENSION = 'json'
@@ -42,6 +46,8 @@ class EnvConfigEnum(enum.Enum):
     SNAPSHOT_PATH = "SNAPSHOT_PATH"  # Images, OCR and snap.json
     HOST = "API_HOST"
     X_AUTH = "X_AUTH_TOKEN"
+    STORAGE_CACHE_DIR = "STORAGE_CACHE_DIR"  # Local cache of remote files
+    STORAGE_CACHE_MAX_BYTES = "STORAGE_CACHE_MAX_BYTES"
 
 
 class IqCollectionEnum(enum.Enum):
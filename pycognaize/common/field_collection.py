@@ -1,18 +1,171 @@
 import logging
 from collections import OrderedDict
+from collections.abc import ItemsView, ValuesView
+from typing import Callable, List, Mapping
 
 from pycognaize.common.lazy_group_dict import LazyGroupDict
+from pycognaize.common.versioned_list import VersionedList
 from pycognaize.document.field import Field
 
 
+class _RawFields:
+    """Raw dictionaries of the fields of a python name,
+    which are not constructed yet"""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw: List[dict]):
+        self.raw = raw
+
+
+class _FieldList(VersionedList):
+    """Fields of a python name. The owners are also notified when the
+    tags of the fields are modified in place"""
+
+    def _register(self, items, owners):
+        for field in items:
+            tags = getattr(field, 'tags', None)
+            if isinstance(tags, VersionedList):
+                for owner in owners:
+                    tags.add_owner(owner)
+
+
 class FieldCollection(OrderedDict):
     """Contains fields included in the document by also providing
     functionality to group fields by group_name and group_key"""
     def __init__(self, *args, **kwargs):
+        self._version = 0
+        self._groups = None
+        self._groups_by_key = None
+        self._field_factory = None
         super().__init__(*args, **kwargs)
+
+    @classmethod
+    def from_raw(cls, raw_fields: Mapping[str, List[dict]],
+                 field_factory: Callable[[dict], Field]
+                 ) -> 'FieldCollection':
+        """Create a collection, which keeps the raw field dictionaries and
+            constructs the fields of a python name on its first access
+
+        :param raw_fields: Raw field dictionaries by python name
+        :param field_factory: Function, which constructs a field
+            from its raw dictionary
+        :return: FieldCollection object
+        """
+        collection = cls()
+        collection._field_factory = field_factory
+        for name, fields in raw_fields.items():
+            OrderedDict.__setitem__(collection, name, _RawFields(fields))
+        return collection
+
+    def is_constructed(self, key) -> bool:
+        """Whether the fields of the given python name are constructed"""
+        return not isinstance(super().__getitem__(key), _RawFields)
+
+    def fields_to_dict(self) -> OrderedDict:
+        """Convert the fields to dictionaries by python name.
+            Raw fields, which are not constructed yet, are passed through"""
+        res = OrderedDict()
+        for name, value in super().items():
+            if isinstance(value, _RawFields):
+                res[name] = list(value.raw)
+            else:
+                res[name] = [field.to_dict() for field in value]
+        return res
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, _RawFields):
+            value = self._own(
+                [self._field_factory(field) for field in value.raw])
+            # Constructing the fields is not a modification of the
+            # collection, so the version is left unchanged
+            super().__setitem__(key, value)
+        return value
+
+    def _own(self, value):
+        """Lists of fields are stored as `_FieldList`s, which notify the
+            collection when they (or the tags of their fields) are
+            modified in place"""
+        if isinstance(value, list):
+            if not isinstance(value, _FieldList):
+                value = _FieldList(value)
+            value.add_owner(self)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def __eq__(self, other):
+        if isinstance(other, OrderedDict):
+            return list(self.items()) == list(other.items())
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        res = self.__eq__(other)
+        return res if res is NotImplemented else not res
+
+    @property
+    def version(self) -> int:
+        """Counter, which is incremented every time the collection,
+        its lists of fields or the tags of the fields are modified.
+        Used for invalidating caches built on top of it"""
+        return self._version
+
+    def _changed(self):
+        """Invalidate cached data after modifying the collection"""
+        self._version += 1
         self._groups = None
         self._groups_by_key = None
 
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._own(value))
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def pop(self, key, *args):
+        if key in self:
+            # Construct the fields, which are returned
+            self[key]
+        value = super().pop(key, *args)
+        self._changed()
+        return value
+
+    def popitem(self, last: bool = True):
+        if self:
+            # Construct the fields, which are returned
+            self[next(reversed(self) if last else iter(self))]
+        item = super().popitem(last=last)
+        self._changed()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        value = super().setdefault(key, self._own(default))
+        self._changed()
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
     @property
     def groups(self) -> dict:
         """Return Groups"""
@@ -0,0 +1,246 @@
+"""Per-file content hashes of a local directory (e.g. a downloaded
+snapshot), which are used to detect corrupted, partial, missing
+or added files
+"""
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pycognaize.common.enums import (
+    DOCUMENTS_MANIFEST_FILE, HASH_FILE, HASH_MANIFEST_FILE,
+    SYNC_MANIFEST_FILE, TEXT_INDEX_FILE)
+
+HASH_ALGORITHM = 'md5'
+HASH_CHUNK_SIZE = 1024 * 1024
+IGNORED_FILES = (HASH_FILE, HASH_MANIFEST_FILE, SYNC_MANIFEST_FILE,
+                 DOCUMENTS_MANIFEST_FILE, TEXT_INDEX_FILE)
+TMP_PREFIX = '.tmp-'
+
+
+@dataclass
+class FileHash:
+    """Content hash of a file, with the size and modification time
+        of the file at the moment it was hashed"""
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+@dataclass
+class VerificationResult:
+    """Result of the verification of a directory against its manifest.
+        Paths are relative to the directory"""
+    modified: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    rehashed: int = 0
+
+    @property
+    def ok(self) -> bool:
+        """True if all files of the manifest are present and unchanged"""
+        return not self.modified and not self.missing
+
+
+def file_hash(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Hash of the content of a file, which is read in chunks"""
+    hasher = hashlib.new(HASH_ALGORITHM)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _iter_files(dirname: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Relative path (with `/` separators) and stat of each file
+        of the directory, except the manifests and temporary files"""
+    for root, _, filenames in os.walk(dirname):
+        for filename in filenames:
+            if filename.startswith(TMP_PREFIX):
+                continue
+            path = os.path.join(root, filename)
+            rel_path = os.path.relpath(path, dirname).replace(os.sep, '/')
+            if rel_path in IGNORED_FILES:
+                continue
+            yield rel_path, os.stat(path)
+
+
+def _is_stat_unchanged(file_hash_: Optional[FileHash],
+                       stat: os.stat_result) -> bool:
+    return (file_hash_ is not None
+            and file_hash_.size == stat.st_size
+            and file_hash_.mtime_ns == stat.st_mtime_ns)
+
+
+def _hash_paths(dirname: str, stats: Dict[str, os.stat_result],
+                max_workers: Optional[int]) -> Dict[str, FileHash]:
+    """Hash the given files concurrently. Hashing releases the GIL,
+        so the threads use multiple cores"""
+    rel_paths = sorted(stats)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = executor.map(
+            file_hash, [os.path.join(dirname, rel_path)
+                        for rel_path in rel_paths])
+        return {rel_path: FileHash(size=stats[rel_path].st_size,
+                                   mtime_ns=stats[rel_path].st_mtime_ns,
+                                   digest=digest)
+                for rel_path, digest in zip(rel_paths, digests)}
+
+
+def hash_files(dirname: str,
+               previous: Optional[Dict[str, FileHash]] = None,
+               max_workers: Optional[int] = None) -> Dict[str, FileHash]:
+    """Compute the content hash of every file of a directory
+
+    :param dirname: Path of the directory
+    :param previous: Optional earlier hashes of the directory. Files with
+        the same size and modification time are not hashed again
+    :param max_workers: Number of files hashed concurrently
+    :return: Mapping of the relative paths to the file hashes
+    """
+    if not os.path.isdir(dirname):
+        raise TypeError(f"{dirname} is not a directory.")
+    previous = previous or {}
+    hashes = {}
+    to_hash = {}
+    for rel_path, stat in _iter_files(dirname):
+        if _is_stat_unchanged(previous.get(rel_path), stat):
+            hashes[rel_path] = previous[rel_path]
+        else:
+            to_hash[rel_path] = stat
+    hashes.update(_hash_paths(dirname, to_hash, max_workers))
+    return dict(sorted(hashes.items()))
+
+
+def summary_hash(hashes: Dict[str, FileHash]) -> str:
+    """Single hash of the paths and contents of all files"""
+    hasher = hashlib.new(HASH_ALGORITHM)
+    for rel_path in sorted(hashes):
+        hasher.update(f"{rel_path}\0{hashes[rel_path].digest}\n".encode())
+    return hasher.hexdigest()
+
+
+def read_hash_manifest(dirname: str) -> Dict[str, FileHash]:
+    """Read the hash manifest of the directory"""
+    with open(os.path.join(dirname, HASH_MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['algorithm'] != HASH_ALGORITHM:
+        raise ValueError(
+            f"Unsupported hash algorithm {manifest['algorithm']}")
+    return {rel_path: FileHash(*values)
+            for rel_path, values in manifest['files'].items()}
+
+
+def write_hash_manifest(dirname: str, hashes: Dict[str, FileHash]) -> None:
+    """Write the hash manifest of the directory, and the summary hash
+        of all files to `HASH_FILE`"""
+    manifest = dict(algorithm=HASH_ALGORITHM,
+                    files={rel_path: [value.size, value.mtime_ns,
+                                      value.digest]
+                           for rel_path, value in hashes.items()})
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=TMP_PREFIX)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(dirname, HASH_MANIFEST_FILE))
+    with open(os.path.join(dirname, HASH_FILE), 'w') as f:
+        f.write(summary_hash(hashes))
+
+
+def build_hash_manifest(dirname: str,
+                        max_workers: Optional[int] = None
+                        ) -> Dict[str, FileHash]:
+    """Hash all files of the directory and write the hash manifest.
+        If a manifest exists, files with unchanged size and modification
+        time are not hashed again"""
+    try:
+        previous = read_hash_manifest(dirname)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        previous = None
+    hashes = hash_files(dirname, previous=previous, max_workers=max_workers)
+    write_hash_manifest(dirname, hashes)
+    return hashes
+
+
+def update_hash_manifest(dirname: str,
+                         rel_paths: Iterable[str],
+                         max_workers: Optional[int] = None
+                         ) -> Dict[str, FileHash]:
+    """Hash only the given (e.g. downloaded) files of the directory and
+        update the hash manifest, keeping the entries of the other files.
+        If the directory has no valid manifest, all files are hashed
+
+    :param dirname: Path of the directory
+    :param rel_paths: Paths of the added or changed files, relative to
+        the directory. The entries of missing files are removed
+    :param max_workers: Number of files hashed concurrently
+    :return: Mapping of the relative paths to the file hashes
+    """
+    try:
+        hashes = read_hash_manifest(dirname)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return build_hash_manifest(dirname, max_workers=max_workers)
+    rel_paths = {rel_path.replace(os.sep, '/') for rel_path in rel_paths}
+    rel_paths.difference_update(IGNORED_FILES)
+    if not rel_paths:
+        return hashes
+    stats = {}
+    for rel_path in rel_paths:
+        try:
+            stats[rel_path] = os.stat(os.path.join(dirname, rel_path))
+        except FileNotFoundError:
+            hashes.pop(rel_path, None)
+    hashes.update(_hash_paths(dirname, stats, max_workers))
+    hashes = dict(sorted(hashes.items()))
+    write_hash_manifest(dirname, hashes)
+    return hashes
+
+
+def verify_hash_manifest(dirname: str,
+                         max_workers: Optional[int] = None,
+                         full: bool = False,
+                         update: bool = True) -> VerificationResult:
+    """Verify the files of a directory against its hash manifest
+
+    :param dirname: Path of the directory
+    :param max_workers: Number of files hashed concurrently
+    :param full: If True, all files are hashed again. Otherwise, only the
+        files whose size or modification time changed are checked
+    :param update: If True, the manifest is updated with the modification
+        times of the files, which were rehashed and found unchanged,
+        so they are not hashed again by the next verification
+    :return: `VerificationResult` with the modified, missing
+        and added files
+    """
+    manifest = read_hash_manifest(dirname)
+    result = VerificationResult()
+    to_hash = {}
+    present = set()
+    for rel_path, stat in _iter_files(dirname):
+        present.add(rel_path)
+        expected = manifest.get(rel_path)
+        if expected is None:
+            result.added.append(rel_path)
+        elif expected.size != stat.st_size:
+            result.modified.append(rel_path)
+        elif full or expected.mtime_ns != stat.st_mtime_ns:
+            to_hash[rel_path] = stat
+    result.missing = sorted(set(manifest) - present)
+
+    rehashed = _hash_paths(dirname, to_hash, max_workers)
+    result.rehashed = len(rehashed)
+    touched = False
+    for rel_path, value in rehashed.items():
+        if value.digest != manifest[rel_path].digest:
+            result.modified.append(rel_path)
+        elif value.mtime_ns != manifest[rel_path].mtime_ns:
+            manifest[rel_path] = value
+            touched = True
+    if update and touched:
+        write_hash_manifest(dirname, manifest)
+
+    result.modified.sort()
+    result.added.sort()
+    return result
@@ -1,26 +1,150 @@
 """Defines LazyDocumentDict, used for lazy loading the documents
 in the snapshot
 """
+import copy
+import hashlib
+import json
 import logging
 import os
+import threading
+from collections import OrderedDict
 from collections.abc import Mapping
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from bson import json_util
 
-from pycognaize.common.enums import StorageEnum
+from pycognaize.common.enums import DOCUMENTS_MANIFEST_FILE, StorageEnum
 from pycognaize.common.utils import join_path
 from pycognaize.document import Document
 from pycognaize.file_storage import get_storage
 from pycognaize.login import Login
 
 
+def document_shard(doc_id: str, count: int) -> int:
+    """Index of the shard (out of `count`) of the document. The assignment
+        is stable across processes and machines"""
+    if count <= 0:
+        raise ValueError(f"`count` should be positive, got {count}")
+    digest = hashlib.md5(doc_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+class DocumentCache:
+    """Least recently used cache of documents, bounded by the number of
+        entries and/or the total size of the documents' JSON (which is
+        used as an estimate of the memory of a document)"""
+
+    def __init__(self, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        """
+
+        :param max_entries: Maximum number of cached documents
+        :param max_bytes: Maximum total size of the JSON of the
+            cached documents
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError(
+                "Either `max_entries` or `max_bytes` should be provided")
+        for name, value in (('max_entries', max_entries),
+                            ('max_bytes', max_bytes)):
+            if value is not None and value <= 0:
+                raise ValueError(f"`{name}` should be positive, got {value}")
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[Document, int]]' = \
+            OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__}: {len(self)} documents, "
+                f"{self.hits} hits, {self.misses} misses>")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._entries
+
+    def __getstate__(self):
+        # Copies (e.g. in other processes) start empty
+        return dict(max_entries=self._max_entries, max_bytes=self._max_bytes)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the JSON of the cached documents"""
+        return self._nbytes
+
+    def get(self, doc_id: str) -> Optional[Document]:
+        """Return the cached document, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(doc_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, doc_id: str, document: Document, nbytes: int) -> None:
+        """Cache the document, evicting the least recently used ones
+            if the budget is exceeded"""
+        if self._max_bytes is not None and nbytes > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(doc_id, None)
+            if previous is not None:
+                self._nbytes -= previous[1]
+            self._entries[doc_id] = (document, nbytes)
+            self._nbytes += nbytes
+            while self._is_over_budget():
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_nbytes
+
+    def _is_over_budget(self) -> bool:
+        return ((self._max_entries is not None
+                 and len(self._entries) > self._max_entries)
+                or (self._max_bytes is not None
+                    and self._nbytes > self._max_bytes))
+
+    def clear(self) -> None:
+        """Remove all documents"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+
 class LazyDocumentDict(Mapping):
     """Contains documents included in the snapshot"""
     document_filename = StorageEnum.doc_file.value
 
     def __init__(self, doc_path: str,
-                 data_path: str):
+                 data_path: str,
+                 lazy_fields: bool = False,
+                 cache_entries: Optional[int] = None,
+                 cache_bytes: Optional[int] = None):
+        """
+
+        :param doc_path: Path of the documents' JSON files
+        :param data_path: Path of the documents' OCR and page images
+        :param lazy_fields: If True, the fields of the documents are
+            constructed on their first access (see `Document.from_dict`)
+        :param cache_entries: If provided, at most this number of the last
+            used documents are kept in memory (see `DocumentCache`), and
+            returned again instead of being read and parsed
+        :param cache_bytes: If provided, the last used documents are kept
+            in memory, up to this total size of the documents' JSON
+        """
+        self._lazy_fields = lazy_fields
+        self._cache = None
+        if cache_entries is not None or cache_bytes is not None:
+            self._cache = DocumentCache(max_entries=cache_entries,
+                                        max_bytes=cache_bytes)
         login_instance = Login()
 
         if login_instance.logged_in:
@@ -37,14 +161,76 @@ class LazyDocumentDict(Mapping):
         self._data_path = data_path
         storage = get_storage(self._doc_path, config=self._storage_config)
 
-        ids = []
-
-        for directory in storage.list_dir(doc_path, include_files=False):
-            if storage.is_file(directory / self.document_filename):
-                ids.append(directory.name)
+        self._manifest = self._read_manifest(storage)
+        if self._manifest is not None:
+            ids = list(self._manifest)
+        else:
+            ids = []
+            for directory in storage.list_dir(doc_path, include_files=False):
+                if storage.is_file(directory / self.document_filename):
+                    ids.append(directory.name)
 
         self._ids = sorted(ids)
 
+    def _read_manifest(self, storage) -> Optional[Dict[str, dict]]:
+        """Read the documents manifest of the snapshot in a single request,
+            None if the snapshot has no (valid) manifest"""
+        path = join_path(storage.is_s3_path(self.doc_path), self.doc_path,
+                         DOCUMENTS_MANIFEST_FILE)
+        try:
+            return json.loads(storage.read(path))['documents']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f'Ignoring invalid manifest {path}: {e}')
+            return None
+
+    def subset(self, ids: Iterable[str]) -> 'LazyDocumentDict':
+        """View of the given documents, which shares the paths and the
+            cache of this dict. Raises KeyError for unknown ids"""
+        ids = set(ids)
+        unknown = ids.difference(self._ids)
+        if unknown:
+            raise KeyError(f"Documents not in the snapshot: {sorted(unknown)}")
+        view = copy.copy(self)
+        view._ids = [doc_id for doc_id in self._ids if doc_id in ids]
+        if self._manifest is not None:
+            view._manifest = {doc_id: self._manifest[doc_id]
+                              for doc_id in view._ids}
+        return view
+
+    def shard(self, index: int, count: int) -> 'LazyDocumentDict':
+        """View of the documents assigned to the shard with the given index
+            out of `count` shards (see `document_shard`)"""
+        if not 0 <= index < count:
+            raise ValueError(
+                f"`index` should be in [0, {count}), got {index}")
+        return self.subset(doc_id for doc_id in self._ids
+                           if document_shard(doc_id, count) == index)
+
+    @property
+    def cache(self) -> Optional[DocumentCache]:
+        """Cache of the last used documents (with the hit and miss
+            counters), None if caching is disabled"""
+        return self._cache
+
+    @property
+    def manifest(self) -> Optional[Dict[str, dict]]:
+        """Size (in bytes) and number of pages of each document,
+            None if the snapshot has no manifest"""
+        return self._manifest
+
+    @property
+    def lazy_fields(self) -> bool:
+        """If True, the fields of the documents are constructed
+            on their first access"""
+        return self._lazy_fields
+
+    @property
+    def storage_config(self) -> Optional[dict]:
+        """Config of the storage of the documents"""
+        return self._storage_config
+
     @property
     def doc_path(self) -> str:
         """Path of the document's JSON"""
@@ -58,29 +244,166 @@ class LazyDocumentDict(Mapping):
     def __getitem__(self, doc_id) -> Optional[Document]:
         """The Document object, retrieved from provided path
 
-        Note: Path can be both local and remote
+        Note: Path can be both local and remote.
+            With a cache, the same object is returned for the
+            cached documents
         """
+        if self._cache is not None:
+            document = self._cache.get(doc_id)
+            if document is not None:
+                return document
 
-        storage = get_storage(self.doc_path, config=self._storage_config)
-        path = join_path(
-            storage.is_s3_path(self.doc_path),
-            self.doc_path,
-            doc_id,
-            f"{self.document_filename}"
-        )
-        try:
-            with storage.open(path, 'r', encoding='utf8') as f:
-                doc_dict = json_util.loads(f.read())
-            return Document.from_dict(raw=doc_dict,
-                                      data_path=os.path.join(self.data_path,
-                                                             doc_id))
-        except FileNotFoundError:
-            logging.error(f'Document at path {path} is not found.')
-        except Exception as e:
-            logging.error(f'Failed reading document {doc_id}: {e}')
+        document, nbytes = read_document(
+            doc_id, doc_path=self.doc_path, data_path=self.data_path,
+            lazy_fields=self._lazy_fields,
+            storage_config=self._storage_config)
+        if document is not None and self._cache is not None:
+            self._cache.put(doc_id, document, nbytes)
+        return document
 
     def __iter__(self):
         return iter(self._ids)
 
     def __len__(self):
         return len(self._ids)
+
+
+def read_document(doc_id: str,
+                  doc_path: str,
+                  data_path: str,
+                  lazy_fields: bool = False,
+                  storage_config: Optional[dict] = None
+                  ) -> Tuple[Optional[Document], int]:
+    """Read and parse a document of a snapshot. Only takes the location
+        of the document, so it is also cheap to call in other processes
+        (see `Snapshot.iter_documents`)
+
+    :param doc_id: Id of the document
+    :param doc_path: Path of the documents' JSON files
+    :param data_path: Path of the documents' OCR and page images
+    :param lazy_fields: If True, the fields of the document are
+        constructed on their first access
+    :param storage_config: Config of the storage of the paths
+    :return: The document (None if it failed to load) and the size
+        of its JSON
+    """
+    storage = get_storage(doc_path, config=storage_config)
+    path = join_path(
+        storage.is_s3_path(doc_path),
+        doc_path,
+        doc_id,
+        f"{LazyDocumentDict.document_filename}"
+    )
+    try:
+        with storage.open(path, 'r', encoding='utf8') as f:
+            doc_json = f.read()
+        document = Document.from_dict(
+            raw=json_util.loads(doc_json),
+            data_path=os.path.join(data_path, doc_id),
+            lazy_fields=lazy_fields)
+        return document, len(doc_json)
+    except FileNotFoundError:
+        logging.error(f'Document at path {path} is not found.')
+    except Exception as e:
+        logging.error(f'Failed reading document {doc_id}: {e}')
+    return None, 0
+
+
+def build_documents_manifest(doc_path: str,
+                             storage_config: Optional[dict] = None,
+                             max_workers: Optional[int] = None
+                             ) -> Dict[str, dict]:
+    """Write the manifest of the documents of a snapshot, which allows
+        `LazyDocumentDict` to find the documents with a single read
+
+    :param doc_path: Path of the documents' JSON files
+    :param storage_config: Config of the storage of the path
+    :param max_workers: Number of documents read at once
+    :return: Mapping of the document ids to the size (in bytes) of
+        the document JSON and the number of pages (None if the
+        document cannot be parsed)
+    """
+    storage = get_storage(doc_path, config=storage_config)
+    directories = sorted(
+        directory.name
+        for directory in storage.list_dir(doc_path, include_files=False))
+    documents = {
+        doc_id: info for doc_id, info in _read_documents_info(
+            storage, doc_path, directories, max_workers).items()
+        if info is not None}
+    _write_documents_manifest(storage, doc_path, documents)
+    return documents
+
+
+def update_documents_manifest(doc_path: str,
+                              doc_ids: Iterable[str],
+                              storage_config: Optional[dict] = None,
+                              max_workers: Optional[int] = None
+                              ) -> Dict[str, dict]:
+    """Update the manifest of the documents of a snapshot only for the
+        given (e.g. downloaded) documents, keeping the other entries.
+        If the snapshot has no valid manifest, it is built
+        for all documents
+
+    :param doc_path: Path of the documents' JSON files
+    :param doc_ids: Ids of the added, changed or removed documents
+    :param storage_config: Config of the storage of the path
+    :param max_workers: Number of documents read at once
+    :return: Mapping of the document ids to the size (in bytes) of
+        the document JSON and the number of pages
+    """
+    storage = get_storage(doc_path, config=storage_config)
+    path = join_path(storage.is_s3_path(doc_path), doc_path,
+                     DOCUMENTS_MANIFEST_FILE)
+    try:
+        documents = json.loads(storage.read(path))['documents']
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return build_documents_manifest(doc_path,
+                                        storage_config=storage_config,
+                                        max_workers=max_workers)
+    doc_ids = sorted(set(doc_ids))
+    if not doc_ids:
+        return documents
+    for doc_id, info in _read_documents_info(
+            storage, doc_path, doc_ids, max_workers).items():
+        if info is None:
+            documents.pop(doc_id, None)
+        else:
+            documents[doc_id] = info
+    documents = dict(sorted(documents.items()))
+    _write_documents_manifest(storage, doc_path, documents)
+    return documents
+
+
+def _read_documents_info(storage, doc_path: str, doc_ids: List[str],
+                         max_workers: Optional[int]
+                         ) -> Dict[str, Optional[dict]]:
+    """Size and number of pages of each document, None for
+        the documents without a JSON file"""
+    is_s3_path = storage.is_s3_path(doc_path)
+    paths = [join_path(is_s3_path, doc_path, doc_id,
+                       StorageEnum.doc_file.value)
+             for doc_id in doc_ids]
+    documents = {}
+    for doc_id, result in zip(
+            doc_ids, storage.iter_read(paths, max_workers=max_workers)):
+        if isinstance(result.error, FileNotFoundError):
+            documents[doc_id] = None
+            continue
+        if not result.ok:
+            raise result.error
+        try:
+            pages = len(json_util.loads(result.data)['pages'])
+        except Exception as e:
+            logging.warning(f'Failed reading document {doc_id}: {e}')
+            pages = None
+        documents[doc_id] = dict(size=len(result.data), pages=pages)
+    return documents
+
+
+def _write_documents_manifest(storage, doc_path: str,
+                              documents: Dict[str, dict]) -> None:
+    path = join_path(storage.is_s3_path(doc_path), doc_path,
+                     DOCUMENTS_MANIFEST_FILE)
+    with storage.open(path, 'w') as f:
+        json.dump(dict(documents=documents), f)
@@ -0,0 +1,110 @@
+"""Defines TagSpatialIndex, used for fast lookups of tags
+that are located in the same physical area of a page
+"""
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pycognaize.document.tag.tag import BoxTag
+
+
+class _PageGrid:
+    """Uniform grid over the tags of a single page"""
+
+    def __init__(self, item_ids: np.ndarray, coords: np.ndarray,
+                 cells: Dict[Tuple[int, int], np.ndarray]):
+        self.item_ids = item_ids
+        self.coords = coords
+        self.cells = cells
+
+
+class TagSpatialIndex:
+    """Per-page uniform grid over the percentage coordinates of `BoxTag`s.
+
+    Each indexed tag is stored together with an arbitrary hashable key,
+    which is returned by `query` for every indexed tag that intersects
+    the query tag.
+    """
+
+    def __init__(self, items: Iterable[Tuple[Hashable, 'BoxTag']],
+                 grid_size: int = 20):
+        """
+
+        :param items: Pairs of (key, tag) to index
+        :param grid_size: Number of grid cells along each axis of a page
+        """
+        if grid_size <= 0:
+            raise ValueError(
+                f"`grid_size` should be a positive integer, got {grid_size}")
+        self._grid_size = grid_size
+        self._cell_size = 100 / grid_size
+        self._items: List[Tuple[Hashable, 'BoxTag']] = []
+        page_item_ids = defaultdict(list)
+        for key, tag in items:
+            page_item_ids[tag.page.page_number].append(len(self._items))
+            self._items.append((key, tag))
+        self._pages: Dict[int, _PageGrid] = {
+            page_n: self._build_page_grid(item_ids)
+            for page_n, item_ids in page_item_ids.items()}
+
+    def __len__(self):
+        return len(self._items)
+
+    def _cell_range(self, low: np.ndarray,
+                    high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the first and last grid cell indices covered
+            by the given coordinate intervals"""
+        first = np.clip(np.floor_divide(low, self._cell_size).astype(int),
+                        0, self._grid_size - 1)
+        last = np.clip(np.floor_divide(high, self._cell_size).astype(int),
+                       0, self._grid_size - 1)
+        return first, last
+
+    def _build_page_grid(self, item_ids: List[int]) -> _PageGrid:
+        coords = np.array(
+            [(tag.left, tag.right, tag.top, tag.bottom)
+             for _, tag in (self._items[i] for i in item_ids)],
+            dtype=float).reshape(-1, 4)
+        first_cols, last_cols = self._cell_range(coords[:, 0], coords[:, 1])
+        first_rows, last_rows = self._cell_range(coords[:, 2], coords[:, 3])
+        cells = defaultdict(list)
+        for pos, (col_0, col_1, row_0, row_1) in enumerate(
+                zip(first_cols, last_cols, first_rows, last_rows)):
+            for row in range(row_0, row_1 + 1):
+                for col in range(col_0, col_1 + 1):
+                    cells[(row, col)].append(pos)
+        return _PageGrid(
+            item_ids=np.asarray(item_ids, dtype=int),
+            coords=coords,
+            cells={cell: np.asarray(positions, dtype=int)
+                   for cell, positions in cells.items()})
+
+    def query(self, tag: 'BoxTag') -> List[Tuple[Hashable, 'BoxTag']]:
+        """Return all indexed (key, tag) pairs, whose tags intersect
+            the given tag, in the order they were indexed
+
+        :param tag: The `BoxTag` to search intersections for
+        :return: List of (key, tag) pairs
+        """
+        grid = self._pages.get(tag.page.page_number)
+        if grid is None:
+            return []
+        first_cols, last_cols = self._cell_range(
+            np.array([tag.left]), np.array([tag.right]))
+        first_rows, last_rows = self._cell_range(
+            np.array([tag.top]), np.array([tag.bottom]))
+        positions = [
+            grid.cells[(row, col)]
+            for row in range(first_rows[0], last_rows[0] + 1)
+            for col in range(first_cols[0], last_cols[0] + 1)
+            if (row, col) in grid.cells]
+        if not positions:
+            return []
+        positions = np.unique(np.concatenate(positions))
+        coords = grid.coords[positions]
+        mask = ((coords[:, 0] < tag.right) & (coords[:, 1] > tag.left)
+                & (coords[:, 2] < tag.bottom) & (coords[:, 3] > tag.top))
+        return [self._items[i] for i in grid.item_ids[positions[mask]]]
@@ -6,7 +6,7 @@ import pathlib
 import re
 from dataclasses import dataclass
 from itertools import groupby
-from typing import Union, List, Optional, Iterable, Dict
+from typing import Union, List, Optional, Iterable, Dict, Tuple, Sequence
 
 import bson
 import numpy as np
@@ -110,6 +110,18 @@ def image_string_to_array(img_str: bytes):
     return img_np
 
 
+def image_size_from_bytes(img_head: bytes) -> Tuple[int, int]:
+    """Read the width and height of an image from its header,
+        without decoding the image
+
+    :param img_head: Bytes of the image, it is enough to include
+        the header of the image
+    :return: width and height of the image
+    """
+    with Image.open(io.BytesIO(img_head)) as image:
+        return image.size
+
+
 def compute_otsu_threshold(img_array):
     bins_num = 256
     hist, bin_edges = np.histogram(img_array, bins=bins_num)
@@ -338,6 +350,103 @@ def infer_rows_from_words(box, class_ocr_data, auto_thresh=True, thresh=12,
     return aggregated_rows, word_groups
 
 
+# Characters stripped from the words by `infer_rows_from_words`
+ROW_WORD_STRIP_CHARS = ' \t\n.,:;*_|\\/!\'"'
+HEIGHT_WORD_STRIP_CHARS = ' \t\n.,:;*_-~=|\\/!\'"'
+
+
+def group_words_into_lines(coords: np.ndarray, texts: Sequence[str],
+                           thresh: float = 4.0) -> List[np.ndarray]:
+    """Group the words of a page into lines, sorting the words once.
+
+    Equivalent to `clean_ocr_data`, followed by `infer_rows_from_words`
+        (with `auto_thresh`), where the rows with the same (rounded) middle
+        are merged, the rows are sorted by their middle
+        and the words of each row by `left` and `right`.
+
+    :param coords: Array of shape (n, 4) with the `left`, `right`, `top`
+        and `bottom` coordinates of the words
+    :param texts: Text of each word
+    :param thresh: Maximum ratio of the height to the width of a word
+        (see `clean_ocr_data`)
+    :return: List with an array of the word indices of each line
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 4)
+    left, right, top, bottom = coords.T
+    valid = np.fromiter(
+        (bool(text.strip()) and bool(text.strip(ROW_WORD_STRIP_CHARS))
+         for text in texts), dtype=bool, count=len(texts))
+    valid &= (bottom - top) / np.maximum(right - left, 0.01) <= thresh
+    # Stable sort by top and left, like `infer_rows_from_words`
+    order = np.lexsort((left, top))
+    order = order[valid[order]]
+    if not len(order):
+        return []
+    starts, ends, middle = _row_groups(coords[order], texts, order)
+    return _merge_row_groups(coords[order], order, starts, ends, middle)
+
+
+def _row_groups(coords: np.ndarray, texts: Sequence[str], order: np.ndarray
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Start, end and middle (rounded) of each group of aligned rows
+        in the sorted words"""
+    left, right, top, bottom = coords.T
+    height_words = [n for n, idx in enumerate(order.tolist())
+                    if texts[idx].strip(HEIGHT_WORD_STRIP_CHARS)
+                    and top[n] and bottom[n]]
+    heights = (bottom[height_words] - top[height_words]).tolist()
+    average_height = sum(heights) / len(heights) if heights else 0
+    max_delta = int(round(average_height * 0.8))
+
+    # Rows are the runs of words with the same top
+    run_starts = np.flatnonzero(np.r_[True, top[1:] != top[:-1]])
+    run_top = top[run_starts]
+    run_bottom = np.maximum.reduceat(bottom, run_starts)
+    prev_top, prev_bottom = run_top[:-1], run_bottom[:-1]
+    next_top, next_bottom = run_top[1:], run_bottom[1:]
+    aligned = (
+        ((np.abs(next_top - prev_top) < max_delta)
+         & (np.abs(next_bottom - prev_bottom) < max_delta))
+        | ((next_top >= prev_top) & (next_bottom <= prev_bottom))
+        | ((next_top <= prev_top) & (next_bottom >= prev_bottom)))
+    starts = run_starts[np.r_[True, ~aligned]]
+    ends = np.r_[starts[1:], len(order)]
+
+    group_top = np.minimum.reduceat(top, starts)
+    group_bottom = np.maximum.reduceat(bottom, starts)
+    width = (np.maximum.reduceat(right, starts)
+             - np.minimum.reduceat(left, starts))
+    # Remove the groups smaller than the minimal size
+    min_size = int(round(average_height * 0.7))
+    keep = (group_bottom - group_top > min_size) & (width > min_size)
+    middle = np.rint(np.abs(group_top + group_bottom) / 2)
+    return starts[keep], ends[keep], middle[keep]
+
+
+def _merge_row_groups(coords: np.ndarray, order: np.ndarray,
+                      starts: np.ndarray, ends: np.ndarray,
+                      middle: np.ndarray) -> List[np.ndarray]:
+    """Sort the row groups by their middle, merge the groups with the same
+        middle and sort the words of each line by left and right"""
+    if not len(starts):
+        return []
+    left, right = coords[:, 0], coords[:, 1]
+    group_order = np.argsort(middle, kind='stable')
+    sorted_middle = middle[group_order]
+    line_of_group = np.cumsum(
+        np.r_[True, sorted_middle[1:] != sorted_middle[:-1]]) - 1
+
+    positions = np.concatenate([np.arange(starts[g], ends[g])
+                                for g in group_order.tolist()])
+    line_ids = np.repeat(line_of_group, (ends - starts)[group_order])
+    # The sort is stable, so words with the same left and right
+    # keep their order
+    sort_order = np.lexsort((right[positions], left[positions], line_ids))
+    positions = positions[sort_order]
+    line_ids = line_ids[sort_order]
+    return np.split(order[positions], np.flatnonzero(np.diff(line_ids)) + 1)
+
+
 def clean_ocr_data(ocr_data: dict, thresh: float = 4.0) -> dict:
     """Cleans the ocr data
 
@@ -616,8 +725,11 @@ def convert_tag_coords_to_percentages(tag, w, h) -> dict:
                 bottom=tag.bottom * h / 100)
 
 
+@soon_be_deprecated()
 def directory_summary_hash(dirname: str):
-    """ Computes hash of directory summary"""
+    """ Computes hash of directory summary.
+    Only the directory names are hashed, use
+    `pycognaize.common.file_hashes` for the hashes of the file contents"""
     hash_func = hashlib.md5
 
     if not os.path.isdir(dirname):
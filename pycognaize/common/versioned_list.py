@@ -0,0 +1,111 @@
+"""Defines VersionedList, a list which notifies its owners (e.g. a
+FieldCollection) when it is modified in place
+"""
+import weakref
+from typing import Iterable
+
+
+class VersionedList(list):
+    """List with a counter, which is incremented every time the list is
+        modified in place. The owners registered with `add_owner` are
+        notified through their `_changed` method, so caches built on top
+        of the list (e.g. the tag index of a document) are invalidated
+        without walking the items.
+
+    The owners are weak references and are not pickled or copied.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._version = 0
+        # Weak references of the owners by id, as the owners
+        # (e.g. dicts) may not be hashable
+        self._owners = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def add_owner(self, owner) -> None:
+        """Notify `owner._changed()` after every modification"""
+        self._owners[id(owner)] = weakref.ref(owner)
+        self._register(self, owners=(owner,))
+
+    def _register(self, items: Iterable, owners: Iterable) -> None:
+        """Register the owners with the new items. Does nothing here,
+            lists of lists override it"""
+
+    def _changed(self, items: Iterable = ()) -> None:
+        self._version += 1
+        owners = []
+        for key, ref in list(self._owners.items()):
+            owner = ref()
+            if owner is None:
+                del self._owners[key]
+            else:
+                owners.append(owner)
+        if items:
+            self._register(items, owners=owners)
+        for owner in owners:
+            owner._changed()
+
+    def __reduce_ex__(self, protocol):
+        return self.__class__, (list(self),)
+
+    def __copy__(self):
+        return self.__class__(self)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = list(value)
+        super().__setitem__(key, value)
+        self._changed(value if isinstance(key, slice) else (value,))
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, other):
+        other = list(other)
+        super().__iadd__(other)
+        self._changed(other)
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def append(self, item):
+        super().append(item)
+        self._changed((item,))
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        self._changed(items)
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed((item,))
+
+    def pop(self, *args):
+        item = super().pop(*args)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
@@ -1,17 +1,20 @@
 """This module defines the Document object,
 which includes the input and output fields for the model,
 as well as the OCR data and page images of the document"""
-import copy
+import functools
 import itertools
 import json
 import logging
 import multiprocessing
 import os
 import platform
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Dict, List, Tuple, Any, Optional, Callable, Union, Literal
 
 import fitz
+import numpy as np
 import pandas as pd
 import requests
 from fitz.utils import getColor, getColorList
@@ -22,6 +25,7 @@ from pycognaize.common.classification_labels import ClassificationLabels
 from pycognaize.common.enums import ApiConfigEnum, EnvConfigEnum
 from pycognaize.common.enums import IqDocumentKeysEnum, FieldTypeEnum
 from pycognaize.common.field_collection import FieldCollection
+from pycognaize.common.spatial_index import TagSpatialIndex
 from pycognaize.document.field import FieldMapping, TableField
 from pycognaize.document.field.field import Field
 from pycognaize.document.html_info import HTML
@@ -35,6 +39,22 @@ from pycognaize.login import Login
 RETRY_ADAPTER = Retry(total=3,
                       backoff_factor=10,
                       status_forcelist=[500, 502, 503, 504])
+IMAGE_EXECUTOR_WORKERS = 16
+
+_image_executor: Optional[ThreadPoolExecutor] = None
+_image_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all documents for loading page images,
+        which is created on the first use"""
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            _image_executor = ThreadPoolExecutor(
+                max_workers=IMAGE_EXECUTOR_WORKERS,
+                thread_name_prefix='pycognaize-images')
+        return _image_executor
 
 
 class Document:
@@ -58,6 +78,8 @@ class Document:
         self._x: FieldCollection[str, List[Field]] = input_fields
         self._y: FieldCollection[str, List[Field]] = output_fields
         self._data_path = data_path
+        self._tag_index: Optional[TagSpatialIndex] = None
+        self._tag_index_state: Optional[tuple] = None
 
     @property
     def x(self) -> 'FieldCollection[str, List[Field]]':
@@ -226,19 +248,20 @@ class Document:
         for ttag in table_tags:
             if ttag.page.page_number != tag.page.page_number:
                 continue
-            for cell in ttag.cells.values():
-                temp_cell = copy.deepcopy(cell)
-                temp_cell.page = ttag.page
-                iou = tag.iou(temp_cell)
-                if iou <= 0:
-                    continue
-                if one_to_one:
-                    if (not intersection or (
-                            intersection and intersection[0][-1] < iou
-                    )):
-                        intersection = [(tag, ttag, cell, iou)]
-                else:
-                    intersection.append((tag, ttag, cell, iou))
+            ious = ttag.cells_iou(tag)
+            if not ious.size:
+                continue
+            cells = list(ttag.cells.values())
+            if one_to_one:
+                best_idx = int(np.argmax(ious))
+                iou = float(ious[best_idx])
+                if iou > 0 and (not intersection
+                                or intersection[0][-1] < iou):
+                    intersection = [(tag, ttag, cells[best_idx], iou)]
+            else:
+                intersection.extend(
+                    (tag, ttag, cells[idx], float(ious[idx]))
+                    for idx in np.flatnonzero(ious > 0))
         return intersection
 
     def get_table_cell_overlap(
@@ -279,6 +302,89 @@ class Document:
                 res.extend(intersection)
         return res
 
+    def _get_tag_index(self) -> TagSpatialIndex:
+        """Return the spatial index over the extraction tags of all
+            non-table fields. The index is built on first use and rebuilt
+            after `x` or `y`, their lists of fields or the tags of the
+            fields are modified (see `FieldCollection.version`)"""
+        state = (id(self.x), self.x.version, id(self.y), self.y.version)
+        if self._tag_index is None or self._tag_index_state != state:
+            self._tag_index = TagSpatialIndex(
+                ((scope_idx, pname, field_idx), field_tag)
+                for scope_idx, scope in enumerate((self.x, self.y))
+                for pname, fields in scope.items()
+                for field_idx, field in enumerate(fields)
+                if not isinstance(field, TableField)
+                for field_tag in field.tags
+                if isinstance(field_tag, ExtractionTag))
+            self._tag_index_state = state
+        return self._tag_index
+
+    def invalidate_tag_index(self) -> None:
+        """Drop the spatial index used for finding tied fields and tags.
+            Modifications of the fields and tags are detected, so it is
+            only needed after changing private state (e.g. the coordinates
+            of a tag)"""
+        self._tag_index = None
+        self._tag_index_state = None
+
+    @staticmethod
+    def _get_scope_ids(field_type: str) -> Tuple[int, ...]:
+        """Return the indices of the field scopes (0 for `x`, 1 for `y`)
+            corresponding to the given field type"""
+        if field_type == FieldTypeEnum.INPUT_FIELD.value:
+            return 0,
+        elif field_type == FieldTypeEnum.OUTPUT_FIELD.value:
+            return 1,
+        elif field_type == FieldTypeEnum.BOTH.value:
+            return 0, 1
+        raise ValueError(
+            f"'field_type' should be one of "
+            f"{tuple(i.value for i in FieldTypeEnum.__members__.values())}"
+            f" got {field_type}")
+
+    def _get_tie_candidates(
+            self, tag: BoxTag,
+            field_type: str,
+            pn_filter: Callable,
+            use_index: bool
+    ) -> List[Tuple[str, List[Tuple[Field, ExtractionTag]]]]:
+        """Return the fields and tags that should be checked for being tied
+            to the given tag, grouped by python name
+
+        :param tag: Input tag
+        :param field_type: Types of fields to consider {input/output/both}
+        :param pn_filter: Only fields with names passing the filter
+            will be considered
+        :param use_index: If true, only the tags intersecting the input tag
+            will be returned, otherwise all extraction tags are returned
+        :return: List of tuples, which include the python name and the list
+            of (`Field`, `ExtractionTag`) pairs in document order
+        """
+        scope_ids = self._get_scope_ids(field_type)
+        scopes = (self.x, self.y)
+        indexed_candidates = defaultdict(list)
+        if use_index:
+            for (scope_idx, pname, field_idx), field_tag in (
+                    self._get_tag_index().query(tag)):
+                indexed_candidates[(scope_idx, pname)].append(
+                    (scopes[scope_idx][pname][field_idx], field_tag))
+        res = []
+        for scope_idx in scope_ids:
+            for pname, fields in scopes[scope_idx].items():
+                if not pn_filter(pname):
+                    continue
+                if use_index:
+                    candidates = indexed_candidates.get((scope_idx, pname))
+                else:
+                    candidates = [(field, field_tag) for field in fields
+                                  if not isinstance(field, TableField)
+                                  for field_tag in field.tags
+                                  if isinstance(field_tag, ExtractionTag)]
+                if candidates:
+                    res.append((pname, candidates))
+        return res
+
     def get_tied_fields(self, tag: ExtractionTag,
                         field_type: str = FieldTypeEnum.BOTH.value,
                         threshold: float = 0.5,
@@ -297,29 +403,14 @@ class Document:
             and value is List of `Field` objects
         """
         all_tied_fields: Dict[str, List[Field]] = OrderedDict()
-        if field_type == FieldTypeEnum.INPUT_FIELD.value:
-            scopes = (self.x,)
-        elif field_type == FieldTypeEnum.OUTPUT_FIELD.value:
-            scopes = (self.y,)
-        elif field_type == FieldTypeEnum.BOTH.value:
-            scopes = (self.x, self.y)
-        else:
-            raise ValueError(
-                f"'field_type' should be one of "
-                f"{tuple(i.value for i in FieldTypeEnum.__members__.values())}"
-                f" got {field_type}")
-        for scope in scopes:
-            for pname, fields in scope.items():
-                if not pn_filter(pname):
-                    continue
-                tied_fields = {field for field in fields
-                               if not isinstance(field, TableField)
-                               for field_tag in field.tags
-                               if isinstance(field_tag, ExtractionTag)
-                               and (tag & field_tag)
-                               / min({tag.area, field_tag.area}) >= threshold}
-                if tied_fields:
-                    all_tied_fields[pname] = list(tied_fields)
+        for pname, candidates in self._get_tie_candidates(
+                tag=tag, field_type=field_type, pn_filter=pn_filter,
+                use_index=threshold > 0):
+            tied_fields = {field for field, field_tag in candidates
+                           if (tag & field_tag)
+                           / min({tag.area, field_tag.area}) >= threshold}
+            if tied_fields:
+                all_tied_fields[pname] = list(tied_fields)
         return all_tied_fields
 
     def get_tied_tags(self, tag: ExtractionTag,
@@ -340,28 +431,13 @@ class Document:
             and value is List of `ExtractionTag` objects
         """
         all_tied_tags: Dict[str, List[ExtractionTag]] = OrderedDict()
-        if field_type == FieldTypeEnum.INPUT_FIELD.value:
-            scopes = (self.x,)
-        elif field_type == FieldTypeEnum.OUTPUT_FIELD.value:
-            scopes = (self.y,)
-        elif field_type == FieldTypeEnum.BOTH.value:
-            scopes = (self.x, self.y)
-        else:
-            raise ValueError(
-                f"'field_type' should be one of "
-                f"{tuple(i.value for i in FieldTypeEnum.__members__.values())}"
-                f" got {field_type}")
-        for scope in scopes:
-            for pname, fields in scope.items():
-                if not pn_filter(pname):
-                    continue
-                tied_tags = {field_tag for field in fields
-                             if not isinstance(field, TableField)
-                             for field_tag in field.tags
-                             if isinstance(field_tag, ExtractionTag)
-                             if tag.iou(field_tag) >= threshold}
-                if tied_tags:
-                    all_tied_tags[pname] = list(tied_tags)
+        for pname, candidates in self._get_tie_candidates(
+                tag=tag, field_type=field_type, pn_filter=pn_filter,
+                use_index=threshold > 0):
+            tied_tags = {field_tag for _, field_tag in candidates
+                         if tag.iou(field_tag) >= threshold}
+            if tied_tags:
+                all_tied_tags[pname] = list(tied_tags)
         return all_tied_tags
 
     def get_first_tied_field(self, tag: ExtractionTag,
@@ -374,6 +450,10 @@ class Document:
             names passing the filter will be considered
         :return: If match found, return Tuple of the matching pname
             and `Field`, otherwise return `None`
+
+        Note: The fields are looked up in a spatial index of the document,
+            which is rebuilt after fields or tags are added, removed or
+            replaced (also in place, e.g. `field.tags.append(tag)`)
         """
         res = None
         fields = self.get_tied_fields(tag=tag,
@@ -403,8 +483,7 @@ class Document:
             if tied_field is None:
                 val = tag.raw_value
             else:
-                pname, matching_field = self.get_first_tied_field(
-                    tag=tag, pn_filter=pn_filter)
+                pname, matching_field = tied_field
                 # noinspection PyUnresolvedReferences
                 val = matching_field.value
         return val
@@ -449,9 +528,69 @@ class Document:
             val = matching_tag.raw_value
         return val
 
+    def get_first_tied_fields(self, tags: List[BoxTag],
+                              threshold: float = 0.5,
+                              pn_filter: Callable = lambda x: True
+                              ) -> List[Optional[Tuple[str, Field]]]:
+        """Batched version of `get_first_tied_field`. Resolves the ties
+            of all given tags against all candidate fields with a single
+            vectorized pass per page
+
+        :param tags: List of input tags
+        :param threshold: The IoU threshold to consider the tags in the same
+            location
+        :param pn_filter: If provided, only fields with
+            names passing the filter will be considered
+        :return: List with an item for each input tag. The item is a tuple
+            of the matching pname and `Field`, if a match is found,
+            otherwise `None`
+
+        Note: The fields are looked up in a spatial index of the document,
+            which is rebuilt after fields or tags are added, removed or
+            replaced (also in place, e.g. `field.tags.append(tag)`)
+        """
+        if threshold <= 0:
+            return [self.get_first_tied_field(tag=tag, pn_filter=pn_filter)
+                    for tag in tags]
+        candidates = [
+            (scope_idx, pname, field, field_tag)
+            for scope_idx, scope in enumerate((self.x, self.y))
+            for pname, fields in scope.items()
+            if pn_filter(pname)
+            for field in fields
+            if not isinstance(field, TableField)
+            for field_tag in field.tags
+            if isinstance(field_tag, ExtractionTag)]
+        candidate_tags = [field_tag for *_, field_tag in candidates]
+        intersection = BoxTag.intersection_matrix(tags, candidate_tags)
+        min_area = np.minimum(
+            np.array([tag.area for tag in tags], dtype=float)[:, None],
+            np.array([tag.area for tag in candidate_tags],
+                     dtype=float)[None, :])
+        matches = intersection / min_area >= threshold
+        res: List[Optional[Tuple[str, Field]]] = [None] * len(tags)
+        for tag_idx, tag_matches in enumerate(matches):
+            matched = [candidates[i] for i in np.flatnonzero(tag_matches)]
+            if matched:
+                res[tag_idx] = self._first_tied_field_of_matches(matched)
+        return res
+
+    @staticmethod
+    def _first_tied_field_of_matches(
+            matched: List[Tuple[int, str, Field, ExtractionTag]]
+    ) -> Tuple[str, Field]:
+        """Pick the first tied field from the matched candidates (given in
+            document order) the same way `get_first_tied_field` does"""
+        pname = matched[0][1]
+        scope_idx = max(i[0] for i in matched if i[1] == pname)
+        tied_fields = {field for idx, name, field, _ in matched
+                       if idx == scope_idx and name == pname}
+        return pname, list(tied_fields)[0]
+
     def get_df_with_tied_field_values(self, table_tag: TableTag,
                                       pn_filter: Callable =
-                                      lambda x: True
+                                      lambda x: True,
+                                      batch: bool = True
                                       ) -> pd.DataFrame:
         """Return the dataframe of the TableTag, where each cell
            value is replaced with the values in the fields of
@@ -461,28 +600,139 @@ class Document:
         :param table_tag: Input `TableTag`
         :param pn_filter: : If provided, only fields with
             names passing the filter will be considered
+        :param batch: If true, the ties of all cells are resolved at once,
+            otherwise each cell is resolved separately
         :return: Dataframe of the TableTag
         """
-        if "map" not in dir(table_tag.raw_df):
-            return table_tag.raw_df.applymap(
-                lambda x: self.get_first_tied_field_value(
-                    x,
-                    pn_filter=pn_filter))
-        else:
-            return table_tag.raw_df.map(
-                lambda x: self.get_first_tied_field_value(
-                    x,
-                    pn_filter=pn_filter))
-
-    def load_page_images(self, page_filter: Callable = lambda x: True) -> None:
-        """Get all images of the pages in the document
-         (Using multiprocessing)"""
+        raw_df = table_tag.raw_df
+        if not batch:
+            if "map" not in dir(raw_df):
+                return raw_df.applymap(
+                    lambda x: self.get_first_tied_field_value(
+                        x,
+                        pn_filter=pn_filter))
+            else:
+                return raw_df.map(
+                    lambda x: self.get_first_tied_field_value(
+                        x,
+                        pn_filter=pn_filter))
+        cells = raw_df.to_numpy(dtype=object)
+        values = np.empty(cells.shape, dtype=object)
+        tag_positions = []
+        for position, cell in np.ndenumerate(cells):
+            if isinstance(cell, BoxTag):
+                tag_positions.append(position)
+            else:
+                values[position] = self.get_first_tied_field_value(
+                    cell, pn_filter=pn_filter)
+        tied_fields = self.get_first_tied_fields(
+            tags=[cells[position] for position in tag_positions],
+            pn_filter=pn_filter)
+        for position, tied_field in zip(tag_positions, tied_fields):
+            if tied_field is None:
+                values[position] = cells[position].raw_value
+            else:
+                values[position] = tied_field[1].value
+        return pd.DataFrame(values, index=raw_df.index,
+                            columns=raw_df.columns).infer_objects()
+
+    def prefetch_page_dimensions(self, max_workers: int = 16,
+                                 from_image: bool = True) -> None:
+        """Resolve the missing image dimensions of all pages concurrently
+
+        :param max_workers: Maximum number of pages resolved at once
+        :param from_image: If True, the dimensions are read from the header
+            of the page images, instead of the page data (OCR)
+        """
+        pages = [page for page in self.pages.values()
+                 if page._image_width is None or page._image_height is None]
+        if not pages:
+            return
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(pages))) as executor:
+            list(executor.map(
+                functools.partial(Page.load_dimensions,
+                                  from_image=from_image), pages))
+
+    def search_text(self, text: str,
+                    case_sensitive: bool = False,
+                    sort: bool = False,
+                    clean: bool = True,
+                    cleanup_regex=Page.REGEX_NO_ALPHANUM_CHARS,
+                    return_tags: bool = False,
+                    page_filter: Callable = lambda x: True,
+                    max_workers: int = 16) -> List[Tuple[int, Any]]:
+        """Search the `text` in all pages of the document concurrently
+            (see `Page.search_text`)
+
+        :param text: Text to search for
+        :param case_sensitive: If True, the search will be case-sensitive
+        :param sort: If True, the words of each page are ordered by
+            `word_id_number` before searching
+        :param clean: If true, disregard all non-alphanumeric characters
+        :param cleanup_regex: Regex for cleanup (if `clean=True`)
+        :param return_tags: if True, the words in found text
+            are converted into tags
+        :param page_filter: Only the pages for which it returns True
+            are searched
+        :param max_workers: Maximum number of pages searched at once
+        :return: List of the page numbers and matches (see
+            `Page.search_text`), in the order of the pages
+        """
+        pages = [page for page in self.pages.values() if page_filter(page)]
+        if not pages:
+            return []
+        search = functools.partial(
+            Page.search_text, text=text, case_sensitive=case_sensitive,
+            sort=sort, clean=clean, cleanup_regex=cleanup_regex,
+            return_tags=return_tags)
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(pages))) as executor:
+            page_matches = list(executor.map(search, pages))
+        return [(page.page_number, match)
+                for page, matches in zip(pages, page_matches)
+                for match in matches]
+
+    def load_page_images(self, page_filter: Callable = lambda x: True,
+                         threads: bool = False,
+                         decode: bool = False,
+                         keep_bytes: bool = True,
+                         executor: Optional[Executor] = None) -> None:
+        """Get the images of the pages in the document, which are
+            populated in place. Only the pages passing `page_filter`
+            are loaded
+
+        :param page_filter: Only the images of the pages for which it
+            returns True are loaded
+        :param threads: If True, the images are fetched (and decoded) in
+            the thread pool shared by all documents (see
+            `get_image_executor`). Otherwise, a process pool is used
+        :param decode: If True, the images are also decoded into
+            `Page.image_arr` (implies `threads=True`)
+        :param keep_bytes: If False, the encoded images are released after
+            decoding (requires `decode=True`). The decoded arrays of all
+            loaded pages are kept, so the memory is bounded by them, plus
+            the encoded images of the pages being decoded (at most one per
+            thread of the pool)
+        :param executor: Optional executor to use instead of the shared
+            thread pool (implies `threads=True`)
+        """
+        if not keep_bytes and not decode:
+            raise ValueError("`keep_bytes=False` requires `decode=True`")
+        pages = [page for page in self.pages.values() if page_filter(page)]
+        if not pages:
+            return
+        if threads or decode or executor is not None:
+            executor = executor or get_image_executor()
+            list(executor.map(functools.partial(
+                Page.load_image, decode=decode, keep_bytes=keep_bytes),
+                pages))
+            return
         global _get_page
 
         # noinspection PyRedeclaration
-        def _get_page(page, filter_pages: Callable = page_filter):
-            if filter_pages(page):
-                _ = page.image_bytes
+        def _get_page(page):
+            _ = page.image_bytes
             return page
         if platform.machine() in ["arm64", "aarch64"]:
             ctx = multiprocessing.get_context('fork')
@@ -490,9 +740,9 @@ class Document:
         else:
             pool = multiprocessing.Pool(
                 min(multiprocessing.cpu_count() * 2, 16))
-        pages = pool.map(_get_page, self.pages.values())
-        for page, populated_page in zip(self.pages.values(), pages):
-            page._image_arr = populated_page._image_arr
+        with pool:
+            populated_pages = pool.map(_get_page, pages)
+        for page, populated_page in zip(pages, populated_pages):
             page._image_bytes = populated_page._image_bytes
 
     @deprecated("Use `load_ocr` instead. It should be faster and more stable")
@@ -507,7 +757,8 @@ class Document:
         # noinspection PyRedeclaration
         def _get_page(page, filter_pages: Callable = page_filter):
             if filter_pages(page):
-                page._ocr = page.get_ocr_formatted(stick_coords=stick_coords)
+                page._ocr_words = page.build_ocr_words(
+                    stick_coords=stick_coords)
                 _ = page.lines
             return page
         if platform.machine() in ["arm64", "aarch64"]:
@@ -518,7 +769,7 @@ class Document:
                 min(multiprocessing.cpu_count() * 2, 16))
         pages = pool.map(_get_page, self.pages.values())
         for page, populated_page in zip(self.pages.values(), pages):
-            page._ocr = populated_page._ocr
+            page._ocr_words = populated_page._ocr_words
             page._ocr_raw = populated_page._ocr_raw
             page._lines = populated_page._lines
 
@@ -545,29 +796,40 @@ class Document:
                 word['h'] = float(word['h'])
             raw_ocr['page']['width'] = float(raw_ocr['page']['width'])
             raw_ocr['page']['height'] = float(raw_ocr['page']['height'])
-            self.pages[page_number]._ocr_raw = raw_ocr
-            self.pages[page_number]._ocr = self.pages[
-                page_number].get_ocr_formatted(stick_coords=stick_coords)
+            page = self.pages[page_number]
+            page._ocr_raw = raw_ocr
+            page._ocr_words = page.build_ocr_words(stick_coords=stick_coords)
 
     def to_dict(self) -> dict:
         """Converts Document object to dict"""
-        input_fields = OrderedDict(
-            {name: [field.to_dict() for field in fields]
-             for name, fields in self.x.items()})
-        output_fields = OrderedDict(
-            {name: [field.to_dict() for field in fields]
-             for name, fields in self.y.items()})
-        data = OrderedDict(input_fields=input_fields,
-                           output_fields=output_fields,
+        data = OrderedDict(input_fields=self.x.fields_to_dict(),
+                           output_fields=self.y.fields_to_dict(),
                            metadata=self.metadata)
         return data
 
+    @staticmethod
+    def _construct_field(raw_field: dict, pages: Dict[int, Page],
+                         html_info: HTML,
+                         classification_labels: ClassificationLabels
+                         ) -> Field:
+        """Construct a field of the document from its raw dictionary"""
+        return FieldMapping[
+            raw_field[IqDocumentKeysEnum.data_type.value].replace('-', '_')
+        ].value.construct_from_raw(
+            raw=raw_field, pages=pages, html=html_info,
+            labels=classification_labels.get(
+                raw_field.get(IqDocumentKeysEnum.src_field_id.value, ''),
+                None))
+
     @classmethod
     def from_dict(cls, raw: dict,
-                  data_path: str) -> 'Document':
+                  data_path: str,
+                  lazy_fields: bool = False) -> 'Document':
         """Document object created from data of dict
         :param raw: document dictionary
         :param data_path: path to the documents OCR and page images
+        :param lazy_fields: If True, the fields of each python name are
+            constructed on their first access, instead of all at once
         """
         if not isinstance(raw, dict):
             raise TypeError(
@@ -593,32 +855,21 @@ class Document:
                                  path=data_path,
                                  image_width=image_width,
                                  image_height=image_height)
-        input_fields = FieldCollection(
-            {name: [
-                FieldMapping[
-                    field[IqDocumentKeysEnum.data_type.value].replace('-', '_')
-                ].value.construct_from_raw(raw=field, pages=pages,
-                                           html=html_info,
-                                           labels=classification_labels.get(
-                                               field.get(
-                                                   IqDocumentKeysEnum.
-                                                   src_field_id.value, ''),
-                                               None))
-                for field in fields]
-                for name, fields in raw['input_fields'].items()})
-        output_fields = FieldCollection(
-            {name: [
-                FieldMapping[
-                    field[IqDocumentKeysEnum.data_type.value].replace('-', '_')
-                ].value.construct_from_raw(raw=field, pages=pages,
-                                           html=html_info,
-                                           labels=classification_labels.get(
-                                               field.get(
-                                                   IqDocumentKeysEnum.
-                                                   src_field_id.value, ''),
-                                               None))
-                for field in fields]
-                for name, fields in raw['output_fields'].items()})
+        field_factory = functools.partial(
+            cls._construct_field, pages=pages, html_info=html_info,
+            classification_labels=classification_labels)
+        if lazy_fields:
+            input_fields = FieldCollection.from_raw(
+                raw['input_fields'], field_factory=field_factory)
+            output_fields = FieldCollection.from_raw(
+                raw['output_fields'], field_factory=field_factory)
+        else:
+            input_fields = FieldCollection(
+                {name: [field_factory(field) for field in fields]
+                 for name, fields in raw['input_fields'].items()})
+            output_fields = FieldCollection(
+                {name: [field_factory(field) for field in fields]
+                 for name, fields in raw['output_fields'].items()})
         return cls(input_fields=input_fields,
                    output_fields=output_fields,
                    pages=pages, html_info=html_info,
@@ -724,18 +975,19 @@ class Document:
             layout_fields_on_page: list[Field],
             table_parser: Callable
     ) -> str:
+        area_tags = {
+            idx: sum(field.tags)
+            for idx, field in enumerate(layout_fields_on_page)
+            if field.tags and not isinstance(field, TableField)}
+        area_lines = Document._extract_words_in_tag_areas(area_tags)
         text = ""
-        for field in layout_fields_on_page:
+        for idx, field in enumerate(layout_fields_on_page):
             if not field.tags:
                 continue
             if isinstance(field, TableField):
                 text += table_parser(field)
             else:
-                area_tag: ExtractionTag = sum(field.tags)
-                lines = area_tag.page.extract_words_in_tag_area(
-                    area_tag=area_tag,
-                    return_tags=False, line_by_line=True)
-                for line in lines:
+                for line in area_lines[idx]:
                     if not line:
                         continue
                     for word in line:
@@ -743,6 +995,27 @@ class Document:
                     text += "\n"
         return text
 
+    @staticmethod
+    def _extract_words_in_tag_areas(
+            area_tags: Dict[int, ExtractionTag]) -> Dict[int, list]:
+        """Extract the words in the areas of the given tags line by line,
+            with a single bulk query per page
+
+        :param area_tags: Dictionary of tags by an integer key
+        :return: Dictionary of the extracted lines by the same keys
+        """
+        keys_by_page = defaultdict(list)
+        for key, area_tag in area_tags.items():
+            keys_by_page[area_tag.page.page_number].append(key)
+        area_lines = {}
+        for keys in keys_by_page.values():
+            page = area_tags[keys[0]].page
+            lines = page.extract_words_in_tag_areas(
+                [area_tags[key] for key in keys],
+                return_tags=False, line_by_line=True)
+            area_lines.update(zip(keys, lines))
+        return area_lines
+
     @classmethod
     def _get_document_text_from_layout_info(
             cls,
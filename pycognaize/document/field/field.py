@@ -4,6 +4,7 @@ from typing import List, Optional, Dict, Type
 
 from pycognaize.common.classification_labels import ClassificationLabels
 from pycognaize.common.enums import IqFieldKeyEnum
+from pycognaize.common.versioned_list import VersionedList
 from pycognaize.document.html_info import HTML
 from pycognaize.document.page import Page
 from pycognaize.document.tag.tag import BoxTag
@@ -32,10 +33,8 @@ class Field(metaclass=abc.ABCMeta):
             group_name = ''
         self._group_name = group_name
         self._name = name
-        if tags is None:
-            self._tags = []
-        else:
-            self._tags = tags
+        # Modifications of the tags notify the collections of the field
+        self._tags = VersionedList(tags or [])
         self._value = value
         self._field_id = field_id
         self._classification_labels = classification_labels
@@ -0,0 +1,200 @@
+"""Defines OCRWords, a columnar representation of the words of a page"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class OCRWords:
+    """Columnar (structure of arrays) store of the OCR words of a page.
+
+    Coordinates are in pixels of the page image (stored as 32-bit
+    integers). The text of all words is kept in a single string buffer,
+    where the text of the word with index `i` is
+    `buffer[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self,
+                 left: np.ndarray,
+                 right: np.ndarray,
+                 top: np.ndarray,
+                 bottom: np.ndarray,
+                 word_id: np.ndarray,
+                 text_buffer: str,
+                 text_offsets: np.ndarray):
+        """
+
+        :param left: Left coordinates of the words
+        :param right: Right coordinates of the words
+        :param top: Top coordinates of the words
+        :param bottom: Bottom coordinates of the words
+        :param word_id: Index of each word in the raw OCR data
+        :param text_buffer: Concatenated text of all words
+        :param text_offsets: Array of length n + 1 with the start
+            of the text of each word in `text_buffer`
+        """
+        if not (len(left) == len(right) == len(top) == len(bottom)
+                == len(word_id) == len(text_offsets) - 1):
+            raise ValueError("All word arrays should have the same length")
+        self._left = left
+        self._right = right
+        self._top = top
+        self._bottom = bottom
+        self._word_id = word_id
+        self._text_buffer = text_buffer
+        self._text_offsets = text_offsets
+
+    @property
+    def left(self) -> np.ndarray:
+        return self._left
+
+    @property
+    def right(self) -> np.ndarray:
+        return self._right
+
+    @property
+    def top(self) -> np.ndarray:
+        return self._top
+
+    @property
+    def bottom(self) -> np.ndarray:
+        return self._bottom
+
+    @property
+    def word_id(self) -> np.ndarray:
+        return self._word_id
+
+    @property
+    def text_buffer(self) -> str:
+        return self._text_buffer
+
+    @property
+    def text_offsets(self) -> np.ndarray:
+        return self._text_offsets
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the store"""
+        return (self.left.nbytes + self.right.nbytes + self.top.nbytes
+                + self.bottom.nbytes + self.word_id.nbytes
+                + self.text_offsets.nbytes + len(self.text_buffer))
+
+    def __len__(self):
+        return len(self._word_id)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} words>"
+
+    def text(self, idx: int) -> str:
+        """Text of the word with the given index"""
+        return self._text_buffer[
+               self._text_offsets[idx]:self._text_offsets[idx + 1]]
+
+    @property
+    def texts(self) -> List[str]:
+        """Text of all words"""
+        offsets = self._text_offsets.tolist()
+        return [self._text_buffer[start:end]
+                for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def word(self, idx: int) -> dict:
+        """Word with the given index in the dictionary format
+            of `Page.ocr`"""
+        return dict(left=int(self._left[idx]),
+                    right=int(self._right[idx]),
+                    top=int(self._top[idx]),
+                    bottom=int(self._bottom[idx]),
+                    ocr_text=self.text(idx),
+                    word_id_number=int(self._word_id[idx]))
+
+    def to_dicts(self, indices: Optional[Sequence[int]] = None
+                 ) -> List[dict]:
+        """Return the words in the dictionary format of `Page.ocr`
+
+        :param indices: If provided, only return the words
+            with the given indices (in the given order)
+        :return: List of dictionaries with the keys `left`, `right`,
+            `top`, `bottom`, `ocr_text` and `word_id_number`
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        else:
+            indices = np.asarray(indices, dtype=np.int64)
+        # Only the selected words are converted
+        buffer = self._text_buffer
+        return [dict(left=left, right=right, top=top, bottom=bottom,
+                     ocr_text=buffer[start:end], word_id_number=word_id)
+                for left, right, top, bottom, start, end, word_id in zip(
+                    self._left[indices].tolist(),
+                    self._right[indices].tolist(),
+                    self._top[indices].tolist(),
+                    self._bottom[indices].tolist(),
+                    self._text_offsets[indices].tolist(),
+                    self._text_offsets[indices + 1].tolist(),
+                    self._word_id[indices].tolist())]
+
+    @classmethod
+    def from_texts(cls, left, right, top, bottom, word_id,
+                   texts: Sequence[str]) -> 'OCRWords':
+        """Create the store from coordinate sequences and word texts"""
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64,
+                              count=len(texts))
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(left=np.asarray(left, dtype=np.int32),
+                   right=np.asarray(right, dtype=np.int32),
+                   top=np.asarray(top, dtype=np.int32),
+                   bottom=np.asarray(bottom, dtype=np.int32),
+                   word_id=np.asarray(word_id, dtype=np.int32),
+                   text_buffer=''.join(texts),
+                   text_offsets=offsets)
+
+    @classmethod
+    def from_words(cls, words: Sequence[dict]) -> 'OCRWords':
+        """Create the store from words in the dictionary format
+            of `Page.ocr`"""
+        return cls.from_texts(
+            left=[word['left'] for word in words],
+            right=[word['right'] for word in words],
+            top=[word['top'] for word in words],
+            bottom=[word['bottom'] for word in words],
+            word_id=[word['word_id_number'] for word in words],
+            texts=[word['ocr_text'] for word in words])
+
+    @classmethod
+    def from_ocr_raw(cls, ocr_raw: dict,
+                     image_width: float,
+                     image_height: float) -> 'OCRWords':
+        """Create the store from the raw OCR data of a page, scaling the
+            coordinates to the size of the page image.
+            Words with empty text are skipped.
+
+        :param ocr_raw: Raw OCR data of the page (see `Page.get_ocr`)
+        :param image_width: Width of the page image
+        :param image_height: Height of the page image
+        :return: `OCRWords` object
+        """
+        image_height = float(image_height)
+        image_width = float(image_width)
+        page_height = float(ocr_raw['page']['height'])
+        page_width = float(ocr_raw['page']['width'])
+        if image_width > image_height and page_width < page_height:
+            page_height, page_width = page_width, page_height
+        height_ratio = image_height / page_height
+        width_ratio = image_width / page_width
+        data = ocr_raw['data']
+        word_id = np.array([n for n, word in enumerate(data)
+                            if word['value'].strip()], dtype=np.int64)
+        texts = [data[n]['value'] for n in word_id.tolist()]
+        coords = np.array([(data[n]['x'], data[n]['y'],
+                            data[n]['w'], data[n]['h'])
+                           for n in word_id.tolist()],
+                          dtype=float).reshape(-1, 4)
+        x, y, w, h = coords.T
+        left = np.round(x * width_ratio).astype(np.int64)
+        right = np.round((x + w) * width_ratio).astype(np.int64)
+        top = np.round(y * height_ratio).astype(np.int64)
+        bottom = np.round((y + h) * height_ratio).astype(np.int64)
+        right = np.where(left >= right, left + 1, right)
+        bottom = np.where(top >= bottom, top + 1, bottom)
+        return cls.from_texts(left=left, right=right, top=top,
+                              bottom=bottom, word_id=word_id, texts=texts)
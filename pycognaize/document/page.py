@@ -2,7 +2,7 @@ import json
 import logging
 import os
 import re
-from typing import Optional, List, Iterable, Union
+from typing import Optional, List, Iterable, Union, Sequence, Tuple
 import numpy as np
 
 from pycognaize.file_storage import get_storage
@@ -17,15 +17,15 @@ from pycognaize.common.enums import (
 )
 import pycognaize.common
 from pycognaize.common.utils import (
-    infer_rows_from_words,
-    clean_ocr_data,
-    find_first_word_coords,
-    intersects,
-    compute_intersection_area,
+    group_words_into_lines,
     stick_word_boxes,
     preview_img,
-    image_string_to_array
+    image_string_to_array,
+    image_size_from_bytes
 )
+from pycognaize.document.ocr_words import OCRWords
+from pycognaize.document.page_text import PageText
+from pycognaize.document.token_index import TokenIndex
 from pycognaize.document.tag import ExtractionTag
 
 
@@ -64,8 +64,11 @@ class Page:
 
         self._path = path
         self._ocr_raw = None
-        self._ocr = None
+        self._ocr_words = None
         self._lines = None
+        self._line_words = None
+        self._token_indexes = {}
+        self._page_text = None
         self._row_word_groups = None
         self._image_bytes = None
         self._image_arr = None
@@ -89,10 +92,18 @@ class Page:
 
     @property
     def ocr(self) -> dict:
-        """Formatted ocr of page"""
-        if self._ocr is None:
-            self._ocr = self.get_ocr_formatted()
-        return self._ocr
+        """Formatted ocr of page. The dictionaries of the words are built
+            from `ocr_words` on every access and are not kept in memory,
+            so `ocr_words` should be preferred where the columns suffice"""
+        return dict(words=self.ocr_words.to_dicts(), paragraphs=[])
+
+    @property
+    def ocr_words(self) -> OCRWords:
+        """Columnar store of the words of the page, all dictionary based
+            representations of the words are built from it"""
+        if self._ocr_words is None:
+            self._ocr_words = self.build_ocr_words()
+        return self._ocr_words
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.page_number}>"
@@ -137,6 +148,23 @@ class Page:
             self._image_arr = image_string_to_array(self.image_bytes)
         return self._image_arr
 
+    def load_image(self, decode: bool = False,
+                   keep_bytes: bool = True) -> None:
+        """Fetch the image of the page, if it is not loaded yet
+
+        :param decode: If True, the image is also decoded into `image_arr`
+        :param keep_bytes: If False, the encoded image is released after
+            decoding, so only the array is kept. Requires `decode`
+        """
+        if not keep_bytes and not decode:
+            raise ValueError("`keep_bytes=False` requires `decode=True`")
+        if decode:
+            _ = self.image_arr
+            if not keep_bytes:
+                self._image_bytes = None
+        else:
+            _ = self.image_bytes
+
     def get_page_data(self) -> None:
         """Data of the page"""
         if self.path is None:
@@ -164,6 +192,44 @@ class Page:
             self._image_width = 1
             self._image_height = 1
 
+    def get_image_size(self, head_size: int = 65536
+                       ) -> Optional[Tuple[int, int]]:
+        """Width and height of the page image, read from the header of the
+            image file (only the first `head_size` bytes are fetched)
+
+        :param head_size: Number of bytes to read from the image file
+        :return: width and height, or None if the size could not be read
+        """
+        if not self.path:
+            raise ValueError('Path should be specified.')
+        storage = get_storage(self.path, config=self._storage_config)
+        uri = join_path(
+            storage.is_s3_path(self.path),
+            self.path,
+            StorageEnum.image_folder.value,
+            f"image_{self._page_number}.{IMG_EXTENSION}"
+        )
+        try:
+            return image_size_from_bytes(storage.read_head(uri, head_size))
+        except Exception as e:
+            logging.debug(
+                f"Unable to read the image size for page "
+                f"{self.page_number}: {e}")
+
+    def load_dimensions(self, from_image: bool = True) -> None:
+        """Resolve the width and height of the page image, if missing.
+
+        :param from_image: If True, the dimensions are read from the header
+            of the page image, the page data (OCR) is only read if that fails
+        """
+        if self._image_width is not None and self._image_height is not None:
+            return
+        size = self.get_image_size() if from_image else None
+        if size is None:
+            self.get_page_data()
+        else:
+            self._image_width, self._image_height = size
+
     @property
     def image_height(self) -> int:
         """Height of the page image"""
@@ -219,45 +285,39 @@ class Page:
                 "data": []}
         return ocr_raw
 
+    def build_ocr_words(self, stick_coords: bool = False) -> OCRWords:
+        """Build the columnar store of the words of the page from
+            the raw OCR data
+
+        :param stick_coords: If true, the word boxes are adjusted to stick
+            to the text on the page image
+        :return: `OCRWords` object
+        """
+        ocr = self.ocr_raw
+        if ocr is None:
+            return OCRWords.from_words([])
+        words = OCRWords.from_ocr_raw(ocr_raw=ocr,
+                                      image_width=self.image_width,
+                                      image_height=self.image_height)
+        if stick_coords:
+            word_dicts = words.to_dicts()
+            stick_word_boxes(box_coord=word_dicts,
+                             img_bytes=self.get_image())
+            words = OCRWords.from_words(word_dicts)
+        return words
+
     def get_ocr_formatted(self, stick_coords: bool = False,
                           return_tags: bool = False
                           ) -> Union[dict, List[ExtractionTag]]:
         """Dict of words, paragraphs each containing their tag data"""
         res = dict(words=[], paragraphs=[])
-        res_words_tags = []
-        ocr = self.ocr_raw
-        if ocr is None:
+        if self.ocr_raw is None:
             return res
-        image_height = float(self.image_height)
-        image_width = float(self.image_width)
-        page_height = float(ocr['page']['height'])
-        page_width = float(ocr['page']['width'])
-        if image_width > image_height and page_width < page_height:
-            page_height, page_width = page_width, page_height
-        height_ratio = image_height / page_height
-        width_ratio = image_width / page_width
-        for n, i in enumerate(ocr['data']):
-            if not i['value'].strip():
-                continue
-            word = dict(
-                left=round(float(i['x']) * width_ratio),
-                right=round((float(i['x']) + float(i['w'])) * width_ratio),
-                top=round(float(i['y']) * height_ratio),
-                bottom=round((float(i['y']) + float(i['h'])) * height_ratio),
-                ocr_text=i['value'],
-                word_id_number=n)
-            if word['left'] >= word['right']:
-                word['right'] = word['left'] + 1
-            if word['top'] >= word['bottom']:
-                word['bottom'] = word['top'] + 1
-            res['words'].append(word)
-        if stick_coords:
-            stick_word_boxes(box_coord=res['words'],
-                             img_bytes=self.get_image())
+        res['words'] = self.build_ocr_words(
+            stick_coords=stick_coords).to_dicts()
         if return_tags:
-            for word in res['words']:
-                res_words_tags.append(self.word_to_extraction_tag(word))
-            return res_words_tags
+            return [self.word_to_extraction_tag(word)
+                    for word in res['words']]
         return res
 
     @property
@@ -282,12 +342,9 @@ class Page:
                  and each tag in that list is the OCR data represented as
                  an Extraction tag, with its coordinates in the document.
         """
-        ocr_dict = {}
-        page_ocr = self.ocr
-        for page, value in page_ocr.items():
-            ocr_dict[page] = [self.word_to_extraction_tag(item) for
-                              item in value]
-        return ocr_dict
+        return dict(words=[self.word_to_extraction_tag(word)
+                           for word in self.ocr_words.to_dicts()],
+                    paragraphs=[])
 
     @property
     def line_tags(self) -> list:
@@ -321,34 +378,16 @@ class Page:
         converted to tag
         """
         words_tags = []
-        rows_inf, self._row_word_groups = infer_rows_from_words(
-            box=dict(left=0, top=0, right=1, bottom=1),
-            class_ocr_data=clean_ocr_data(self.ocr)['words'])
-        rows: list = [
-            int(round(abs(rows_inf[row_n]['top'] + row['bottom']) / 2))
-            for row_n, row in enumerate(rows_inf)]
-        bottom_coord = [
-            int(max(rows_inf, key=lambda d: d['bottom'])['bottom'])
-        ] if rows_inf else []
-
-        self._row_word_groups: list = [
-            i for _, i in sorted(
-                zip(rows + bottom_coord, self._row_word_groups),
-                key=lambda pair: pair[0])]
-        rows.sort()
-        temp_rows = []
-        for i, (row, group) in enumerate(zip(rows + bottom_coord,
-                                             self._row_word_groups)):
-            if row in temp_rows:
-                rows[i] = None
-                orig_idx = rows.index(row)
-                self._row_word_groups[orig_idx] += self._row_word_groups[i]
-                self._row_word_groups[i] = None
-            temp_rows.append(row)
-        self._row_word_groups = [i for i in self._row_word_groups if i]
-        self._row_word_groups = [
-            sorted(i, key=lambda x: (x['left'], x['right']))
-            for i in self._row_word_groups]
+        words = self.ocr_words
+        lines = group_words_into_lines(
+            np.column_stack((words.left, words.right,
+                             words.top, words.bottom)), words.texts)
+        # The dictionaries are built only for the words of the lines
+        line_words = words.to_dicts(
+            np.concatenate(lines) if lines else [])
+        ends = np.cumsum([len(line) for line in lines]).tolist()
+        self._row_word_groups = [line_words[start:end] for start, end
+                                 in zip([0] + ends[:-1], ends)]
         if return_tags:
             for line in self._row_word_groups:
                 new_line_tags = []
@@ -366,8 +405,10 @@ class Page:
                     cleanup_regex=REGEX_NO_ALPHANUM_CHARS,
                     return_tags: bool = False) -> list:
         """
-        Detects the coordinates of the `text` in ocr of the page
-            If the `text` is not found in the page return None
+        Detects the coordinates of all occurrences of the `text` in ocr
+            of the page, which do not overlap, in the order of the words.
+            The occurrences are looked up in the `token_index` of the page
+            If the `text` is not found in the page return an empty list
 
         :param str text:
         :param case_sensitive: If True, the search will be case-sensitive
@@ -393,22 +434,23 @@ class Page:
         all_matches_tags = []
         if area:
             ocr_data = self.extract_area_words(**area)
+            if sort:
+                ocr_data = self._sort_by_word_id(ocr_data)
+            index = TokenIndex(ocr_data, case_sensitive=case_sensitive,
+                               clean=clean, cleanup_regex=cleanup_regex)
         else:
-            ocr_data = [word for line in self.lines for word in line]
-
-        while True:
-            final_coords = find_first_word_coords(
-                text=text, ocr_data=ocr_data,
-                case_sensitive=case_sensitive,
-                sort=sort, clean=clean,
-                cleanup_regex=cleanup_regex)
-            if final_coords is None:
-                break
-            all_matches.append(final_coords)
-            final_coord_word_ids = [
-                i['word_id_number'] for i in final_coords['matched_words']]
-            ocr_data = [word for word in ocr_data
-                        if word['word_id_number'] not in final_coord_word_ids]
+            index = self.token_index(case_sensitive=case_sensitive,
+                                     sort=sort, clean=clean,
+                                     cleanup_regex=cleanup_regex)
+
+        for positions in index.find(text):
+            matched_words = [index.words[position] for position in positions]
+            all_matches.append(dict(
+                top=min(word['top'] for word in matched_words),
+                bottom=max(word['bottom'] for word in matched_words),
+                left=min(word['left'] for word in matched_words),
+                right=max(word['right'] for word in matched_words),
+                matched_words=matched_words))
         if return_tags:
             for match in all_matches:
                 matched_words_tags = []
@@ -419,6 +461,82 @@ class Page:
             return all_matches_tags
         return all_matches
 
+    def search_regex(self, pattern: Union[str, re.Pattern],
+                     flags: int = 0,
+                     return_tags: bool = False) -> list:
+        """Find the matches of a regex in the text of the page, which is
+            the `ocr_text` of the words in reading order, joined with
+            spaces within the lines and with newlines between the lines
+            (see `free_form_text`)
+
+        :param pattern: Regex pattern or a compiled pattern
+        :param flags: Flags for compiling the pattern (if not compiled)
+        :param return_tags: if True, the words covered by each match
+            are converted into tags
+        :return: List of dictionaries with the coordinates of the matches
+            (keys: `left`, `right`, `top`, `bottom`, `matched_words` and
+            `match`, the `re.Match` object). `matched_words` includes
+            all words that the match covers, even partially.
+            Empty matches and matches covering only separators
+            are skipped
+        """
+        matches = []
+        page_text = self.page_text
+        for match, positions in page_text.finditer(pattern, flags=flags):
+            matched_words = [page_text.words[position]
+                             for position in positions]
+            if return_tags:
+                matches.append([self.word_to_extraction_tag(word)
+                                for word in matched_words])
+                continue
+            matches.append(dict(
+                top=min(word['top'] for word in matched_words),
+                bottom=max(word['bottom'] for word in matched_words),
+                left=min(word['left'] for word in matched_words),
+                right=max(word['right'] for word in matched_words),
+                matched_words=matched_words,
+                match=match))
+        return matches
+
+    @property
+    def page_text(self) -> PageText:
+        """Text of the lines of the page with the character offsets
+            of the words, which is built once"""
+        lines = self.lines
+        if self._page_text is None or self._page_text[0] is not lines:
+            self._page_text = (lines, PageText(lines))
+        return self._page_text[1]
+
+    @staticmethod
+    def _sort_by_word_id(words: List[dict]) -> List[dict]:
+        return sorted(words, key=lambda x: float(x['word_id_number']))
+
+    def token_index(self, case_sensitive: bool = False,
+                    sort: bool = False,
+                    clean: bool = True,
+                    cleanup_regex=REGEX_NO_ALPHANUM_CHARS) -> TokenIndex:
+        """Inverted index of the normalized words of the page, which is
+            built once for each combination of the options
+
+        :param case_sensitive: If False, the words are lowercased
+        :param sort: If True, the words are ordered by `word_id_number`,
+            otherwise they are in the reading order of `lines`
+        :param clean: If True, the characters matching `cleanup_regex`
+            are removed from the words
+        :param cleanup_regex: Regex of the characters to remove
+        :return: `TokenIndex` of the words of the page
+        """
+        words = self.line_words
+        key = (case_sensitive, sort, clean, cleanup_regex)
+        cached = self._token_indexes.get(key)
+        if cached is not None and cached[0] is words:
+            return cached[1]
+        index = TokenIndex(self._sort_by_word_id(words) if sort else words,
+                           case_sensitive=case_sensitive, clean=clean,
+                           cleanup_regex=cleanup_regex)
+        self._token_indexes[key] = (words, index)
+        return index
+
     @staticmethod
     def _validate_box_coordinates(left: [int, float],
                                   right: [int, float],
@@ -449,21 +567,142 @@ class Page:
             raise ValueError(
                 f"Top ({top}) cannot be equal to bottom ({bottom})")
 
+    @staticmethod
+    def _tag_area_in_pixels(area_tag) -> dict:
+        """Coordinates of the tag in pixels of its page image"""
+        page = area_tag.page
+        return dict(left=area_tag.left * page.image_width / 100,
+                    right=area_tag.right * page.image_width / 100,
+                    top=area_tag.top * page.image_height / 100,
+                    bottom=area_tag.bottom * page.image_height / 100)
+
     @staticmethod
     def extract_words_in_tag_area(area_tag,
                                   return_tags: bool = False,
                                   line_by_line: bool = True) -> Optional[list]:
         page = area_tag.page
-        left = area_tag.left * page.image_width / 100
-        right = area_tag.right * page.image_width / 100
-        top = area_tag.top * page.image_height / 100
-        bottom = area_tag.bottom * page.image_height / 100
-        return page.extract_area_words(left=left,
-                                       top=top,
-                                       right=right,
-                                       bottom=bottom,
-                                       return_tags=return_tags,
-                                       line_by_line=line_by_line)
+        return page.extract_area_words(
+            **page._tag_area_in_pixels(area_tag),
+            return_tags=return_tags,
+            line_by_line=line_by_line)
+
+    def extract_words_in_tag_areas(self, area_tags: Sequence,
+                                   return_tags: bool = False,
+                                   line_by_line: bool = True) -> List[list]:
+        """Batched version of `extract_words_in_tag_area` for tags
+            on this page
+
+        :param area_tags: Sequence of tags on this page
+        :param return_tags: if True, returns tags of the words
+            embedded in given areas
+        :param line_by_line: if True, returns a list of lists for each tag,
+            where each nested list is a line
+        :return: List with the result of `extract_words_in_tag_area`
+            for each tag
+        """
+        for area_tag in area_tags:
+            if area_tag.page.page_number != self.page_number:
+                raise ValueError(
+                    f"Tag {area_tag} is not on page {self.page_number}")
+        areas = [self._tag_area_in_pixels(area_tag) for area_tag in area_tags]
+        return [self._line_words_by_indices(indices, return_tags=return_tags,
+                                            line_by_line=line_by_line)
+                for indices in self.extract_area_words_many(
+                    areas=areas, line_by_line=line_by_line)]
+
+    @property
+    def line_words(self) -> List[dict]:
+        """Words of the page in reading order (the words of `lines`
+            concatenated)"""
+        return self._get_line_words()[0]
+
+    def _get_line_words(self) -> Tuple[List[dict], np.ndarray, np.ndarray]:
+        """Return the words of `lines` concatenated, an array with their
+            coordinates (left, right, top, bottom) and an array with
+            the index of the line of each word"""
+        lines = self.lines
+        if self._line_words is None or self._line_words[0] is not lines:
+            words = [word for line in lines for word in line]
+            coords = np.array(
+                [(word['left'], word['right'], word['top'], word['bottom'])
+                 for word in words], dtype=float).reshape(-1, 4)
+            line_ids = np.repeat(np.arange(len(lines)),
+                                 [len(line) for line in lines])
+            self._line_words = (lines, words, coords, line_ids)
+        return self._line_words[1:]
+
+    def _line_words_by_indices(self, indices: list,
+                               return_tags: bool = False,
+                               line_by_line: bool = False) -> list:
+        """Convert the result of `extract_area_words_many` for a single
+            area into words (or tags)"""
+        words = self.line_words
+        if return_tags:
+            def convert(idx):
+                return self.word_to_extraction_tag(words[idx])
+        else:
+            def convert(idx):
+                return words[idx]
+        if line_by_line:
+            return [[convert(idx) for idx in line] for line in indices]
+        return [convert(idx) for idx in indices]
+
+    def extract_area_words_many(self, areas: Sequence[dict],
+                                threshold: float = 0.5,
+                                line_by_line: bool = False,
+                                chunk_size: int = 256) -> List[list]:
+        """Finds the words on the page which are included in each of
+            the given areas, in a single vectorized pass over the words.
+
+        :param areas: Sequence of dictionaries with the `left`, `right`,
+            `top` and `bottom` coordinates (in pixels) of each area
+        :param threshold: Threshold value as a fraction
+            (value between 0 and 1), default value is 0.5
+        :param line_by_line: if True, returns a list of lists for each area,
+            where each nested list is a line
+        :param chunk_size: Maximum number of areas processed at once,
+            limits the memory used for the intermediate arrays
+        :return: List with an item for each area, which is the list of
+            the indices of the matched words in `line_words`
+            (or a list of such lists for each line, if `line_by_line`)
+        """
+        if not 0 <= threshold <= 1:
+            raise ValueError('Value of threshold must be between 0 and 1')
+        for area in areas:
+            self._validate_box_coordinates(
+                left=area['left'], right=area['right'],
+                top=area['top'], bottom=area['bottom'])
+        words, coords, line_ids = self._get_line_words()
+        area_coords = np.array(
+            [(area['left'], area['right'], area['top'], area['bottom'])
+             for area in areas], dtype=float).reshape(-1, 4)
+        word_area = ((coords[:, 1] - coords[:, 0])
+                     * (coords[:, 3] - coords[:, 2]))
+        line_starts = np.searchsorted(line_ids, np.arange(len(self.lines)))
+        res = []
+        for start in range(0, len(area_coords), chunk_size):
+            chunk = area_coords[start:start + chunk_size]
+            overlaps = ((coords[None, :, 0] < chunk[:, None, 1])
+                        & (coords[None, :, 1] > chunk[:, None, 0])
+                        & (coords[None, :, 2] < chunk[:, None, 3])
+                        & (coords[None, :, 3] > chunk[:, None, 2]))
+            intersection = (
+                (np.minimum(chunk[:, None, 1], coords[None, :, 1])
+                 - np.maximum(chunk[:, None, 0], coords[None, :, 0]))
+                * (np.minimum(chunk[:, None, 3], coords[None, :, 3])
+                   - np.maximum(chunk[:, None, 2], coords[None, :, 2])))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                matches = overlaps & (intersection / word_area > threshold)
+            for area_matches in matches:
+                indices = np.flatnonzero(area_matches)
+                if line_by_line:
+                    # A page without lines has no line to split into
+                    res.append([line.tolist() for line in np.split(
+                        indices, np.searchsorted(indices, line_starts[1:]))]
+                        if len(line_starts) else [])
+                else:
+                    res.append(indices.tolist())
+        return res
 
     def extract_area_words(self, left: [int, float],
                            right: [int, float],
@@ -489,39 +728,11 @@ class Page:
         :return: list of words, each element in the list is dictionary
             representing the coordinates, ocr_text of word, and word_id_number
         """
-        if not 0 <= threshold <= 1:
-            raise ValueError('Value of threshold must be between 0 and 1')
-        self._validate_box_coordinates(
-            left=left, right=right, top=top, bottom=bottom)
-        word_list = []
-        for line in self.lines:
-            line_list = []
-            for word in line:
-                if intersects(word,
-                              left=left,
-                              right=right,
-                              top=top,
-                              bottom=bottom):
-                    intersect_area = compute_intersection_area(
-                        word,
-                        left=left,
-                        right=right,
-                        top=top,
-                        bottom=bottom)
-                    word_area = (word['right'] - word['left']
-                                 ) * (word['bottom'] - word['top'])
-                    ratio = float(intersect_area / word_area)
-                    if ratio > threshold:
-                        if return_tags:
-                            line_list.append(
-                                self.word_to_extraction_tag(word))
-                        else:
-                            line_list.append(word)
-            if line_by_line:
-                word_list.append(line_list)
-            else:
-                word_list.extend(line_list)
-        return word_list
+        indices = self.extract_area_words_many(
+            areas=[dict(left=left, right=right, top=top, bottom=bottom)],
+            threshold=threshold, line_by_line=line_by_line)[0]
+        return self._line_words_by_indices(indices, return_tags=return_tags,
+                                           line_by_line=line_by_line)
 
     @staticmethod
     @module_not_found()
@@ -545,12 +756,16 @@ class Page:
         """
         if img is None:
             img = self.image_arr.copy()
-        for word in self.ocr['words']:
+        words = self.ocr_words
+        for left, right, top, bottom in zip(words.left.tolist(),
+                                            words.right.tolist(),
+                                            words.top.tolist(),
+                                            words.bottom.tolist()):
             img = self.draw_rectangle(img=img,
-                                      left=word['left'],
-                                      right=word['right'],
-                                      top=word['top'],
-                                      bottom=word['bottom'])
+                                      left=left,
+                                      right=right,
+                                      top=top,
+                                      bottom=bottom)
 
         return img
 
@@ -568,9 +783,11 @@ class Page:
 
         if img is None:
             img = self.image_arr.copy()
-        for word in self.ocr['words']:
-            img = cv2.putText(img=img, text=word['ocr_text'],
-                              org=(word['left'], word['top'] - 1),
+        words = self.ocr_words
+        for text, left, top in zip(words.texts, words.left.tolist(),
+                                   words.top.tolist()):
+            img = cv2.putText(img=img, text=text,
+                              org=(left, top - 1),
                               fontFace=cv2.FONT_HERSHEY_PLAIN,
                               fontScale=1.0, color=50, thickness=1)
         return img
@@ -0,0 +1,78 @@
+"""Defines PageText, the text of a page with the character offsets
+of its words, used for regex search"""
+import re
+from typing import Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+WORD_SEPARATOR = ' '
+LINE_SEPARATOR = '\n'
+
+
+class PageText:
+    """Text of the lines of a page (the `ocr_text` of the words joined
+        with spaces, and the lines joined with newlines, as in
+        `Page.free_form_text`) and the character offsets of each word
+        in the text.
+    """
+
+    def __init__(self, lines: Sequence[Sequence[dict]]):
+        """
+
+        :param lines: Lines of words in the dictionary format of `Page.ocr`
+        """
+        self._words = [word for line in lines for word in line]
+        self._text = LINE_SEPARATOR.join(
+            WORD_SEPARATOR.join(word['ocr_text'] for word in line)
+            for line in lines)
+        lengths = np.array([len(word['ocr_text']) for word in self._words],
+                           dtype=np.int64)
+        # Every word is followed by a single separator character
+        self._starts = np.cumsum(lengths + 1) - (lengths + 1)
+        self._ends = self._starts + lengths
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def words(self) -> List[dict]:
+        return self._words
+
+    @property
+    def starts(self) -> np.ndarray:
+        """Offset of the first character of each word in `text`"""
+        return self._starts
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Offset after the last character of each word in `text`"""
+        return self._ends
+
+    def word_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Range of the positions of the words, which overlap the
+            characters from `start` to `end` of the text. The range is
+            empty if only separators are covered"""
+        first = int(np.searchsorted(self._ends, start, side='right'))
+        last = int(np.searchsorted(self._starts, end, side='left'))
+        return first, max(first, last)
+
+    def finditer(self, pattern: Union[str, re.Pattern], flags: int = 0
+                 ) -> Iterator[Tuple[re.Match, List[int]]]:
+        """Find the matches of the pattern in the text
+
+        :param pattern: Regex pattern or a compiled pattern
+        :param flags: Flags for compiling the pattern (if not compiled)
+        :return: Iterator of the matches, which cover at least one
+            character of a word, and the positions of the words they cover.
+            Empty matches (e.g. of `\\d*`, `\\B` or lookaheads) cover
+            no characters and are skipped
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, flags)
+        for match in pattern.finditer(self._text):
+            if match.start() == match.end():
+                continue
+            first, last = self.word_range(*match.span())
+            if first < last:
+                yield match, list(range(first, last))
@@ -1,21 +1,66 @@
+import copy
 import logging
 import os
-from typing import Mapping, Tuple
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait)
+from typing import (
+    Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple)
 
-from pycognaize.common.enums import EnvConfigEnum, HASH_FILE
+from pycognaize.common.enums import (
+    EnvConfigEnum, StorageEnum, TEXT_INDEX_FILE)
 from pycognaize.common.exceptions import AuthenthicationError
-from pycognaize.common.lazy_dict import LazyDocumentDict
-from pycognaize.common.utils import directory_summary_hash
-from pycognaize.document.snapshot_downloader import SnapshotDownloader
+from pycognaize.common.lazy_dict import (
+    LazyDocumentDict, build_documents_manifest, read_document,
+    update_documents_manifest)
+from pycognaize.common.file_hashes import (
+    VerificationResult, update_hash_manifest, verify_hash_manifest)
+from pycognaize.document import Document
+from pycognaize.document.snapshot_downloader import (
+    DownloadProgress, SnapshotDownloader)
+from pycognaize.document.text_index import SnapshotTextIndex
 from pycognaize.login import Login
 
+# Location of the documents read by the worker processes of
+# `Snapshot.iter_documents`, set once per process by `_init_worker`
+_worker_location: Optional[dict] = None
+
+
+def _init_worker(doc_path: str, data_path: str, lazy_fields: bool,
+                 storage_config: Optional[dict]) -> None:
+    global _worker_location
+    _worker_location = dict(doc_path=doc_path, data_path=data_path,
+                            lazy_fields=lazy_fields,
+                            storage_config=storage_config)
+
+
+def _read_worker_document(doc_id: str) -> Optional[Document]:
+    """Read a document in a worker process. Only the id is sent
+        to the process with each task"""
+    return read_document(doc_id, **_worker_location)[0]
+
 
 class Snapshot:
     """A snapshot of annotated documents from one or more collections"""
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, lazy_fields: bool = False,
+                 cache_entries: Optional[int] = None,
+                 cache_bytes: Optional[int] = None):
+        """
+
+        :param path: Path of the snapshot
+        :param lazy_fields: If True, the fields of the documents are
+            constructed on their first access (see `Document.from_dict`)
+        :param cache_entries: Maximum number of the last used documents
+            kept in memory (see `LazyDocumentDict`)
+        :param cache_bytes: Maximum total JSON size of the last used
+            documents kept in memory
+        """
         self._path = path
-        self._documents = LazyDocumentDict(doc_path=path, data_path=path)
+        self._documents = LazyDocumentDict(doc_path=path, data_path=path,
+                                           lazy_fields=lazy_fields,
+                                           cache_entries=cache_entries,
+                                           cache_bytes=cache_bytes)
 
     @property
     def documents(self) -> Mapping:
@@ -24,6 +69,119 @@ class Snapshot:
         """
         return self._documents
 
+    def subset(self, ids: Iterable[str]) -> 'Snapshot':
+        """View of the snapshot with only the given documents
+
+        :param ids: Ids of the documents
+        :return: Snapshot, which shares the path (and the document cache)
+            of this snapshot
+        """
+        snapshot = copy.copy(self)
+        snapshot._documents = self._documents.subset(ids)
+        return snapshot
+
+    def shard(self, index: int, count: int) -> 'Snapshot':
+        """View of the snapshot with the documents of one shard. Documents
+            are assigned to shards by the hash of their id, so the shards
+            are disjoint and stable across processes and machines
+
+        :param index: Index of the shard, from 0 to `count - 1`
+        :param count: Number of shards
+        :return: Snapshot with the documents of the shard
+        """
+        snapshot = copy.copy(self)
+        snapshot._documents = self._documents.shard(index, count)
+        return snapshot
+
+    def iter_documents(self,
+                       workers: int = 4,
+                       prefetch: Optional[int] = None,
+                       ids: Optional[Iterable[str]] = None,
+                       ordered: bool = True,
+                       processes: bool = False
+                       ) -> Iterator[Tuple[str, Optional[Document]]]:
+        """Iterate over the documents, which are read and parsed
+            concurrently while the consumer works on the earlier ones
+
+        :param workers: Number of documents parsed at once
+        :param prefetch: Maximum number of documents which are parsed
+            (or being parsed) ahead of the consumer, `2 * workers` by
+            default. Bounds the memory used by the iterator
+        :param ids: Ids of the documents to iterate over,
+            all documents by default
+        :param ordered: If True, the documents are yielded in the order of
+            the ids, otherwise in the order they are parsed
+        :param processes: If True, a process pool is used instead of
+            a thread pool, which parses the documents on multiple cores.
+            The processes receive the location of the snapshot once and
+            only the id of the document with each task, the document
+            cache of the snapshot is not used
+        :return: Iterator of document ids and documents (None if the
+            document failed to load, see `LazyDocumentDict`)
+        """
+        if workers <= 0:
+            raise ValueError(f"`workers` should be positive, got {workers}")
+        if prefetch is None:
+            prefetch = 2 * workers
+        if prefetch <= 0:
+            raise ValueError(
+                f"`prefetch` should be positive, got {prefetch}")
+        ids = iter(self._documents if ids is None else ids)
+        if processes:
+            documents = self._documents
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(documents.doc_path, documents.data_path,
+                          documents.lazy_fields, documents.storage_config))
+            read = _read_worker_document
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            read = self._documents.__getitem__
+        try:
+            if ordered:
+                yield from self._iter_ordered(executor, read, ids, prefetch)
+            else:
+                yield from self._iter_unordered(executor, read, ids,
+                                                prefetch)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _iter_ordered(executor: Executor,
+                      read: Callable[[str], Optional[Document]],
+                      ids: Iterator[str], prefetch: int
+                      ) -> Iterator[Tuple[str, Optional[Document]]]:
+        pending = deque()
+        for doc_id in ids:
+            pending.append((doc_id, executor.submit(read, doc_id)))
+            if len(pending) >= prefetch:
+                doc_id, future = pending.popleft()
+                yield doc_id, future.result()
+        while pending:
+            doc_id, future = pending.popleft()
+            yield doc_id, future.result()
+
+    @staticmethod
+    def _iter_unordered(executor: Executor,
+                        read: Callable[[str], Optional[Document]],
+                        ids: Iterator[str], prefetch: int
+                        ) -> Iterator[Tuple[str, Optional[Document]]]:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < prefetch:
+                doc_id = next(ids, None)
+                if doc_id is None:
+                    exhausted = True
+                    break
+                future = executor.submit(read, doc_id)
+                pending[future] = doc_id
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
     @classmethod
     def get_by_id(cls, snapshot_id: str) -> 'Snapshot':
         """Returns the Snapshot Object"""
@@ -45,9 +203,25 @@ class Snapshot:
                  exclude_pdf: bool = False,
                  exclude_html: bool = False,
                  require_login: bool = True,
-                 snapshot_root: str = None
+                 snapshot_root: str = None,
+                 max_workers: int = 8,
+                 progress_callback: Optional[
+                     Callable[[DownloadProgress], None]] = None,
+                 sync: bool = False,
+                 document_ids: Optional[Iterable[str]] = None
                  ) -> Tuple['Snapshot', str]:
-        """Downloads snapshot to specified destination"""
+        """Downloads snapshot to specified destination
+
+        :param max_workers: Number of files downloaded concurrently
+        :param progress_callback: Optional function, which is called with
+            the `DownloadProgress` after each downloaded or skipped file
+        :param sync: If True, only the files which are missing or changed
+            since the last sync to the destination are downloaded.
+            An interrupted sync can be restarted without fetching
+            the files it already downloaded again
+        :param document_ids: If provided, only these documents are
+            downloaded (e.g. the ids of a shard, see `document_shard`)
+        """
         if require_login:
             if snapshot_root is not None:
                 raise ValueError("If the require_login is True, "
@@ -69,11 +243,16 @@ class Snapshot:
             exclude_pdf=exclude_pdf,
             exclude_html=exclude_html
         )
-        downloader = SnapshotDownloader()
-        downloader.download(snapshot_path, destination_dir, exclude)
-        summary_hash = directory_summary_hash(destination_dir)
-        with open(os.path.join(destination_dir, HASH_FILE), 'w') as f:
-            f.write(summary_hash)
+        downloader = SnapshotDownloader(max_workers=max_workers,
+                                        progress_callback=progress_callback)
+        progress = downloader.download(snapshot_path, destination_dir,
+                                       exclude, sync=sync,
+                                       document_ids=document_ids)
+        cls._update_manifests(destination_dir, downloader.written_files)
+        logging.info(f"Snapshot {snapshot_id}: "
+                     f"{progress.files_downloaded} files "
+                     f"({progress.bytes_downloaded} bytes) downloaded, "
+                     f"{progress.files_skipped} unchanged files skipped")
         logging.info(f"Snapshot {snapshot_id} downloaded to "
                      f"{destination_dir}. To use the snapshot, check our "
                      f"documentation at: "
@@ -83,6 +262,90 @@ class Snapshot:
         return cls(path=snapshot_path), \
             os.path.join(destination_dir, snapshot_id)
 
+    @staticmethod
+    def _update_manifests(destination_dir: str,
+                          written_files: Iterable[str]) -> None:
+        """Update the documents and hash manifests of a downloaded
+            snapshot only for the written files, so an incremental sync
+            does not read the whole snapshot again"""
+        rel_paths = [os.path.relpath(path, destination_dir)
+                     for path in written_files]
+        doc_ids = [os.path.dirname(rel_path) for rel_path in rel_paths
+                   if os.path.basename(rel_path)
+                   == StorageEnum.doc_file.value]
+        update_documents_manifest(destination_dir, doc_ids)
+        update_hash_manifest(destination_dir, rel_paths)
+
+    def build_manifest(self, max_workers: Optional[int] = None
+                       ) -> Dict[str, dict]:
+        """Write the manifest of the document ids, sizes and page counts
+            of the snapshot, which is loaded by `LazyDocumentDict`
+            instead of checking every document directory
+
+        :param max_workers: Number of documents read at once
+        :return: Mapping of the document ids to the size (in bytes)
+            and number of pages of the documents
+        """
+        return build_documents_manifest(
+            self._path, storage_config=Login().storage_config,
+            max_workers=max_workers)
+
+    def build_text_index(self, max_workers: Optional[int] = None
+                         ) -> SnapshotTextIndex:
+        """Build the inverted index of the OCR words of the snapshot and
+            write it to the snapshot directory (see `SnapshotTextIndex`)
+
+        :param max_workers: Number of pages read at once
+        :return: `SnapshotTextIndex` object
+        """
+        storage_config = Login().storage_config
+        index = SnapshotTextIndex.build(self._path,
+                                        storage_config=storage_config,
+                                        max_workers=max_workers)
+        index.save(os.path.join(self._path, TEXT_INDEX_FILE),
+                   storage_config=storage_config)
+        return index
+
+    def load_text_index(self, rebuild: bool = False,
+                        max_workers: Optional[int] = None
+                        ) -> SnapshotTextIndex:
+        """Read the inverted index written by `build_text_index`. If the
+            snapshot changed since the index was built (e.g. by a sync),
+            a warning is logged, or the index is rebuilt
+
+        :param rebuild: If True, a stale index is rebuilt
+        :param max_workers: Number of pages read at once, if rebuilt
+        :return: `SnapshotTextIndex` object
+        """
+        storage_config = Login().storage_config
+        index = SnapshotTextIndex.load(
+            os.path.join(self._path, TEXT_INDEX_FILE),
+            storage_config=storage_config)
+        if not index.is_stale(self._path, storage_config=storage_config):
+            return index
+        if rebuild:
+            return self.build_text_index(max_workers=max_workers)
+        logging.warning(f'The text index of the snapshot {self._path} is '
+                        f'stale, rebuild it with `build_text_index`')
+        return index
+
+    def verify(self, max_workers: Optional[int] = None,
+               full: bool = False) -> VerificationResult:
+        """Verify the files of a downloaded snapshot against the content
+            hashes, which were computed by `Snapshot.download`
+
+        :param max_workers: Number of files hashed concurrently
+        :param full: If True, all files are hashed again. Otherwise, only
+            the files whose size or modification time changed are checked
+        :return: `VerificationResult` with the modified, missing
+            and added files
+        """
+        if not os.path.isdir(self._path):
+            raise ValueError(
+                f"Only local snapshots can be verified, got {self._path}")
+        return verify_hash_manifest(self._path, max_workers=max_workers,
+                                    full=full)
+
     @classmethod
     def _snapshot_path(cls) -> str:
         """Identify and return the snapshot path"""
@@ -1,21 +1,63 @@
+import contextlib
 import fnmatch
+import json
 import logging
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path, PurePath
+from typing import Callable, Dict, Iterable, List, Optional
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from botocore.paginate import Paginator
 
+from ..common.enums import SYNC_MANIFEST_FILE
 from ..login import Login
 
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class DownloadProgress:
+    """Progress of a snapshot download. Skipped files are the unchanged
+        files of a sync"""
+    files_downloaded: int = 0
+    bytes_downloaded: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    elapsed: float = 0.0
+    key: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Average download throughput"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_downloaded / self.elapsed
+
 
 class SnapshotDownloader:
     """
         A class for downloading snapshots from an S3 bucket to a
         local destination.
 
+        Objects are downloaded by `max_workers` threads and streamed to
+        the disk in chunks of `chunk_size` bytes. If provided,
+        `progress_callback` is called with a `DownloadProgress` after each
+        downloaded or skipped file (from the worker threads, one call
+        at a time).
+
+        In the sync mode, the key, size and ETag of every downloaded object
+        are appended to a manifest in the destination directory
+        (`SYNC_MANIFEST_FILE`), and objects which are unchanged since they
+        were downloaded are skipped. An interrupted sync can be restarted,
+        and only fetches the objects which are missing or changed.
+
         Attributes:
             PREFIX (str): The prefix used to indicate S3 paths,
             which is 's3://'.
@@ -30,7 +72,7 @@ class SnapshotDownloader:
             _get_parts_from_path(path):
                 Extracts the bucket name and path from an S3 path.
             _init_s3_objects():
-                Initializes the S3 client and resource objects.
+                Initializes the S3 client object.
             _get_page_iterator(bucket_name, continue_token,
             paginator, path_without_bucket):
                 Returns an iterator for paginating through S3 bucket contents.
@@ -43,8 +85,23 @@ class SnapshotDownloader:
             _copy_objects_from_page(bucket_name, exclude,
              page, snapshot_path, destination_path):
                 Copies objects from an S3 page to the destination.
-            _copy_file_to_dest(s3_object, snapshot_path, destination_path):
-                Copies a single S3 object to the destination.
+            _copy_file_to_dest(bucket_name, key, snapshot_path,
+            destination_path):
+                Streams a single S3 object to the destination.
+            _get_object(bucket_name, key):
+                Returns the response for an S3 object with a streaming body.
+            _list_prefix(bucket_name, prefix):
+                Lists all objects with the given prefix.
+            _download_documents(bucket_name, path_without_bucket,
+            document_ids, exclude, include, snapshot_path,
+            destination_path):
+                Copies the objects of the given documents.
+            _is_unchanged(obj, path):
+                Determines if a synced object is unchanged.
+            _open_manifest(destination_path) / _close_manifest():
+                Loads and saves the sync manifest.
+            _write_chunks(path, chunks):
+                Writes chunks of file data to a local path.
             _write_file(path, file_data):
                 Writes file data to a local path.
             _should_exclude(file_path, exclude):
@@ -52,6 +109,43 @@ class SnapshotDownloader:
         """
 
     PREFIX = 's3://'
+    TMP_PREFIX = '.tmp-'
+    # Number of documents listed before their objects are copied
+    DOCUMENTS_BATCH_SIZE = 100
+
+    def __init__(
+            self,
+            max_workers: int = 1,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            progress_callback: Optional[
+                Callable[[DownloadProgress], None]] = None
+    ):
+        """
+
+        :param max_workers: Number of objects downloaded concurrently
+        :param chunk_size: Size of the chunks (in bytes), in which the
+            objects are written to the disk
+        :param progress_callback: Optional function, which is called with
+            the `DownloadProgress` after each downloaded file
+        """
+        if max_workers <= 0:
+            raise ValueError(
+                f"`max_workers` should be positive, got {max_workers}")
+        if chunk_size <= 0:
+            raise ValueError(
+                f"`chunk_size` should be positive, got {chunk_size}")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self._client = None
+        self._credentials_version = 0
+        self._relogin_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._progress = DownloadProgress()
+        self._written_files: List[str] = []
+        self._start_time = time.monotonic()
+        self._manifest: Optional[Dict[str, dict]] = None
+        self._manifest_file = None
 
     def _get_parts_from_path(self, path: str):
         """
@@ -82,13 +176,14 @@ class SnapshotDownloader:
 
     def _init_s3_objects(self):
         """
-        Initializes the AWS S3 client and resource objects
+        Initializes the AWS S3 client object
          for interacting with S3.
 
-        This method sets up the AWS S3 client and resource
-         objects using the AWS credentials
+        This method sets up the AWS S3 client
+         object using the AWS credentials
         obtained from the `Login` class. It also configures
-         the client with retry settings.
+         the client with retry settings and a connection pool
+         for `max_workers` concurrent downloads.
 
         Note:
             This method should be called before performing any
@@ -105,13 +200,16 @@ class SnapshotDownloader:
             login.aws_session_token
         )
 
-        client_config = Config(retries={
-            'max_attempts': 5,
-            'mode': 'standard'
-        })
+        client_config = Config(
+            retries={
+                'max_attempts': 5,
+                'mode': 'standard'
+            },
+            max_pool_connections=max(10, self.max_workers)
+        )
 
         self._client = session.client('s3', config=client_config)
-        self._s3 = session.resource('s3', config=client_config)
+        self._credentials_version += 1
 
     def _get_page_iterator(
             self,
@@ -208,8 +306,8 @@ class SnapshotDownloader:
         Performs reauthentication to refresh AWS credentials.
 
         This method reauthenticates to AWS to refresh the
-        AWS credentials used by the S3 client and resource
-        objects. It utilizes the `Login` class to obtain
+        AWS credentials used by the S3 client
+        object. It utilizes the `Login` class to obtain
          updated AWS credentials.
 
         Note:
@@ -220,7 +318,7 @@ class SnapshotDownloader:
         Raises:
             None
         """
-        print('Relogin called')
+        logging.info('Relogin called')
         login = Login()
         login.relogin()
         self._init_s3_objects()
@@ -259,7 +357,8 @@ class SnapshotDownloader:
 
         This method copies each object from the S3 page to the
          destination path, excluding objects based on
-        the patterns provided in the 'exclude' list.
+        the patterns provided in the 'exclude' list. With more than
+        one worker, the objects are copied concurrently.
 
         Raises:
             None
@@ -267,104 +366,380 @@ class SnapshotDownloader:
         if 'Contents' not in page:
             return
 
+        keys = []
         for obj in page['Contents']:
-            s3_object = self._s3.Object(bucket_name, obj['Key'])
-
-            if (self._matches_patterns(s3_object.key, exclude)
-                    and not self._matches_patterns(s3_object.key, include)):
+            key = obj['Key']
+            if (self._matches_patterns(key, exclude)
+                    and not self._matches_patterns(key, include)):
+                continue
+            path = self._destination_file(
+                bucket_name, key, snapshot_path, destination_path)
+            if self._is_unchanged(obj, path):
+                self._report_progress(key, obj['Size'], skipped=True)
                 continue
+            keys.append(key)
+
+        if self.max_workers == 1:
+            for key in keys:
+                self._copy_file_to_dest(
+                    bucket_name, key, snapshot_path, destination_path)
+            return
 
-            self._copy_file_to_dest(s3_object, snapshot_path, destination_path)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = [executor.submit(self._copy_file_to_dest, bucket_name,
+                                       key, snapshot_path, destination_path)
+                       for key in keys]
+            for future in futures:
+                future.result()
+        finally:
+            # On failure, the objects which are not started yet are skipped
+            executor.shutdown(wait=True, cancel_futures=True)
 
     def _copy_file_to_dest(
             self,
-            s3_object, snapshot_path, destination_path):
+            bucket_name: str,
+            key: str,
+            snapshot_path: str,
+            destination_path: Path
+    ):
         """
-        Copies a single S3 object to the local destination path.
+        Streams a single S3 object to the local destination path.
 
         This method copies a single S3 object to the
-        specified local destination path. It also handles
-        reauthentication if an 'ExpiredToken' error is
-        encountered while accessing the S3 object.
+        specified local destination path, writing the body
+        in chunks of `chunk_size` bytes, and reports the progress.
 
         Args:
-            s3_object (boto3.resources.factory.s3.Object):
-            The S3 object to copy.
+            bucket_name (str): The name of the S3 bucket.
+            key (str): The key of the S3 object to copy.
             snapshot_path (str): The original S3 snapshot path.
             destination_path (Path): The local destination path.
 
         Returns:
             None
 
-        This method copies the S3 object to the destination path, and in
-         case of an 'ExpiredToken' error,
-        it reauthenticates to AWS and retries the copy operation.
-
         Raises:
             None
         """
+        logging.debug(f'Copying: {key} to {destination_path}.')
 
-        bucket_name = s3_object.bucket_name
+        response = self._get_object(bucket_name, key)
+        body = response['Body']
+        path = self._destination_file(
+            bucket_name, key, snapshot_path, destination_path)
+        try:
+            size = self._write_chunks(path, body.iter_chunks(self.chunk_size))
+        finally:
+            body.close()
 
-        object_full_path = f's3://{str(bucket_name / PurePath(s3_object.key))}'
+        if size is None:
+            return
+        self._record(key, size, response.get('ETag'))
+        self._report_progress(key, size, path=path)
 
-        print(f'Copying: {object_full_path} to {destination_path}.')
+        logging.debug(f'Copied: {key} to {destination_path}.')
 
+    def _destination_file(
+            self,
+            bucket_name: str,
+            key: str,
+            snapshot_path: str,
+            destination_path: Path
+    ) -> str:
+        """Local path of an S3 object of the snapshot"""
+        object_full_path = f's3://{str(bucket_name / PurePath(key))}'
         object_relative_path = (
             PurePath(object_full_path).relative_to(snapshot_path))
+        return str(destination_path / object_relative_path)
+
+    def _get_object(self, bucket_name: str, key: str) -> dict:
+        """
+        Returns the response for an S3 object with a streaming body.
+
+        In case of an 'ExpiredToken' error, it reauthenticates
+        to AWS and retries the request. When several threads
+        encounter the error, only the first one reauthenticates.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            key (str): The key of the S3 object.
 
+        Returns:
+            dict: The `get_object` response, including the `Body`
+            (botocore.response.StreamingBody) and the `ETag`.
+
+        Raises:
+            ClientError: If the request fails for another reason.
+        """
+        return self._call_client('get_object', Bucket=bucket_name, Key=key)
+
+    def _call_client(self, method: str, **kwargs) -> dict:
+        """Call a method of the S3 client, reauthenticating once
+            in case of an 'ExpiredToken' error"""
+        credentials_version = self._credentials_version
         try:
-            file_data = s3_object.get()['Body'].read()
+            return getattr(self._client, method)(**kwargs)
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ExpiredToken':
+            if e.response['Error']['Code'] != 'ExpiredToken':
+                raise
+        with self._relogin_lock:
+            if self._credentials_version == credentials_version:
                 self._relogin()
-                s3_object = self._s3.Object(bucket_name, s3_object.key)
-                file_data = s3_object.get()['Body'].read()
+        return getattr(self._client, method)(**kwargs)
+
+    def _list_prefix(self, bucket_name: str, prefix: str) -> list:
+        """
+        Lists all objects with the given prefix.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            prefix (str): The prefix of the object keys.
+
+        Returns:
+            list: The objects (with the `Key`, `Size` and `ETag`)
+            of all pages of the listing.
+
+        Raises:
+            None
+        """
+        objects = []
+        kwargs = dict(Bucket=bucket_name, Prefix=prefix)
+        while True:
+            page = self._call_client('list_objects_v2', **kwargs)
+            objects.extend(page.get('Contents', []))
+            if not page.get('NextContinuationToken'):
+                return objects
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+    def _download_documents(
+            self,
+            bucket_name: str,
+            path_without_bucket: str,
+            document_ids: list,
+            exclude: list,
+            include: list,
+            snapshot_path: str,
+            destination_path: Path
+    ):
+        """
+        Copies the objects of the given documents of the snapshot.
+
+        The prefixes of the documents are listed concurrently, and the
+        objects of each batch of documents are copied as a single page.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            path_without_bucket (str): The path of the snapshot
+                within the S3 bucket.
+            document_ids (list): The ids of the documents to copy.
+            exclude (list): A list of file path patterns to
+                exclude from copying.
+            include (list): A list of file path patterns to
+                include even if excluded.
+            snapshot_path (str): The original S3 snapshot path.
+            destination_path (Path): The local destination path.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+        prefixes = [f'{path_without_bucket}/{document_id}/'
+                    for document_id in document_ids]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(prefixes), self.DOCUMENTS_BATCH_SIZE):
+                batch = prefixes[start:start + self.DOCUMENTS_BATCH_SIZE]
+                contents = [obj for objects in executor.map(
+                    lambda prefix: self._list_prefix(bucket_name, prefix),
+                    batch) for obj in objects]
+                self._copy_objects_from_page(
+                    bucket_name, exclude, include, {'Contents': contents},
+                    snapshot_path, destination_path)
+
+    @property
+    def written_files(self) -> List[str]:
+        """Local paths of the files written by the last download"""
+        with self._progress_lock:
+            return list(self._written_files)
+
+    def _report_progress(self, key: str, size: int, skipped: bool = False,
+                         path: Optional[str] = None):
+        """Update the download progress with a downloaded (or skipped) file
+            and pass it to the progress callback"""
+        with self._progress_lock:
+            if skipped:
+                self._progress.files_skipped += 1
+                self._progress.bytes_skipped += size
             else:
-                raise
+                self._progress.files_downloaded += 1
+                self._progress.bytes_downloaded += size
+                if path is not None:
+                    self._written_files.append(path)
+            self._progress.elapsed = time.monotonic() - self._start_time
+            self._progress.key = key
+            if self.progress_callback is not None:
+                self.progress_callback(replace(self._progress))
+
+    def _is_unchanged(self, obj: dict, path: str) -> bool:
+        """
+        Determines if a listed S3 object is unchanged since it was synced.
 
-        new_file_path = str(destination_path / object_relative_path)
+        Args:
+            obj (dict): The object from the `Contents` of a listed page,
+                with the `Key`, `Size` and `ETag`.
+            path (str): The local path of the object.
 
-        self._write_file(new_file_path, file_data)
+        Returns:
+            bool: True in the sync mode, if the manifest entry of the
+            object has the same size and ETag, and the local file
+            has the same size, False otherwise.
 
-        print(f'Copied: {object_full_path} to {destination_path}.')
+        Raises:
+            None
+        """
+        if self._manifest is None:
+            return False
+        entry = self._manifest.get(obj['Key'])
+        if (entry is None or entry['size'] != obj['Size']
+                or entry['etag'] != obj.get('ETag')):
+            return False
+        try:
+            return os.path.getsize(path) == obj['Size']
+        except OSError:
+            return False
 
-    def _write_file(self, path, file_data):
+    def _record(self, key: str, size: int, etag: Optional[str]):
+        """Append a downloaded object to the manifest in the sync mode"""
+        if self._manifest_file is None:
+            return
+        entry = dict(key=key, size=size, etag=etag)
+        with self._progress_lock:
+            self._manifest[key] = entry
+            self._manifest_file.write(json.dumps(entry) + '\n')
+            self._manifest_file.flush()
+
+    @staticmethod
+    def _load_manifest(path: Path) -> Dict[str, dict]:
+        """Read the entries of a manifest by key. Lines which are not
+            valid (e.g. of an interrupted write) are ignored"""
+        manifest = {}
+        if not path.is_file():
+            return manifest
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    manifest[entry['key']] = entry
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return manifest
+
+    def _write_manifest(self, path: Path):
+        """Write the manifest with a single entry per key"""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent,
+                                        prefix=self.TMP_PREFIX)
+        with os.fdopen(fd, 'w') as f:
+            for entry in self._manifest.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, path)
+
+    def _open_manifest(self, destination_path: Path):
         """
-        Writes file data to a local path.
+        Loads the sync manifest of the destination path and opens it
+        for appending the entries of downloaded objects.
 
-        This method writes the provided file data to the
-        specified local path. It also ensures that the
-        necessary directories leading to the path exist,
-        and it handles potential conflicts gracefully.
+        The manifest is rewritten first, which drops the superseded entries
+        and the incomplete last line of an interrupted sync.
 
         Args:
-            path (str): The local path where the file data should be written.
-            file_data (bytes): The binary file data to be written.
+            destination_path (Path): The local destination path.
 
         Returns:
             None
 
-        This method creates any missing directories in the path
-        and writes the file data to the specified
-        location.
+        Raises:
+            None
+        """
+        path = destination_path / SYNC_MANIFEST_FILE
+        self._manifest = self._load_manifest(path)
+        destination_path.mkdir(parents=True, exist_ok=True)
+        self._write_manifest(path)
+        self._manifest_file = open(path, 'a')
+
+    def _close_manifest(self):
+        """Close the sync manifest and rewrite it
+            with a single entry per key"""
+        if self._manifest_file is not None:
+            self._manifest_file.close()
+            self._write_manifest(Path(self._manifest_file.name))
+        self._manifest_file = None
+        self._manifest = None
+
+    def _write_chunks(self, path: str,
+                      chunks: Iterable[bytes]) -> Optional[int]:
+        """
+        Writes chunks of file data to a local path.
+
+        This method writes the provided chunks to a temporary
+        file next to the specified local path and renames it,
+        so the path never contains a partially written file.
+        It also ensures that the necessary directories leading
+        to the path exist, and it handles potential conflicts
+        gracefully.
+
+        Args:
+            path (str): The local path where the file data should be written.
+            chunks (Iterable[bytes]): The binary file data to be written.
+
+        Returns:
+            Optional[int]: The number of written bytes,
+            None in case of a file/folder conflict.
 
         Raises:
             None
         """
+        directory = os.path.dirname(path)
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.makedirs(directory, exist_ok=True)
         except FileExistsError:
-            logging.info(f'File/folder conflict for '
-                         f'{os.path.dirname(path)} path')
+            logging.info(f'File/folder conflict for {directory} path')
             return None
 
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.TMP_PREFIX)
+        size = 0
         try:
-            with open(path, 'wb') as f:
-                f.write(file_data)
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
         except IsADirectoryError:
-            logging.info(f'File/folder conflict for '
-                         f'{os.path.dirname(path)} path')
+            logging.info(f'File/folder conflict for {directory} path')
+            os.remove(tmp_path)
+            return None
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return size
+
+    def _write_file(self, path, file_data):
+        """
+        Writes file data to a local path.
+
+        Args:
+            path (str): The local path where the file data should be written.
+            file_data (bytes): The binary file data to be written.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+        self._write_chunks(path, [file_data])
 
     def _matches_patterns(self, file_path: str,
                           patterns: list):
@@ -406,7 +781,9 @@ class SnapshotDownloader:
             destination_path: str,
             exclude=None,
             include=None,
-            continue_token: str = None
+            continue_token: str = None,
+            sync: bool = False,
+            document_ids: Optional[Iterable[str]] = None
     ):
         """
         Downloads snapshots from an S3 bucket to a local destination.
@@ -427,25 +804,35 @@ class SnapshotDownloader:
                 include even if excluded.
             continue_token (str, optional): An optional continuation token for
                 resuming downloads.
+            sync (bool, optional): If True, the objects which are unchanged
+                since the last sync to the destination are skipped,
+                and the downloaded objects are added to the manifest.
+            document_ids (Iterable[str], optional): If provided, only the
+                objects of these documents of the snapshot are downloaded.
 
         Returns:
-            None
+            DownloadProgress: The number of downloaded and skipped files
+            and bytes, and the elapsed time.
 
         This method initiates the download of snapshots from the specified
          S3 path to the local destination
         path. It handles pagination and reauthentication as needed.
-        Progress and status information is
-        printed during the download process.
+        Progress is reported to the `progress_callback`
+        during the download process.
 
         Note:
             - The 'snapshot_path' should start with 's3://'.
             - The 'destination_path' will be created if it doesn't exist.
 
         Raises:
-            ValueError: If 'snapshot_path' doesn't start with 's3://'.
+            ValueError: If 'snapshot_path' doesn't start with 's3://',
+            or both 'continue_token' and 'document_ids' are provided.
         """
         if not snapshot_path.startswith('s3://'):
             raise ValueError('Snapshot path should start with "s3://".')
+        if continue_token and document_ids is not None:
+            raise ValueError('The continuation token cannot be used '
+                             'with document ids.')
 
         destination_path = Path(destination_path)
 
@@ -454,7 +841,39 @@ class SnapshotDownloader:
         )
 
         self._init_s3_objects()
+        self._progress = DownloadProgress()
+        self._written_files = []
+        self._start_time = time.monotonic()
+
+        if sync:
+            self._open_manifest(destination_path)
+        try:
+            if document_ids is None:
+                self._download_pages(
+                    bucket_name, path_without_bucket, continue_token,
+                    exclude, include, snapshot_path, destination_path)
+            else:
+                self._download_documents(
+                    bucket_name, path_without_bucket, list(document_ids),
+                    exclude, include, snapshot_path, destination_path)
+        finally:
+            self._close_manifest()
 
+        self._progress.elapsed = time.monotonic() - self._start_time
+        return replace(self._progress)
+
+    def _download_pages(
+            self,
+            bucket_name: str,
+            path_without_bucket: str,
+            continue_token: Optional[str],
+            exclude: list,
+            include: list,
+            snapshot_path: str,
+            destination_path: Path
+    ):
+        """Copies the objects of all listed pages, reauthenticating
+            if the token expires during the listing"""
         paginator = self._client.get_paginator('list_objects_v2')
 
         page_iterator, pagination_config = self._get_page_iterator(
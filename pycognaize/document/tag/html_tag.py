@@ -1,5 +1,6 @@
 import abc
 import bson
+import numpy as np
 import pandas as pd
 import logging
 
@@ -52,7 +53,6 @@ class HTMLTableTag(HTMLTagABC):
         self._html = html
         self._source_ids = source_ids
         self._populate_cells()
-        self._build_df()
         self._raw_df = None
         self._df = None
 
@@ -187,22 +187,22 @@ class HTMLTableTag(HTMLTagABC):
             object with the html_id and values from the annotated
             document
         """
-        cols = set()
-        rows = set()
-        for cell_ in self.cells.values():
-            cols.add(cell_.col_index - 1)
-            rows.add(cell_.row_index - 1)
-        cols = list(cols)
-        rows = list(rows)
-        cols.sort()
-        rows.sort()
-        df = pd.DataFrame(columns=cols, index=rows)
+        rows = sorted({cell_.row_index - 1 for cell_ in self.cells.values()})
+        cols = sorted({cell_.col_index - 1 for cell_ in self.cells.values()})
+        # Spanned cells may reach rows and columns, in which no cell starts,
+        # these are added after the others, in the order they are reached
+        row_positions = {row: n for n, row in enumerate(rows)}
+        col_positions = {col: n for n, col in enumerate(cols)}
+        tags = {}
         for cell_ in self.cells.values():
             row_index = cell_.row_index - 1
             col_index = cell_.col_index - 1
             for col_n in range(col_index, col_index + cell_.col_span):
                 for row_n in range(row_index, row_index + cell_.row_span):
-                    df.loc[row_n, col_n] = HTMLTag(
+                    position = (
+                        row_positions.setdefault(row_n, len(row_positions)),
+                        col_positions.setdefault(col_n, len(col_positions)))
+                    tags[position] = HTMLTag(
                         is_table=False,
                         html_id=cell_.html_id,
                         xpath=cell_.xpath,
@@ -212,30 +212,36 @@ class HTMLTableTag(HTMLTagABC):
                         tag_id=self.tag_id,
                         row_index=row_index,
                         col_index=col_index)
-        df = self.replace_nans_with_empty_html_tags(df)
-        return df
+        grid = np.full((len(row_positions), len(col_positions)), None,
+                       dtype=object)
+        for position, tag in tags.items():
+            grid[position] = tag
+        rows, cols = list(row_positions), list(col_positions)
+        holes = grid == None  # noqa: E711
+        for row_n, col_n in zip(*np.nonzero(holes)):
+            grid[row_n, col_n] = empty_html_tag(row_index=rows[row_n],
+                                                col_index=cols[col_n])
+        self._log_empty_cells(int(holes.sum()))
+        return pd.DataFrame(grid, index=rows, columns=cols)
+
+    def _log_empty_cells(self, n_empty_cells: int) -> None:
+        if n_empty_cells:
+            logging.warning(
+                f'Build df issue: Replaced {n_empty_cells} empty cells '
+                f'with empty HTMLTag in HTMLTableTag with html id '
+                f'{self.html_id}')
 
     def replace_nans_with_empty_html_tags(self,
                                           df: pd.DataFrame) -> pd.DataFrame:
         """
-            Replaces NaN values in a DataFrame with empty HTML tags.
+            Replaces NaN values in a DataFrame (in place) with empty
+            HTML tags at the positions of the values.
         """
-        for col in df.columns:
-            for idx in df.index:
-                if pd.isna(df.loc[idx, col]):
-                    logging.warning(
-                        f'Build df issue: Replacing empty cell at {idx, col} '
-                        f'with empty HTMLTag in HTMLTableTag with html id '
-                        f'{self.html_id}')
-                    df.loc[idx, col] = HTMLTag(is_table=False,
-                                               html_id='',
-                                               xpath='',
-                                               raw_value='',
-                                               raw_ocr_value='',
-                                               field_id='',
-                                               tag_id='',
-                                               row_index=idx,
-                                               col_index=col)
+        holes = pd.isna(df.to_numpy(dtype=object))
+        for row_n, col_n in zip(*np.nonzero(holes)):
+            df.iat[row_n, col_n] = empty_html_tag(
+                row_index=df.index[row_n], col_index=df.columns[col_n])
+        self._log_empty_cells(int(holes.sum()))
         return df
 
 
@@ -434,3 +440,11 @@ class HTMLTag(HTMLTagABC):
             XBRLTagEnum.source.value: tag_info,
          }
         return output_dict
+
+
+def empty_html_tag(row_index: int, col_index: int) -> HTMLTag:
+    """Tag, which fills a position of `HTMLTableTag.raw_df`,
+        which is not covered by any cell"""
+    return HTMLTag(is_table=False, html_id='', xpath='', raw_value='',
+                   raw_ocr_value='', field_id='', tag_id='',
+                   row_index=row_index, col_index=col_index)
@@ -1,6 +1,7 @@
 import bson
 import string
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Tuple
 
@@ -31,8 +32,8 @@ class TableTag(BoxTag):
                          page=page)
         self._cell_data = cell_data
         self._cells = {}
+        self._cells_coordinates = None
         self._populate_cells()
-        self._build_df()
         self._raw_df = None
         self._df = None
 
@@ -58,6 +59,31 @@ class TableTag(BoxTag):
     def cells(self) -> dict:
         return self._cells
 
+    @property
+    def cells_coordinates(self) -> np.ndarray:
+        """Array of shape (n, 4), where each row contains the left, right,
+            top and bottom coordinates of a cell (in the order of `cells`)"""
+        if self._cells_coordinates is None:
+            self._cells_coordinates = self.coordinates_array(
+                list(self.cells.values()))
+        return self._cells_coordinates
+
+    def cells_iou(self, tag: BoxTag) -> np.ndarray:
+        """Intersection over Union of the given tag with each cell
+            of the table (in the order of `cells`)
+
+        :param tag: Input tag
+        :return: Array of IoU values, all values are zero
+            if the tag is on a different page
+        """
+        if tag.page.page_number != self.page.page_number:
+            return np.zeros(len(self.cells))
+        tag_coordinates = self.coordinates_array([tag])
+        intersection = self._intersection_areas(
+            tag_coordinates, self.cells_coordinates)[0]
+        union = tag.area + self._areas(self.cells_coordinates) - intersection
+        return intersection / union
+
     @property
     def raw_df(self) -> pd.DataFrame:
         if self._raw_df is None:
@@ -176,31 +202,26 @@ class TableTag(BoxTag):
             object with the coordinates and values from the annotated
             document.
         """
-        cols = set()
-        rows = set()
-        image_width = self.page.image_width
-        image_height = self.page.image_height
         region_in_pixels = dict(page=self.page)
-        if image_width > image_height:
-            image_width, image_height = image_height, image_width
-
-        for cell_ in self.cells.values():
-            cols.add(cell_.left)
-            rows.add(cell_.top)
-
-        cols = list(cols)
-        rows = list(rows)
-        cols.sort()
-        rows.sort()
+        if use_ocr_text:
+            # The page dimensions may require reading the page data,
+            # so they are only resolved when needed
+            image_width = self.page.image_width
+            image_height = self.page.image_height
+            if image_width > image_height:
+                image_width, image_height = image_height, image_width
 
-        headers_df = list(range(len(cols)))
-        indices_df = list(range(len(rows)))
-        df = pd.DataFrame(columns=headers_df, index=indices_df)
+        cols = sorted({cell_.left for cell_ in self.cells.values()})
+        rows = sorted({cell_.top for cell_ in self.cells.values()})
+        col_indices = {col: n for n, col in enumerate(cols)}
+        row_indices = {row: n for n, row in enumerate(rows)}
 
+        grid = np.full((len(rows), len(cols)), np.nan, dtype=object)
+        filled = np.zeros(grid.shape, dtype=bool)
         for cell_ in self.cells.values():
             text = cell_.value
-            top_index = rows.index(cell_.top)
-            left_index = cols.index(cell_.left)
+            top_index = row_indices[cell_.top]
+            left_index = col_indices[cell_.left]
             for col_n in range(left_index, left_index + cell_.col_span):
                 for row_n in range(top_index, top_index + cell_.row_span):
                     if use_ocr_text:
@@ -213,7 +234,7 @@ class TableTag(BoxTag):
                                  height_scale=image_height))
                         # FIXME: Define get_ocr_for_region and use it here
                         text = self.page.get_ocr_for_cell(region_in_pixels)
-                    if not pd.isnull(df.iloc[row_n, col_n]):
+                    if filled[row_n, col_n]:
                         raise ValueError(
                             "table_tag provides multiple values"
                             " for the same cell.")
@@ -225,13 +246,15 @@ class TableTag(BoxTag):
                             )
                     ):
                         text = ''
-                    df.loc[row_n, col_n] = ExtractionTag(
+                    grid[row_n, col_n] = ExtractionTag(
                         left=cell_.left, right=cell_.right,
                         top=cell_.top, bottom=cell_.bottom,
                         page=self.page,
                         raw_value=cell_.value,
                         raw_ocr_value=text)
-        return df
+                    filled[row_n, col_n] = True
+        return pd.DataFrame(grid, columns=list(range(len(cols))),
+                            index=list(range(len(rows))))
 
     @staticmethod
     def _is_ascii(str_) -> bool:
@@ -1,7 +1,10 @@
 import abc
 import logging
 import math
-from typing import Union, Tuple
+from collections import defaultdict
+from typing import Union, Tuple, Sequence, Callable
+
+import numpy as np
 
 from pycognaize.common.confidence import Confidence
 from pycognaize.common.utils import convert_coord_to_num
@@ -356,6 +359,117 @@ class BoxTag(Tag, metaclass=abc.ABCMeta):
             raise NotImplementedError(
                 f"Not implemented for item of type {type(other)}")
 
+    @staticmethod
+    def coordinates_array(tags: Sequence['BoxTag']) -> np.ndarray:
+        """Return a float array of shape (n, 4), where each row contains
+            the left, right, top and bottom coordinates of a tag"""
+        return np.array([(tag.left, tag.right, tag.top, tag.bottom)
+                         for tag in tags], dtype=float).reshape(-1, 4)
+
+    @staticmethod
+    def _intersection_areas(coords: np.ndarray,
+                            other_coords: np.ndarray) -> np.ndarray:
+        """Pairwise intersection areas of two coordinate arrays
+            (see `coordinates_array`), computed the same way as `__and__`"""
+        left = np.maximum(coords[:, None, 0], other_coords[None, :, 0])
+        right = np.minimum(coords[:, None, 1], other_coords[None, :, 1])
+        top = np.maximum(coords[:, None, 2], other_coords[None, :, 2])
+        bottom = np.minimum(coords[:, None, 3], other_coords[None, :, 3])
+        intersects = ((coords[:, None, 0] < other_coords[None, :, 1])
+                      & (coords[:, None, 1] > other_coords[None, :, 0])
+                      & (coords[:, None, 2] < other_coords[None, :, 3])
+                      & (coords[:, None, 3] > other_coords[None, :, 2]))
+        return np.where(intersects, (right - left) * (bottom - top), 0.)
+
+    @staticmethod
+    def _areas(coords: np.ndarray) -> np.ndarray:
+        """Areas of the rows of a coordinate array, computed the same way
+            as the `area` property"""
+        return (coords[:, 1] - coords[:, 0]) * (coords[:, 3] - coords[:, 2])
+
+    @classmethod
+    def _pairwise_by_page(cls, tags: Sequence['BoxTag'],
+                          others: Sequence['BoxTag'],
+                          kernel: Callable[[np.ndarray, np.ndarray],
+                                           np.ndarray],
+                          fill_value=0.) -> np.ndarray:
+        """Apply `kernel` to the coordinate arrays of the tags and others
+            on each page and assemble the results into a single matrix.
+            Pairs of tags on different pages get `fill_value`"""
+        res = np.full((len(tags), len(others)), fill_value,
+                      dtype=np.result_type(fill_value))
+        tag_ids = defaultdict(list)
+        for n, tag in enumerate(tags):
+            tag_ids[tag.page.page_number].append(n)
+        other_ids = defaultdict(list)
+        for n, other in enumerate(others):
+            other_ids[other.page.page_number].append(n)
+        for page_n, page_tag_ids in tag_ids.items():
+            page_other_ids = other_ids.get(page_n)
+            if not page_other_ids:
+                continue
+            res[np.ix_(page_tag_ids, page_other_ids)] = kernel(
+                cls.coordinates_array([tags[i] for i in page_tag_ids]),
+                cls.coordinates_array([others[i] for i in page_other_ids]))
+        return res
+
+    @classmethod
+    def intersection_matrix(cls, tags: Sequence['BoxTag'],
+                            others: Sequence['BoxTag']) -> np.ndarray:
+        """Pairwise areas of intersection (see `__and__`)
+
+        :param tags: Sequence of n tags
+        :param others: Sequence of m tags
+        :return: Array of shape (n, m), where the item in row `i` and
+            column `j` is equal to `tags[i] & others[j]`
+        """
+        return cls._pairwise_by_page(tags, others,
+                                     kernel=cls._intersection_areas)
+
+    @classmethod
+    def iou_matrix(cls, tags: Sequence['BoxTag'],
+                   others: Sequence['BoxTag']) -> np.ndarray:
+        """Pairwise Intersection over Union (see `iou`)
+
+        :param tags: Sequence of n tags
+        :param others: Sequence of m tags
+        :return: Array of shape (n, m), where the item in row `i` and
+            column `j` is equal to `tags[i].iou(others[j])`
+        """
+        def kernel(coords: np.ndarray, other_coords: np.ndarray):
+            intersection = cls._intersection_areas(coords, other_coords)
+            union = (cls._areas(coords)[:, None]
+                     + cls._areas(other_coords)[None, :] - intersection)
+            return intersection / union
+
+        return cls._pairwise_by_page(tags, others, kernel=kernel)
+
+    @classmethod
+    def containment_matrix(cls, tags: Sequence['BoxTag'],
+                           others: Sequence['BoxTag'],
+                           thresh: float) -> np.ndarray:
+        """Pairwise check if tags are in the other rectangles
+            (see `is_in_rectangle`)
+
+        :param tags: Sequence of n tags
+        :param others: Sequence of m tags
+        :param thresh: If the fraction area of the tag in the other
+            rectangle is larger or equal to thresh, it is in the rectangle
+        :return: Boolean array of shape (n, m), where the item in row `i`
+            and column `j` is equal to
+            `tags[i].is_in_rectangle(others[j], thresh)`
+        """
+        if thresh < 0 or thresh > 1:
+            raise ValueError(
+                "Threshold should be a float number between 0 to 1")
+
+        def kernel(coords: np.ndarray, other_coords: np.ndarray):
+            intersection = cls._intersection_areas(coords, other_coords)
+            return intersection / cls._areas(coords)[:, None] >= thresh
+
+        return cls._pairwise_by_page(tags, others, kernel=kernel,
+                                     fill_value=False)
+
     def get_top_left(self):
         return self.top, self.left
 
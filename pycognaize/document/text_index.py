@@ -0,0 +1,291 @@
+"""Defines SnapshotTextIndex, a persisted inverted index of the OCR words
+of a snapshot, used for finding the documents containing a phrase
+without loading them
+"""
+import bisect
+import io
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from pycognaize.common.enums import OCR_DATA_EXTENSION, StorageEnum
+from pycognaize.common.utils import join_path
+from pycognaize.document.token_index import normalize_query, normalize_token
+from pycognaize.file_storage import get_storage
+
+PAGE_FILE_REGEX = re.compile(rf'^page_(\d+)\.{OCR_DATA_EXTENSION}$')
+
+
+@dataclass
+class _PageListing:
+    """OCR files of the pages of a snapshot, with their sizes and
+        modification times (in nanoseconds)"""
+    document_ids: List[str] = field(default_factory=list)
+    page_documents: List[int] = field(default_factory=list)
+    page_numbers: List[int] = field(default_factory=list)
+    page_sizes: List[int] = field(default_factory=list)
+    page_mtimes: List[int] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays identifying the listed files, as stored in the index"""
+        return dict(document_ids=np.array(self.document_ids, dtype=str),
+                    page_documents=np.array(self.page_documents,
+                                            dtype=np.int64),
+                    page_numbers=np.array(self.page_numbers, dtype=np.int64),
+                    page_sizes=np.array(self.page_sizes, dtype=np.int64),
+                    page_mtimes=np.array(self.page_mtimes, dtype=np.int64))
+
+
+def _list_pages(storage, snapshot_path: str) -> _PageListing:
+    is_s3_path = storage.is_s3_path(snapshot_path)
+    listing = _PageListing(document_ids=sorted(
+        directory.name for directory in
+        storage.list_dir(snapshot_path, include_files=False)))
+    for doc_index, doc_id in enumerate(listing.document_ids):
+        data_path = join_path(is_s3_path, snapshot_path, doc_id,
+                              StorageEnum.ocr_folder.value)
+        try:
+            pages = sorted(
+                (int(match.group(1)), path)
+                for match, path in ((PAGE_FILE_REGEX.match(path.name), path)
+                                    for path in storage.list_dir(data_path))
+                if match)
+        except (NotADirectoryError, FileNotFoundError):
+            continue
+        for number, path in pages:
+            stat = path.stat()
+            listing.page_documents.append(doc_index)
+            listing.page_numbers.append(number)
+            listing.page_sizes.append(stat.st_size)
+            listing.page_mtimes.append(
+                getattr(stat, 'st_mtime_ns', int(stat.st_mtime * 1e9)))
+            listing.paths.append(join_path(
+                is_s3_path, data_path, f"page_{number}.{OCR_DATA_EXTENSION}"))
+    return listing
+
+
+class _Tokens(Sequence):
+    """Sorted tokens stored as a single UTF-8 buffer, where the token with
+        index `i` is `buffer[offsets[i]:offsets[i + 1]]`. The tokens are
+        returned as bytes, which sort like the strings"""
+
+    def __init__(self, buffer: bytes, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> bytes:
+        return self.buffer[int(self.offsets[idx]):int(self.offsets[idx + 1])]
+
+    def find(self, token: str) -> Optional[int]:
+        """Position of the token, found with a binary search"""
+        token = token.encode('utf-8')
+        position = bisect.bisect_left(self, token)
+        if position < len(self) and self[position] == token:
+            return position
+        return None
+
+
+class SnapshotTextIndex:
+    """Inverted index from the normalized text of the OCR words (cleaned
+        and lowercased, as by default in `Page.search_text`) to the pages
+        of the snapshot containing them.
+
+    The index answers which pages contain all words of a phrase. These
+        are candidates: the words may not be adjacent, so the exact
+        occurrences are found with `Document.search_text` on the
+        candidate pages only.
+
+    The sizes and modification times of the OCR files are stored with
+        the index, so an index, which no longer matches the snapshot
+        (e.g. after a sync), is detected by `is_stale`.
+    """
+    FINGERPRINT = ('document_ids', 'page_documents', 'page_numbers',
+                   'page_sizes', 'page_mtimes')
+
+    def __init__(self,
+                 document_ids: np.ndarray,
+                 page_documents: np.ndarray,
+                 page_numbers: np.ndarray,
+                 token_buffer: np.ndarray,
+                 token_offsets: np.ndarray,
+                 offsets: np.ndarray,
+                 postings: np.ndarray,
+                 page_sizes: Optional[np.ndarray] = None,
+                 page_mtimes: Optional[np.ndarray] = None):
+        """
+
+        :param document_ids: Ids of the indexed documents
+        :param page_documents: Position in `document_ids` of the document
+            of each page
+        :param page_numbers: Number of each page in its document
+        :param token_buffer: UTF-8 bytes of the sorted unique tokens,
+            concatenated
+        :param token_offsets: Array of length n + 1 with the start of
+            each token in `token_buffer`
+        :param offsets: Start of the postings of each token in `postings`,
+            with the end of the last postings appended
+        :param postings: Sorted page positions of each token
+        :param page_sizes: Size of the OCR file of each page
+        :param page_mtimes: Modification time (in nanoseconds) of the
+            OCR file of each page
+        """
+        self._document_ids = document_ids
+        self._page_documents = page_documents
+        self._page_numbers = page_numbers
+        self._tokens = _Tokens(token_buffer.tobytes(), token_offsets)
+        self._offsets = offsets
+        self._postings = postings
+        self._page_sizes = page_sizes
+        self._page_mtimes = page_mtimes
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__}: {len(self._document_ids)} "
+                f"documents, {len(self._page_numbers)} pages, "
+                f"{len(self._tokens)} tokens>")
+
+    @property
+    def document_ids(self) -> List[str]:
+        return self._document_ids.tolist()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the index"""
+        return sum(array.nbytes for array in (
+            self._document_ids, self._page_documents, self._page_numbers,
+            self._tokens.offsets, self._offsets, self._postings,
+            self._page_sizes, self._page_mtimes)
+            if array is not None) + len(self._tokens.buffer)
+
+    @classmethod
+    def build(cls, snapshot_path: str,
+              storage_config: Optional[dict] = None,
+              max_workers: Optional[int] = None) -> 'SnapshotTextIndex':
+        """Build the index from the OCR data of the pages of a snapshot
+
+        :param snapshot_path: Path of the snapshot
+        :param storage_config: Config of the storage of the path
+        :param max_workers: Number of pages read at once
+        :return: `SnapshotTextIndex` object
+        """
+        storage = get_storage(snapshot_path, config=storage_config)
+        listing = _list_pages(storage, snapshot_path)
+        paths = listing.paths
+        token_pages: Dict[str, List[int]] = {}
+        for page_index, result in enumerate(
+                storage.iter_read(paths, max_workers=max_workers)):
+            if not result.ok:
+                logging.warning(f'Failed reading page {paths[page_index]}:'
+                                f' {result.error}')
+                continue
+            for token in cls._page_tokens(result.data):
+                token_pages.setdefault(token, []).append(page_index)
+
+        tokens = sorted(token_pages)
+        lengths = [len(token_pages[token]) for token in tokens]
+        # Variable length tokens are concatenated, a fixed width array
+        # would pad all of them to the longest token
+        encoded = [token.encode('utf-8') for token in tokens]
+        return cls(**listing.arrays(),
+                   token_buffer=np.frombuffer(b''.join(encoded),
+                                              dtype=np.uint8),
+                   token_offsets=np.concatenate(
+                       [[0], np.cumsum([len(token) for token in encoded],
+                                       dtype=np.int64)]),
+                   offsets=np.concatenate(
+                       [[0], np.cumsum(lengths, dtype=np.int64)]),
+                   postings=np.array(
+                       [page for token in tokens
+                        for page in token_pages[token]], dtype=np.int64))
+
+    @staticmethod
+    def _page_tokens(data: bytes) -> set:
+        """Unique non-empty tokens of the words of the raw OCR data"""
+        tokens = {normalize_token(word['value'])
+                  for word in json.loads(data)['data']}
+        tokens.discard('')
+        return tokens
+
+    def save(self, path: str, storage_config: Optional[dict] = None) -> None:
+        """Write the index to a `.npz` file"""
+        buffer = io.BytesIO()
+        np.savez(buffer, document_ids=self._document_ids,
+                 page_documents=self._page_documents,
+                 page_numbers=self._page_numbers,
+                 token_buffer=np.frombuffer(self._tokens.buffer,
+                                            dtype=np.uint8),
+                 token_offsets=self._tokens.offsets,
+                 offsets=self._offsets,
+                 postings=self._postings,
+                 **({} if self._page_sizes is None else dict(
+                     page_sizes=self._page_sizes,
+                     page_mtimes=self._page_mtimes)))
+        storage = get_storage(path, config=storage_config)
+        with storage.open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+
+    @classmethod
+    def load(cls, path: str,
+             storage_config: Optional[dict] = None) -> 'SnapshotTextIndex':
+        """Read the index from a `.npz` file written by `save`"""
+        storage = get_storage(path, config=storage_config)
+        with storage.open(path, 'rb') as f:
+            data = f.read()
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def is_stale(self, snapshot_path: str,
+                 storage_config: Optional[dict] = None) -> bool:
+        """True if the documents or the OCR files of the pages of the
+            snapshot changed since the index was built. Only the files
+            are listed, they are not read"""
+        if self._page_sizes is None or self._page_mtimes is None:
+            return True
+        storage = get_storage(snapshot_path, config=storage_config)
+        current = _list_pages(storage, snapshot_path).arrays()
+        return not all(
+            np.array_equal(current[name], getattr(self, f'_{name}'))
+            for name in self.FINGERPRINT)
+
+    def _token_pages(self, token: str) -> np.ndarray:
+        position = self._tokens.find(token)
+        if position is None:
+            return np.empty(0, dtype=np.int64)
+        return self._postings[
+            self._offsets[position]:self._offsets[position + 1]]
+
+    def find(self, text: str) -> Dict[str, List[int]]:
+        """Find the pages containing all words of the phrase
+
+        :param text: Phrase to search for (case-insensitive)
+        :return: Mapping of the ids of the documents to the numbers
+            of the candidate pages
+        """
+        tokens = sorted({token for token in normalize_query(text) if token})
+        if tokens:
+            # Intersect starting from the rarest token
+            postings = sorted((self._token_pages(token) for token in tokens),
+                              key=len)
+            pages = postings[0]
+            for other in postings[1:]:
+                pages = np.intersect1d(pages, other, assume_unique=True)
+        else:
+            pages = np.arange(len(self._page_numbers))
+        result: Dict[str, List[int]] = {}
+        for page in pages.tolist():
+            doc_id = str(self._document_ids[self._page_documents[page]])
+            result.setdefault(doc_id, []).append(
+                int(self._page_numbers[page]))
+        return result
+
+    def documents(self, text: str) -> List[str]:
+        """Ids of the documents with pages containing all words
+            of the phrase"""
+        return list(self.find(text))
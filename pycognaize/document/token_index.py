@@ -0,0 +1,116 @@
+"""Defines TokenIndex, an inverted index of the words of a page,
+used for phrase search"""
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from pycognaize.common.utils import REGEX_NO_ALPHANUM_CHARS
+
+
+def normalize_token(text: str,
+                    case_sensitive: bool = False,
+                    clean: bool = True,
+                    cleanup_regex: re.Pattern = REGEX_NO_ALPHANUM_CHARS
+                    ) -> str:
+    """Normalize the text of a word, like `find_first_word_coords`"""
+    if clean:
+        text = cleanup_regex.sub('', text)
+    text = text.strip()
+    if not case_sensitive:
+        text = text.lower()
+    return text
+
+
+def normalize_query(text: str,
+                    case_sensitive: bool = False,
+                    clean: bool = True,
+                    cleanup_regex: re.Pattern = REGEX_NO_ALPHANUM_CHARS
+                    ) -> List[str]:
+    """Tokens of a query text, which is split on spaces"""
+    if not case_sensitive:
+        text = text.lower()
+    tokens = text.split(' ')
+    if clean:
+        tokens = [cleanup_regex.sub('', token) for token in tokens]
+    return tokens
+
+
+class TokenIndex:
+    """Inverted index from the normalized text of the words to their
+        positions in the given order of the words (e.g. reading order).
+
+    The words are normalized once, in the same way as by
+        `find_first_word_coords`: optionally cleaned with `cleanup_regex`,
+        stripped and optionally lowercased.
+    """
+
+    def __init__(self,
+                 words: Sequence[dict],
+                 case_sensitive: bool = False,
+                 clean: bool = True,
+                 cleanup_regex: re.Pattern = REGEX_NO_ALPHANUM_CHARS):
+        """
+
+        :param words: Words in the dictionary format of `Page.ocr`
+        :param case_sensitive: If False, the tokens are lowercased
+        :param clean: If True, the characters matching `cleanup_regex`
+            are removed from the tokens
+        :param cleanup_regex: Regex of the characters to remove
+        """
+        self._words = words
+        self._case_sensitive = case_sensitive
+        self._clean = clean
+        self._cleanup_regex = cleanup_regex
+        self._tokens = [self._normalize_word(word['ocr_text'])
+                        for word in words]
+        positions = defaultdict(list)
+        for position, token in enumerate(self._tokens):
+            positions[token].append(position)
+        self._positions: Dict[str, List[int]] = dict(positions)
+
+    @property
+    def words(self) -> Sequence[dict]:
+        return self._words
+
+    @property
+    def tokens(self) -> List[str]:
+        """Normalized text of each word"""
+        return self._tokens
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _normalize_word(self, text: str) -> str:
+        return normalize_token(text, case_sensitive=self._case_sensitive,
+                               clean=self._clean,
+                               cleanup_regex=self._cleanup_regex)
+
+    def normalize_query(self, text: str) -> List[str]:
+        """Tokens of the query text, which is split on spaces"""
+        return normalize_query(text, case_sensitive=self._case_sensitive,
+                               clean=self._clean,
+                               cleanup_regex=self._cleanup_regex)
+
+    def find(self, text: str) -> List[List[int]]:
+        """Find the occurrences of the phrase, which do not overlap
+
+        :param text: Phrase to search for
+        :return: List with the word positions of each occurrence,
+            in the order of the words
+        """
+        query = self.normalize_query(text)
+        # Candidate starts come from the rarest token of the query
+        offset, rarest = min(
+            enumerate(query),
+            key=lambda pair: len(self._positions.get(pair[1], ())))
+        matches = []
+        end = 0
+        for position in self._positions.get(rarest, ()):
+            start = position - offset
+            if start < end or start + len(query) > len(self._tokens):
+                continue
+            if all(self._tokens[start + n] == token
+                   for n, token in enumerate(query)):
+                matches.append(list(range(start, start + len(query))))
+                end = start + len(query)
+        return matches
@@ -1,13 +1,23 @@
+import threading
 from pathlib import Path
-from typing import Union, Type
+from typing import Dict, Optional, Tuple, Union, Type
 
+from pycognaize.file_storage.disk_cache import DiskCache
 from pycognaize.file_storage.path_type_checker import (
     is_s3_path
 )
-from pycognaize.file_storage.s3_storage import S3Storage
+from pycognaize.file_storage.s3_storage import (
+    S3ClientPool,
+    S3Storage,
+    config_key
+)
 from pycognaize.file_storage.storage import Storage
 
+# Last used storage of each kind
 STORAGES = {}
+# Storages by kind and credentials
+STORAGE_POOL: Dict[Tuple[str, Optional[Tuple]], Storage] = {}
+_STORAGE_POOL_LOCK = threading.Lock()
 
 
 def get_storage_class(key: str) -> Type[Storage]:
@@ -17,15 +27,26 @@ def get_storage_class(key: str) -> Type[Storage]:
 
 def create_storage_instance(key: str, config=None):
     STORAGES[key] = get_storage_class(key)(config)
+    STORAGE_POOL[(key, config_key(config))] = STORAGES[key]
     return STORAGES[key]
 
 
 def get_or_create(key: str, config=None):
     if key not in STORAGES:
-        return create_storage_instance(key, config)
+        with _STORAGE_POOL_LOCK:
+            if key not in STORAGES:
+                return create_storage_instance(key, config)
     if config is None:
         return STORAGES[key]
-    return create_storage_instance(key, config)
+    storage = STORAGE_POOL.get((key, config_key(config)))
+    if storage is None:
+        with _STORAGE_POOL_LOCK:
+            storage = STORAGE_POOL.get((key, config_key(config)))
+            if storage is None:
+                return create_storage_instance(key, config)
+    storage.set_as_default()
+    STORAGES[key] = storage
+    return storage
 
 
 def get_storage(path: Union[str, Path], config=None) -> Storage:
@@ -35,4 +56,17 @@ def get_storage(path: Union[str, Path], config=None) -> Storage:
         return get_or_create('general', config)
 
 
-__all__ = ['get_storage']
+def release_storage(config: dict) -> None:
+    """Remove the storages and clients of the given credentials from the
+        pools, e.g. after the credentials were rotated"""
+    key = config_key(config)
+    with _STORAGE_POOL_LOCK:
+        for pool_key in [pool_key for pool_key in STORAGE_POOL
+                         if pool_key[1] == key]:
+            storage = STORAGE_POOL.pop(pool_key)
+            if STORAGES.get(pool_key[0]) is storage:
+                STORAGES.pop(pool_key[0])
+    S3ClientPool.release(config)
+
+
+__all__ = ['get_storage', 'release_storage', 'DiskCache']
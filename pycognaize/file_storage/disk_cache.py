@@ -0,0 +1,162 @@
+"""Defines DiskCache, a size-bounded local cache for the content
+of remote objects
+"""
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+class DiskCache:
+    """Content cache on the local disk with a byte budget and least
+    recently used eviction.
+
+    Entries are keyed by the URI of the object and its version (e.g. the
+    S3 ETag), so changed objects are never served from the cache. The
+    cache can be shared by concurrent processes: entries are written to
+    temporary files and atomically renamed, and eviction is serialized
+    with a lock file (where `fcntl` is available).
+    """
+    TMP_PREFIX = '.tmp-'
+    LOCK_FILENAME = '.lock'
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int):
+        """
+
+        :param directory: Directory of the cache, created if missing
+        :param max_bytes: Maximum total size of the cached content
+        """
+        if max_bytes <= 0:
+            raise ValueError(
+                f"`max_bytes` should be positive, got {max_bytes}")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__}: {self._directory}, "
+                f"{self._max_bytes} bytes>")
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached content in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def _key(uri: str, version: str) -> str:
+        return hashlib.sha256(f"{uri}\n{version}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / key
+
+    def get(self, uri: str, version: str) -> Optional[bytes]:
+        """Return the cached content of the given object version,
+            or None if it is not cached"""
+        path = self._path(self._key(uri, version))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            # The modification time marks the last use of the entry
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, uri: str, version: str, data: bytes) -> None:
+        """Store the content of the given object version. Content larger
+            than the byte budget is not cached"""
+        if len(data) > self._max_bytes:
+            return
+        path = self._path(self._key(uri, version))
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent,
+                                        prefix=self.TMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if self._size is None:
+                self._size = self.size
+            else:
+                self._size += len(data)
+            exceeded = self._size > self._max_bytes
+        if exceeded:
+            self.evict()
+
+    def evict(self, target_bytes: Optional[int] = None) -> None:
+        """Remove the least recently used entries, until the total size is
+            at most `target_bytes` (90% of the byte budget by default)"""
+        if target_bytes is None:
+            target_bytes = int(self._max_bytes * 0.9)
+        with self._process_lock():
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= target_bytes:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                total -= size
+        with self._lock:
+            self._size = total
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self.evict(target_bytes=0)
+
+    def _entries(self) -> Iterator[Tuple[float, int, str]]:
+        """Modification time, size and path of each entry"""
+        for sub_dir in os.scandir(self._directory):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.startswith(self.TMP_PREFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    @contextlib.contextmanager
+    def _process_lock(self) -> Iterator[None]:
+        """Lock, which is held by a single process at a time"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._directory / self.LOCK_FILENAME, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
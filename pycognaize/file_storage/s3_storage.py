@@ -1,15 +1,201 @@
-from cloudpathlib import S3Client
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from cloudpathlib import AnyPath, S3Client
+
+from pycognaize.common.enums import EnvConfigEnum
+from pycognaize.file_storage.disk_cache import DiskCache
 from pycognaize.file_storage.storage import Storage
 
+# Maximum number of connections kept open by each S3 client,
+# allows to read many objects concurrently with a single client
+MAX_POOL_CONNECTIONS = 32
+
+
+def config_key(config: Optional[dict]) -> Optional[Tuple]:
+    """Hashable key of a storage config"""
+    if config is None:
+        return None
+    return tuple(sorted(config.items()))
+
+
+class S3ClientPool:
+    """Pool of S3 clients, which are reused for the same credentials"""
+    _clients: Dict[Tuple, S3Client] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, config: dict) -> S3Client:
+        """Return the client for the given credentials,
+            it is created on the first request"""
+        key = config_key(config)
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    client = cls._create_client(config)
+                    cls._clients[key] = client
+        return client
+
+    @staticmethod
+    def _create_client(config: dict) -> S3Client:
+        import botocore.session
+        from botocore.config import Config
+
+        botocore_session = botocore.session.Session()
+        botocore_session.set_default_client_config(
+            Config(max_pool_connections=MAX_POOL_CONNECTIONS))
+        return S3Client(
+            aws_access_key_id=config['aws_access_key_id'],
+            aws_session_token=config['aws_session_token'],
+            aws_secret_access_key=config['aws_secret_access_key'],
+            botocore_session=botocore_session
+        )
+
+    @classmethod
+    def release(cls, config: dict) -> None:
+        """Remove the client of the given credentials from the pool"""
+        with cls._lock:
+            cls._clients.pop(config_key(config), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all clients from the pool"""
+        with cls._lock:
+            cls._clients.clear()
+
 
 class S3Storage(Storage):
+    # Local cache of the objects read through `open` and `read`,
+    # configured from the environment on first use
+    _cache: Optional[DiskCache] = None
+    _cache_configured = False
 
     def __init__(self, config=None):
         super().__init__(config)
+        self._client = None
         if config is not None:
-            client = S3Client(
-                aws_access_key_id=config['aws_access_key_id'],
-                aws_session_token=config['aws_session_token'],
-                aws_secret_access_key=config['aws_secret_access_key']
-            )
-            client.set_as_default_client()
+            self._client = S3ClientPool.get(config)
+            self.set_as_default()
+
+    def set_as_default(self) -> None:
+        """Use the client of this storage for the S3 paths"""
+        if (self._client is not None
+                and S3Client._default_client is not self._client):
+            self._client.set_as_default_client()
+
+    @classmethod
+    def get_cache(cls) -> Optional[DiskCache]:
+        """Local cache of the objects, if enabled. By default, it is
+            enabled if the `STORAGE_CACHE_DIR` environment variable is set,
+            with a budget of `STORAGE_CACHE_MAX_BYTES` (10GB by default)"""
+        if not cls._cache_configured:
+            directory = os.environ.get(EnvConfigEnum.STORAGE_CACHE_DIR.value)
+            if directory:
+                max_bytes = int(os.environ.get(
+                    EnvConfigEnum.STORAGE_CACHE_MAX_BYTES.value, 10 ** 10))
+                cls.set_cache(DiskCache(directory, max_bytes=max_bytes))
+            else:
+                cls.set_cache(None)
+        return cls._cache
+
+    @classmethod
+    def set_cache(cls, cache: Optional[DiskCache]) -> None:
+        """Set the local cache of the objects, None disables caching"""
+        S3Storage._cache = cache
+        S3Storage._cache_configured = True
+
+    @staticmethod
+    def _boto3_client(path: AnyPath):
+        """boto3 client of the path, None if the path has no boto3 client
+            (e.g. for the local implementation used in tests)"""
+        return getattr(path.client, 'client', None)
+
+    @classmethod
+    def _get_object(cls, path: Union[str, Path], **kwargs
+                    ) -> Optional[dict]:
+        """Read the object with a single request of the boto3 client,
+            return None if the path has no boto3 client.
+
+        :return: Dictionary with the `data` and the `etag` of the object
+        """
+        path = AnyPath(path)
+        client = cls._boto3_client(path)
+        if client is None:
+            return None
+        try:
+            response = client.get_object(Bucket=path.bucket, Key=path.key,
+                                         **kwargs)
+        except client.exceptions.NoSuchKey as e:
+            raise FileNotFoundError(str(path)) from e
+        return dict(data=response['Body'].read(), etag=response['ETag'])
+
+    @classmethod
+    def _get_etag(cls, path: AnyPath) -> str:
+        client = cls._boto3_client(path)
+        try:
+            return client.head_object(Bucket=path.bucket,
+                                      Key=path.key)['ETag']
+        except client.exceptions.ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code')
+            if error_code in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(str(path)) from e
+            raise
+
+    @classmethod
+    def _read_object(cls, path: Union[str, Path]) -> Optional[bytes]:
+        """Read the whole object through the local cache (if enabled),
+            return None if the path has no boto3 client"""
+        path = AnyPath(path)
+        if cls._boto3_client(path) is None:
+            return None
+        cache = cls.get_cache()
+        if cache is None:
+            return cls._get_object(path)['data']
+        uri = str(path)
+        data = cache.get(uri, cls._get_etag(path))
+        if data is None:
+            response = cls._get_object(path)
+            data = response['data']
+            cache.put(uri, response['etag'], data)
+        return data
+
+    def open(self, path: Union[str, Path], mode: str = 'r', *args,
+             **kwargs):
+        """Open the object. If the local cache is enabled, objects opened
+            for reading are served from the cache"""
+        if (self.get_cache() is None or args
+                or any(char in mode for char in 'wax+')):
+            return super().open(path, mode, *args, **kwargs)
+        data = self._read_object(path)
+        if data is None:
+            return super().open(path, mode, *args, **kwargs)
+        if 'b' in mode:
+            return io.BytesIO(data)
+        return io.TextIOWrapper(
+            io.BytesIO(data),
+            **{key: value for key, value in kwargs.items()
+               if key in ('encoding', 'errors', 'newline')})
+
+    def read_head(self, path: Union[str, Path], size: int) -> bytes:
+        """Read at most `size` bytes from the beginning of the file,
+            with a ranged request instead of downloading the whole file"""
+        response = self._get_object(path, Range=f"bytes=0-{size - 1}")
+        if response is None:
+            return super().read_head(path, size)
+        return response['data']
+
+    def read(self, path: Union[str, Path], mode: str = 'rb', **kwargs
+             ) -> Union[bytes, str]:
+        """Read the whole object, without going through the local file
+            cache of cloudpathlib (but through the cache of `get_cache`)"""
+        data = self._read_object(path)
+        if data is None:
+            return super().read(path, mode, **kwargs)
+        if 'b' in mode:
+            return data
+        return data.decode(kwargs.get('encoding') or 'utf-8')
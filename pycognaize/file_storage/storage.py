@@ -1,5 +1,8 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Union
+from typing import Iterable, Iterator, List, Optional, Union
 
 from cloudpathlib import AnyPath
 
@@ -8,11 +11,29 @@ from pycognaize.file_storage.path_type_checker import (
 )
 
 
+@dataclass
+class ReadResult:
+    """Result of reading a single path with `Storage.read_many`"""
+    path: Union[str, Path]
+    data: Optional[Union[bytes, str]] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the path was read successfully"""
+        return self.error is None
+
+
 class Storage:
+    # Default number of paths read at once by `read_many` and `iter_read`
+    max_read_workers = 16
 
     def __init__(self, *args, **kwargs):
         pass
 
+    def set_as_default(self) -> None:
+        """Make the credentials of this storage the active ones"""
+
     def list_dir(
             self,
             path: Union[str, Path],
@@ -64,3 +85,75 @@ class Storage:
     @staticmethod
     def open(path: Union[str, Path], *args, **kwargs):
         return AnyPath(path).open(*args, **kwargs)
+
+    def read_head(self, path: Union[str, Path], size: int) -> bytes:
+        """Read at most `size` bytes from the beginning of the file"""
+        with self.open(path, 'rb') as f:
+            return f.read(size)
+
+    def read(self, path: Union[str, Path], mode: str = 'rb', **kwargs
+             ) -> Union[bytes, str]:
+        """Read the whole file
+
+        :param path: Path of the file
+        :param mode: 'rb' for bytes or 'r' for text
+        :param kwargs: Keyword arguments for `open` (e.g. encoding)
+        :return: Content of the file
+        """
+        with self.open(path, mode, **kwargs) as f:
+            return f.read()
+
+    def _read_result(self, path: Union[str, Path], mode: str,
+                     **kwargs) -> ReadResult:
+        try:
+            return ReadResult(path=path,
+                              data=self.read(path, mode, **kwargs))
+        except Exception as e:
+            return ReadResult(path=path, error=e)
+
+    def iter_read(self, paths: Iterable[Union[str, Path]],
+                  mode: str = 'rb',
+                  max_workers: Optional[int] = None,
+                  **kwargs) -> Iterator[ReadResult]:
+        """Read the files concurrently, yielding the results in the order
+            of the paths. At most `max_workers` files are read (and held in
+            memory before being yielded) at once.
+
+        :param paths: Paths of the files
+        :param mode: 'rb' for bytes or 'r' for text
+        :param max_workers: Maximum number of files read at once
+        :param kwargs: Keyword arguments for `open` (e.g. encoding)
+        :return: Iterator of `ReadResult`, failed reads contain the
+            raised exception instead of the data
+        """
+        if max_workers is None:
+            max_workers = self.max_read_workers
+        if max_workers <= 0:
+            raise ValueError(
+                f"`max_workers` should be positive, got {max_workers}")
+        paths = iter(paths)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for path in paths:
+                pending.append(executor.submit(
+                    self._read_result, path, mode, **kwargs))
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def read_many(self, paths: Iterable[Union[str, Path]],
+                  mode: str = 'rb',
+                  max_workers: Optional[int] = None,
+                  **kwargs) -> List[ReadResult]:
+        """Read the files concurrently
+
+        :param paths: Paths of the files
+        :param mode: 'rb' for bytes or 'r' for text
+        :param max_workers: Maximum number of files read at once
+        :param kwargs: Keyword arguments for `open` (e.g. encoding)
+        :return: List of `ReadResult` in the order of the paths,
+            failed reads contain the raised exception instead of the data
+        """
+        return list(self.iter_read(paths, mode=mode,
+                                   max_workers=max_workers, **kwargs))
@@ -1,5 +1,6 @@
 """This module provides login functionality for downloading snapshots"""
 import os
+from typing import Optional
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -7,6 +8,7 @@ from urllib3.util import Retry
 
 from pycognaize.common.enums import EnvConfigEnum
 from pycognaize.common.exceptions import ServerAPIException
+from pycognaize.file_storage import release_storage
 
 
 class Login:
@@ -45,6 +47,18 @@ class Login:
         """Session token for AWS"""
         return self._session_token
 
+    @property
+    def storage_config(self) -> Optional[dict]:
+        """Config for the storage with the AWS credentials,
+            None if not logged in"""
+        if not self.logged_in:
+            return None
+        return {
+            'aws_access_key_id': self.aws_access_key,
+            'aws_session_token': self.aws_session_token,
+            'aws_secret_access_key': self.aws_secret_access_key
+        }
+
     @property
     def snapshot_root(self) -> str:
         """Root path for snapshots"""
@@ -107,7 +121,13 @@ class Login:
                                      "with the serve")
 
     def relogin(self):
+        """Login again to rotate the AWS credentials. The storage clients
+            of the previous credentials are released"""
+        expired_config = self.storage_config
         self.login(self._email, self._password)
+        if (expired_config is not None
+                and expired_config != self.storage_config):
+            release_storage(expired_config)
 
     @classmethod
     def destroy(cls) -> None:
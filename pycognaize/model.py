@@ -2,6 +2,7 @@ import abc
 from collections import Counter, defaultdict
 from typing import Tuple, List, Union
 
+import numpy as np
 import requests
 import simplejson as json
 from requests.adapters import HTTPAdapter, Retry
@@ -12,6 +13,7 @@ from pycognaize.common.utils import (
 )
 from pycognaize.document.document import Document
 from pycognaize.document.tag import ExtractionTag
+from pycognaize.document.tag.tag import BoxTag
 from pycognaize.document.tag.html_tag import HTMLTag, HTMLTableTag
 
 
@@ -235,6 +237,19 @@ class Model(metaclass=abc.ABCMeta):
             pred_values = [pred_tag.raw_value for pred_tag in pred_tags]
             tp_t = len(list((Counter(act_values)
                              & Counter(pred_values)).elements()))
+        elif (all(isinstance(tag, BoxTag) for tag in act_tags)
+              and all(isinstance(tag, BoxTag) for tag in pred_tags)):
+            match_matrix = self.match_matrix(act_tags=act_tags,
+                                             pred_tags=pred_tags)
+            matched_pred_idxs = set()
+            for act_tag, tag_matches in zip(act_tags, match_matrix):
+                for pred_tag_idx in np.flatnonzero(tag_matches):
+                    if (pred_tag_idx not in matched_pred_idxs
+                            and act_tag.raw_ocr_value
+                            == pred_tags[pred_tag_idx].raw_ocr_value):
+                        tp_t += 1
+                        matched_pred_idxs.add(pred_tag_idx)
+                        break
         else:
             matched_act_idxs = []
             matched_pred_idxs = []
@@ -396,6 +411,24 @@ class Model(metaclass=abc.ABCMeta):
             )
         return is_match
 
+    @staticmethod
+    def match_matrix(act_tags: List[BoxTag],
+                     pred_tags: List[BoxTag],
+                     threshold: float = 0.6) -> np.ndarray:
+        """Vectorized version of `matches` for lists of `BoxTag`s
+
+        :return: Boolean array, where the item in row `i` and column `j`
+            is true if `act_tags[i]` matches `pred_tags[j]`
+        """
+        act_pages = np.array([tag.page.page_number for tag in act_tags])
+        pred_pages = np.array([tag.page.page_number for tag in pred_tags])
+        min_area = np.minimum(
+            np.array([tag.area for tag in act_tags], dtype=float)[:, None],
+            np.array([tag.area for tag in pred_tags], dtype=float)[None, :])
+        intersection = BoxTag.intersection_matrix(act_tags, pred_tags)
+        return ((act_pages[:, None] == pred_pages[None, :])
+                & (intersection / min_area >= threshold))
+
     def execute_eval(self,
                      token: str,
                      url: str,
@@ -89,3 +89,51 @@ class TestFieldCollection(unittest.TestCase):
         total_assets = self.get_group('Total Assets')
         total_assets_field = total_assets['38e1ea2c-8882-11ea-b84a-0242ac130007'][0]
         self.assertEqual(self.doc_y.groups_by_field(total_assets_field), total_assets['38e1ea2c-8882-11ea-b84a-0242ac130007'])
+
+    def test_lazy_fields(self):
+        document = Document.from_dict(self.data, data_path=self.snap_path,
+                                      lazy_fields=True)
+        doc_y = document.y
+        self.assertEqual(list(doc_y.keys()), list(self.doc_y.keys()))
+        self.assertFalse(any(doc_y.is_constructed(name) for name in doc_y))
+        self.assertEqual(document.to_dict()['output_fields'],
+                         self.data['output_fields'])
+        self.assertFalse(any(doc_y.is_constructed(name) for name in doc_y))
+
+        name = next(iter(doc_y))
+        version = doc_y.version
+        fields = doc_y[name]
+        self.assertTrue(doc_y.is_constructed(name))
+        self.assertIs(doc_y.get(name), fields)
+        self.assertEqual(doc_y.version, version)
+        self.assertEqual([field.to_dict()['value'] for field in fields],
+                         [field.to_dict()['value']
+                          for field in self.doc_y[name]])
+        self.assertIsNone(doc_y.get('Non-Existent Field'))
+
+        for name, fields in doc_y.items():
+            self.assertTrue(doc_y.is_constructed(name))
+            self.assertEqual(len(fields), len(self.doc_y[name]))
+        self.assertDictEqual(doc_y.groups['Total Assets'],
+                             dict(document.y.groups['Total Assets']))
+
+        lazy_y = Document.from_dict(self.data, data_path=self.snap_path,
+                                    lazy_fields=True).y
+        name = next(iter(lazy_y))
+        self.assertEqual(len(lazy_y.pop(name)), len(self.doc_y[name]))
+        self.assertNotIn(name, lazy_y)
+
+    def test_version_in_place_edits(self):
+        name = next(name for name, fields in self.doc_y.items()
+                    if fields and fields[0].tags)
+        fields = self.doc_y[name]
+        version = self.doc_y.version
+        fields.append(fields[0])
+        self.assertGreater(self.doc_y.version, version)
+        version = self.doc_y.version
+        fields[0].tags[0] = fields[0].tags[0]
+        self.assertGreater(self.doc_y.version, version)
+        version = self.doc_y.version
+        fields.pop()
+        fields[0].tags.reverse()
+        self.assertEqual(self.doc_y.version, version + 2)
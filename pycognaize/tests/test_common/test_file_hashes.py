@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pycognaize.common import file_hashes
+from pycognaize.common.enums import HASH_FILE, HASH_MANIFEST_FILE
+from pycognaize.common.file_hashes import (
+    build_hash_manifest, file_hash, hash_files, read_hash_manifest,
+    summary_hash, verify_hash_manifest)
+from pycognaize.document.snapshot import Snapshot
+
+
+class TestFileHashes(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dirname = self.tmp_dir.name
+        self.files = {'doc1/document.json': b'{"id": 1}',
+                      'doc1/images/page_1.jpeg': os.urandom(3000),
+                      'doc2/document.json': b'{"id": 2}'}
+        for rel_path, data in self.files.items():
+            self.write(rel_path, data)
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.dirname, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def test_file_hash(self):
+        path = os.path.join(self.dirname, 'doc1/images/page_1.jpeg')
+        self.assertEqual(file_hash(path, chunk_size=7),
+                         file_hash(path))
+
+    def test_build_hash_manifest(self):
+        hashes = build_hash_manifest(self.dirname, max_workers=2)
+        self.assertEqual(list(hashes), sorted(self.files))
+        self.assertEqual(read_hash_manifest(self.dirname), hashes)
+        with open(os.path.join(self.dirname, HASH_FILE)) as f:
+            self.assertEqual(f.read(), summary_hash(hashes))
+        self.assertEqual(
+            set(os.listdir(self.dirname)),
+            {'doc1', 'doc2', HASH_FILE, HASH_MANIFEST_FILE})
+
+        # Unchanged files are not hashed again
+        with mock.patch.object(file_hashes, 'file_hash',
+                               wraps=file_hash) as hash_mock:
+            self.write('doc3/document.json', b'{"id": 3}')
+            hashes = build_hash_manifest(self.dirname)
+        self.assertEqual(hash_mock.call_count, 1)
+        self.assertIn('doc3/document.json', hashes)
+
+    def test_summary_hash_of_contents(self):
+        summary = summary_hash(hash_files(self.dirname))
+        self.write('doc2/document.json', b'{"id": 3}')
+        self.assertNotEqual(summary_hash(hash_files(self.dirname)), summary)
+
+    def test_verify(self):
+        build_hash_manifest(self.dirname)
+        result = verify_hash_manifest(self.dirname)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.rehashed, 0)
+
+        # Same size, different content
+        self.write('doc1/document.json', b'{"id": 7}')
+        # Partial file
+        self.write('doc1/images/page_1.jpeg', b'jpeg')
+        os.remove(os.path.join(self.dirname, 'doc2/document.json'))
+        self.write('doc3/document.json', b'{"id": 3}')
+        result = verify_hash_manifest(self.dirname)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.modified, ['doc1/document.json',
+                                           'doc1/images/page_1.jpeg'])
+        self.assertEqual(result.missing, ['doc2/document.json'])
+        self.assertEqual(result.added, ['doc3/document.json'])
+        self.assertEqual(result.rehashed, 1)
+
+    def test_verify_touched_file(self):
+        build_hash_manifest(self.dirname)
+        path = os.path.join(self.dirname, 'doc2/document.json')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        result = verify_hash_manifest(self.dirname)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.rehashed, 1)
+        # The manifest is updated with the new modification time
+        self.assertEqual(verify_hash_manifest(self.dirname).rehashed, 0)
+        self.assertEqual(
+            verify_hash_manifest(self.dirname, full=True).rehashed, 3)
+
+    def test_snapshot_verify(self):
+        build_hash_manifest(self.dirname)
+        snapshot = Snapshot(path=self.dirname)
+        self.assertTrue(snapshot.verify().ok)
+        self.write('doc2/document.json', b'{"id": 3}')
+        self.assertEqual(snapshot.verify().modified, ['doc2/document.json'])
+
+    def test_verify_after_documents_manifest(self):
+        build_hash_manifest(self.dirname)
+        Snapshot(path=self.dirname).build_manifest()
+        result = verify_hash_manifest(self.dirname)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.added, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
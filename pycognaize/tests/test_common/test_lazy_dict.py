@@ -1,12 +1,17 @@
 import json
 import os
+import pickle
 import shutil
 import tempfile
 import unittest
 import uuid
+from unittest import mock
 
 from pycognaize.common.enums import EnvConfigEnum
-from pycognaize.common.lazy_dict import LazyDocumentDict
+from pycognaize.common.lazy_dict import (
+    DocumentCache, LazyDocumentDict, build_documents_manifest,
+    document_shard)
+from pycognaize.file_storage.storage import Storage
 from pycognaize.document import Document
 from pycognaize.tests.resources import RESOURCE_FOLDER
 
@@ -64,3 +69,92 @@ class TestLazyDict(unittest.TestCase):
 
     def test___len__(self):
         self.assertEqual(self.docs.__len__(), 14)
+
+    def test_manifest(self):
+        self.assertIsNone(self.docs.manifest)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snap_path = os.path.join(tmp_dir, 'snapshot')
+            shutil.copytree(self.snap_path, snap_path)
+            manifest = build_documents_manifest(snap_path, max_workers=4)
+            self.assertEqual(sorted(manifest), list(self.docs))
+            doc_file = os.path.join(snap_path, self.document.id,
+                                    'document.json')
+            self.assertEqual(manifest[self.document.id],
+                             dict(size=os.path.getsize(doc_file),
+                                  pages=len(self.document.pages)))
+
+            # The document directories are not checked
+            with mock.patch.object(Storage, 'is_file',
+                                   side_effect=AssertionError):
+                docs = LazyDocumentDict(doc_path=snap_path,
+                                        data_path=snap_path)
+            self.assertEqual(list(docs), list(self.docs))
+            self.assertEqual(docs.manifest, manifest)
+            self.assertEqual(docs[self.document.id].id, self.document.id)
+
+    def test_cache(self):
+        self.assertIsNone(self.docs.cache)
+        docs = LazyDocumentDict(doc_path=self.snap_path,
+                                data_path=self.snap_path, cache_entries=2)
+        ids = ['60f554497883ab0013d9d906', '60b76b3d6f3f980019105dac',
+               '60f53e967883ab0013d9c6f9']
+        first = docs[ids[0]]
+        self.assertIs(docs[ids[0]], first)
+        self.assertEqual((docs.cache.hits, docs.cache.misses), (1, 1))
+        docs[ids[1]]
+        docs[ids[0]]
+        docs[ids[2]]
+        # The least recently used document is evicted
+        self.assertNotIn(ids[1], docs.cache)
+        self.assertIs(docs[ids[0]], first)
+        self.assertEqual(len(docs.cache), 2)
+        # Documents which failed to load are not cached
+        self.assertIsNone(docs['62eb8e6b28d7ca0012ec8288_error'])
+        self.assertNotIn('62eb8e6b28d7ca0012ec8288_error', docs.cache)
+
+        copy = pickle.loads(pickle.dumps(docs))
+        self.assertEqual(len(copy.cache), 0)
+        self.assertEqual(copy[ids[0]].id, first.id)
+
+    def test_cache_bytes(self):
+        doc_id = '60f554497883ab0013d9d906'
+        size = os.path.getsize(
+            os.path.join(self.snap_path, doc_id, 'document.json'))
+        docs = LazyDocumentDict(doc_path=self.snap_path,
+                                data_path=self.snap_path,
+                                cache_bytes=size // 2)
+        docs[doc_id]
+        self.assertEqual(len(docs.cache), 0)
+
+        cache = DocumentCache(max_bytes=10)
+        cache.put('a', self.document, 6)
+        cache.put('b', self.document, 3)
+        cache.put('c', self.document, 4)
+        self.assertEqual(cache.nbytes, 7)
+        self.assertNotIn('a', cache)
+        with self.assertRaises(ValueError):
+            DocumentCache()
+
+    def test_shard(self):
+        shards = [self.docs.shard(index, 3) for index in range(3)]
+        ids = [doc_id for shard in shards for doc_id in shard]
+        self.assertEqual(sorted(ids), list(self.docs))
+        for index, shard in enumerate(shards):
+            self.assertEqual(list(shard), sorted(shard))
+            for doc_id in shard:
+                self.assertEqual(document_shard(doc_id, 3), index)
+        # The assignment does not depend on the process
+        self.assertEqual(document_shard('60f554497883ab0013d9d906', 1000),
+                         document_shard('60f554497883ab0013d9d906', 1000))
+        with self.assertRaises(ValueError):
+            self.docs.shard(3, 3)
+
+    def test_subset(self):
+        doc_id = self.document.id
+        subset = self.docs.subset([doc_id])
+        self.assertEqual(list(subset), [doc_id])
+        self.assertEqual(len(subset), 1)
+        self.assertEqual(subset[doc_id].id, doc_id)
+        self.assertEqual(len(self.docs), 14)
+        with self.assertRaises(KeyError):
+            self.docs.subset(['missing'])
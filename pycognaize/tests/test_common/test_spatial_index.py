@@ -0,0 +1,45 @@
+import unittest
+
+from pycognaize.common.spatial_index import TagSpatialIndex
+from pycognaize.document.page import create_dummy_page
+from pycognaize.document.tag import ExtractionTag
+
+
+class TestTagSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.page_1 = create_dummy_page(page_n=1)
+        self.page_2 = create_dummy_page(page_n=2)
+        coords = [(0, 10, 0, 10), (5, 15, 5, 15), (50, 100, 0, 100),
+                  (90, 95, 90, 95), (10, 20, 10, 20), (0, 100, 0, 100)]
+        self.tags = [
+            ExtractionTag(left=left, right=right, top=top, bottom=bottom,
+                          page=self.page_1, raw_value='', raw_ocr_value='')
+            for left, right, top, bottom in coords]
+        self.other_page_tag = ExtractionTag(
+            left=0, right=10, top=0, bottom=10, page=self.page_2,
+            raw_value='', raw_ocr_value='')
+        self.index = TagSpatialIndex(
+            [(n, tag) for n, tag in enumerate(self.tags + [
+                self.other_page_tag])], grid_size=7)
+
+    def test_len(self):
+        self.assertEqual(len(self.index), 7)
+
+    def test_query_matches_brute_force(self):
+        for query_tag in self.tags + [self.other_page_tag]:
+            expected = [n for n, tag in enumerate(
+                self.tags + [self.other_page_tag])
+                        if query_tag.intersects(tag)]
+            self.assertListEqual(
+                [key for key, _ in self.index.query(query_tag)], expected)
+
+    def test_query_other_page(self):
+        tag = ExtractionTag(left=0, right=10, top=0, bottom=10,
+                            page=create_dummy_page(page_n=3),
+                            raw_value='', raw_ocr_value='')
+        self.assertListEqual(self.index.query(tag), [])
+
+    def test_invalid_grid_size(self):
+        with self.assertRaises(ValueError):
+            TagSpatialIndex([], grid_size=0)
@@ -1,11 +1,14 @@
 import json
 import os
+import pickle
 import shutil
 import tempfile
 import unittest
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from typing import Dict
+from unittest import mock
 
 from bson import json_util
 
@@ -13,6 +16,7 @@ from pycognaize.common.enums import StorageEnum, EnvConfigEnum
 
 from pycognaize.common.utils import load_bson_by_path
 from pycognaize.common.exceptions import AuthenthicationError
+from pycognaize.document import snapshot as snapshot_module
 from pycognaize.document.snapshot import Snapshot
 from pycognaize.tests.resources import RESOURCE_FOLDER
 
@@ -96,6 +100,66 @@ class TestSnapshot(unittest.TestCase):
         with self.assertRaises(AuthenthicationError):
             self.snapshot.download(snapshot_id, destination_dir)
 
+    def test_iter_documents(self):
+        snapshot = Snapshot(path=os.path.join(RESOURCE_FOLDER, 'snapshots'))
+        ids = list(snapshot.documents)
+        expected = {doc_id: snapshot.documents[doc_id] for doc_id in ids}
+
+        def summary(documents):
+            return [(doc_id, None if doc is None else
+                     (doc.id, list(doc.x), list(doc.y)))
+                    for doc_id, doc in documents]
+
+        ordered = summary(snapshot.iter_documents(workers=3, prefetch=2))
+        self.assertEqual(ordered, summary(expected.items()))
+        unordered = summary(snapshot.iter_documents(workers=3,
+                                                    ordered=False))
+        self.assertEqual(sorted(unordered, key=lambda x: x[0]), ordered)
+        processes = summary(snapshot.iter_documents(workers=2,
+                                                    processes=True))
+        self.assertEqual(processes, ordered)
+        # Each task only sends the id of the document to the process
+        with mock.patch.object(ProcessPoolExecutor, 'submit', autospec=True,
+                               side_effect=ProcessPoolExecutor.submit
+                               ) as submit:
+            self.assertEqual(
+                sorted(summary(snapshot.iter_documents(
+                    workers=2, ordered=False, processes=True))), ordered)
+        self.assertEqual(submit.call_count, len(ids))
+        for (_, fn, *args), kwargs in submit.call_args_list:
+            self.assertIs(fn, snapshot_module._read_worker_document)
+            self.assertEqual(len(args), 1)
+            self.assertIn(args[0], ids)
+            self.assertEqual(kwargs, {})
+            # The list of the ids is not part of the payload
+            self.assertLess(len(pickle.dumps((fn, args, kwargs))),
+                            len(pickle.dumps(ids)))
+        self.assertEqual(
+            [doc_id for doc_id, _ in snapshot.iter_documents(ids=ids[3:1:-1])],
+            ids[3:1:-1])
+
+        # Stopping early does not wait for the remaining documents
+        iterator = snapshot.iter_documents(workers=1, prefetch=1)
+        self.assertEqual(next(iterator)[0], ids[0])
+        iterator.close()
+
+        with self.assertRaises(ValueError):
+            next(snapshot.iter_documents(workers=0))
+        with self.assertRaises(ValueError):
+            next(snapshot.iter_documents(prefetch=0))
+
+    def test_shard(self):
+        snapshot = Snapshot(path=os.path.join(RESOURCE_FOLDER, 'snapshots'))
+        shards = [snapshot.shard(index, 4) for index in range(4)]
+        self.assertEqual(sorted(doc_id for shard in shards
+                                for doc_id in shard.documents),
+                         list(snapshot.documents))
+        doc_id = next(iter(shards[1].documents))
+        subset = snapshot.subset([doc_id])
+        self.assertEqual(list(subset.documents), [doc_id])
+        self.assertEqual([doc_id for doc_id, _ in subset.iter_documents()],
+                         [doc_id])
+
     def test_get_by_id(self):
         snapshot_id = '61430b35d302800000303bd5'
         self.assertIsInstance(self.snapshot.get_by_id(snapshot_id), Snapshot)
@@ -4,15 +4,20 @@ import shutil
 import tempfile
 import unittest
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from collections import OrderedDict
 from copy import deepcopy
+from unittest import mock
 
+import numpy as np
 import pandas as pd
 
 import pycognaize
 from pycognaize.common.enums import EnvConfigEnum, FieldTypeEnum
+from pycognaize.common.spatial_index import TagSpatialIndex
 from pycognaize.document import Page, Document
 from pycognaize.document.field.field import Field
+from pycognaize.document.tag import ExtractionTag, TableTag
 from pycognaize.tests.resources import RESOURCE_FOLDER
 
 
@@ -214,6 +219,108 @@ class TestDocument(unittest.TestCase):
                                      get_df_with_tied_field_values(table_tag))
         self.assertIsInstance(df_with_tied_field_values, pd.DataFrame)
 
+    def test_tag_index_invalidation(self):
+        tag = self.document.x['paragraph'][0].tags[0]
+        self.assertIn('paragraph', self.document.get_tied_fields(tag))
+        self.document.x['paragraph_copy'] = self.document.x['paragraph']
+        self.assertIn('paragraph_copy', self.document.get_tied_fields(tag))
+        del self.document.x['paragraph_copy']
+        self.assertNotIn('paragraph_copy',
+                         self.document.get_tied_fields(tag))
+        self.document.x['paragraph'][0].tags.clear()
+        self.assertNotIn(self.document.x['paragraph'][0],
+                         self.document.get_tied_fields(tag).get(
+                             'paragraph', []))
+
+    def test_tag_index_in_place_edits(self):
+        field = self.document.x['paragraph'][0]
+        tag = field.tags[0]
+        self.assertEqual(self.document.get_first_tied_field(tag),
+                         ('paragraph', field))
+        # Fields and tags appended in place are found without invalidation
+        new_tag = ExtractionTag(left=96, right=99, top=96, bottom=99,
+                                page=tag.page, raw_value='new',
+                                raw_ocr_value='new')
+        new_field = deepcopy(field)
+        new_field.tags.clear()
+        self.document.x['paragraph'].append(new_field)
+        self.assertIsNone(self.document.get_first_tied_field(new_tag))
+        new_field.tags.append(new_tag)
+        self.assertEqual(self.document.get_first_tied_field(new_tag),
+                         ('paragraph', new_field))
+        self.assertEqual(self.document.get_first_tied_fields([new_tag]),
+                         [('paragraph', new_field)])
+        new_field.tags.remove(new_tag)
+        self.assertIsNone(self.document.get_first_tied_field(new_tag))
+        # Replaced tags are detected as well
+        moved_tag = ExtractionTag(left=90, right=93, top=90, bottom=93,
+                                  page=tag.page, raw_value='moved',
+                                  raw_ocr_value='moved')
+        new_field.tags.append(new_tag)
+        self.document.get_first_tied_field(new_tag)
+        new_field.tags[-1] = moved_tag
+        self.assertEqual(self.document.get_first_tied_field(moved_tag),
+                         ('paragraph', new_field))
+        self.assertIsNone(self.document.get_first_tied_field(new_tag))
+
+    def test_tag_index_reused(self):
+        tags = [field.tags[0] for field in self.document.x['paragraph']]
+        self.document.get_first_tied_field(tags[0])
+        # Repeated queries neither rebuild the index nor walk the tags
+        with mock.patch('pycognaize.document.document.TagSpatialIndex',
+                        wraps=TagSpatialIndex) as index_cls, \
+                mock.patch.object(Field, 'tags',
+                                  new_callable=mock.PropertyMock) as tags_attr:
+            for tag in tags * 10:
+                self.assertEqual(
+                    self.document.get_first_tied_field(tag)[0], 'paragraph')
+            index_cls.assert_not_called()
+            tags_attr.assert_not_called()
+        field = self.document.x['paragraph'][0]
+        index = self.document._get_tag_index()
+        field.tags.append(deepcopy(field.tags[0]))
+        self.assertIsNot(self.document._get_tag_index(), index)
+
+    def test_prefetch_page_dimensions(self):
+        data = deepcopy(self.data2)
+        data.pop('pages')
+        with mock.patch.object(Page, 'get_page_data') as get_page_data:
+            document = Document.from_dict(
+                data, data_path=RESOURCE_FOLDER +
+                '/snapshots/5eb8ee1c6623f200192a0651')
+            self.assertTrue(any(
+                isinstance(tag, TableTag)
+                for fields in document.x.values()
+                for field in fields for tag in field.tags))
+            get_page_data.assert_not_called()
+
+        data = deepcopy(self.data)
+        data.pop('pages')
+        document = Document.from_dict(data, data_path=self.snap_path)
+        expected = Document.from_dict(data, data_path=self.snap_path)
+        for page in expected.pages.values():
+            page.get_page_data()
+        with mock.patch.object(Page, 'get_page_data') as get_page_data:
+            document.prefetch_page_dimensions()
+            get_page_data.assert_not_called()
+        for page_n, page in document.pages.items():
+            self.assertEqual(page.image_width,
+                             expected.pages[page_n].image_width)
+            self.assertEqual(page.image_height,
+                             expected.pages[page_n].image_height)
+
+        document = Document.from_dict(data, data_path=self.snap_path)
+        document.prefetch_page_dimensions(from_image=False)
+        for page_n, page in document.pages.items():
+            self.assertEqual(page._image_width,
+                             expected.pages[page_n].image_width)
+
+    def test_tied_tags_zero_threshold(self):
+        tag = self.document.x['paragraph'][0].tags[0]
+        n_tags = sum(len(field.tags) for field in self.document.x['ref'])
+        self.assertEqual(len(self.document.get_tied_tags(
+            tag, threshold=0)['ref']), n_tags)
+
     def test_is_xbrl(self):
         is_xbrl = self.document.is_xbrl
         self.assertFalse(is_xbrl)
@@ -244,9 +351,70 @@ class TestDocument(unittest.TestCase):
             source_field='random_field',
             one_to_one=False))
 
+    def test_get_df_with_tied_field_values_batch(self):
+        snap_path = RESOURCE_FOLDER + '/snapshots/5eb8ee1c6623f200192a0651'
+        with open(snap_path + '/document.json', encoding="utf8") as document_json:
+            data = json.load(document_json)
+        document = Document.from_dict(data, data_path=snap_path)
+        table_tags = [tag for fields in document.x.values()
+                      for field in fields for tag in field.tags
+                      if isinstance(tag, TableTag)]
+        self.assertTrue(table_tags)
+        for table_tag in table_tags:
+            pd.testing.assert_frame_equal(
+                document.get_df_with_tied_field_values(table_tag),
+                document.get_df_with_tied_field_values(table_tag,
+                                                       batch=False))
+        cells = [i for i in table_tags[-1].raw_df.to_numpy().ravel()
+                 if isinstance(i, ExtractionTag)]
+        self.assertListEqual(
+            document.get_first_tied_fields(cells),
+            [document.get_first_tied_field(cell) for cell in cells])
+
+    def test_search_text(self):
+        for text in ('of the', 'the', 'no such phrase'):
+            expected = [(page.page_number, match)
+                        for page in self.document.pages.values()
+                        for match in page.search_text(text)]
+            self.assertEqual(self.document.search_text(text, max_workers=3),
+                             expected)
+        matches = self.document.search_text(
+            'of the', return_tags=True,
+            page_filter=lambda page: page.page_number == 2)
+        self.assertTrue(matches)
+        self.assertTrue(all(page_n == 2 and isinstance(match[0], ExtractionTag)
+                            for page_n, match in matches))
+
     def test_load_page_images(self):
         self.assertIsNone(self.document.load_page_images())
 
+    def test_load_page_images_threads(self):
+        expected = Document.from_dict(self.data, data_path=self.snap_path)
+        document = Document.from_dict(self.data, data_path=self.snap_path)
+        document.load_page_images(
+            page_filter=lambda page: page.page_number <= 2, threads=True)
+        for page_n, page in document.pages.items():
+            if page_n <= 2:
+                self.assertEqual(page._image_bytes,
+                                 expected.pages[page_n].image_bytes)
+            else:
+                self.assertIsNone(page._image_bytes)
+            self.assertIsNone(page._image_arr)
+
+        document = Document.from_dict(self.data, data_path=self.snap_path)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            document.load_page_images(decode=True, keep_bytes=False,
+                                      executor=executor)
+        for page_n, page in document.pages.items():
+            self.assertIsNone(page._image_bytes)
+            np.testing.assert_array_equal(page._image_arr,
+                                          expected.pages[page_n].image_arr)
+
+        with self.assertRaises(ValueError):
+            document.load_page_images(threads=True, keep_bytes=False)
+        with self.assertRaises(ValueError):
+            document.pages[1].load_image(keep_bytes=False)
+
     @classmethod
     def tearDownClass(cls) -> None:
 
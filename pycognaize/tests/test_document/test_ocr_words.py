@@ -0,0 +1,49 @@
+import json
+import unittest
+
+import numpy as np
+
+from pycognaize.document.ocr_words import OCRWords
+from pycognaize.tests.resources import RESOURCE_FOLDER
+
+
+class TestOCRWords(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with open(RESOURCE_FOLDER + '/snapshots/60f554497883ab0013d9d906/data/page_6.json',
+                  encoding="utf8") as ocr_json:
+            self.ocr_raw = json.load(ocr_json)
+        self.ocr_raw['data'][0]['value'] = ' '
+        self.words = OCRWords.from_ocr_raw(self.ocr_raw, image_width=2337, image_height=3306)
+
+    def test_from_ocr_raw(self):
+        self.assertEqual(len(self.words), len(self.ocr_raw['data']) - 1)
+        self.assertEqual(self.words.word_id[0], 1)
+        self.assertEqual(self.words.text(0), self.ocr_raw['data'][1]['value'])
+        self.assertTrue((self.words.right > self.words.left).all())
+        self.assertTrue((self.words.bottom > self.words.top).all())
+
+    def test_to_dicts(self):
+        words = self.words.to_dicts()
+        self.assertEqual(len(words), len(self.words))
+        self.assertDictEqual(words[5], self.words.word(5))
+        self.assertSetEqual(set(words[0].keys()),
+                            {'left', 'right', 'top', 'bottom', 'ocr_text', 'word_id_number'})
+        self.assertListEqual(self.words.to_dicts(indices=[3, 1]), [words[3], words[1]])
+        self.assertListEqual(self.words.to_dicts(indices=np.array([2, 2])), [words[2], words[2]])
+        self.assertListEqual(self.words.to_dicts(indices=[]), [])
+        self.assertIsInstance(words[0]['left'], int)
+
+    def test_from_words(self):
+        words = OCRWords.from_words(self.words.to_dicts())
+        self.assertListEqual(words.to_dicts(), self.words.to_dicts())
+        self.assertEqual(words.text_buffer, self.words.text_buffer)
+        np.testing.assert_array_equal(words.text_offsets, self.words.text_offsets)
+        empty = OCRWords.from_words([])
+        self.assertEqual(len(empty), 0)
+        self.assertListEqual(empty.to_dicts(), [])
+
+    def test_invalid_lengths(self):
+        with self.assertRaises(ValueError):
+            OCRWords(left=np.zeros(2), right=np.zeros(2), top=np.zeros(2), bottom=np.zeros(2),
+                     word_id=np.zeros(1), text_buffer='', text_offsets=np.zeros(3))
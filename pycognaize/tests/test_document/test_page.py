@@ -1,17 +1,46 @@
+import glob
+import json
 import os
+import random
+import re
 import shutil
 import tempfile
 import unittest
 from copy import deepcopy
+from unittest import mock
 
 import numpy as np
 
 import pycognaize
 from pycognaize.common.enums import EnvConfigEnum, StorageEnum
+from pycognaize.common.utils import (
+    clean_ocr_data, group_words_into_lines, infer_rows_from_words)
 from pycognaize.document.page import create_dummy_page, Page
 from pycognaize.tests.resources import RESOURCE_FOLDER
 
 
+def reference_lines(words):
+    """Lines of the words, as built by the previous
+        implementation of `Page._create_lines`"""
+    rows_inf, groups = infer_rows_from_words(
+        box=dict(left=0, top=0, right=1, bottom=1),
+        class_ocr_data=clean_ocr_data(dict(words=words))['words'])
+    rows = [int(round(abs(row['top'] + row['bottom']) / 2))
+            for row in rows_inf]
+    groups = [group for _, group in sorted(zip(rows, groups),
+                                           key=lambda pair: pair[0])]
+    rows.sort()
+    seen_rows = []
+    for i, (row, group) in enumerate(zip(list(rows), groups)):
+        if row in seen_rows:
+            rows[i] = None
+            groups[rows.index(row)] += groups[i]
+            groups[i] = None
+        seen_rows.append(row)
+    return [sorted(group, key=lambda x: (x['left'], x['right']))
+            for group in groups if group]
+
+
 class TestPage(unittest.TestCase):
     # set constants
     SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), 'local_snapshot')
@@ -73,6 +102,10 @@ class TestPage(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.no_path_page.get_ocr()
         self.assertEqual(set(self.page6.get_ocr().keys()), {'page', 'image', 'data'})
+        # The words are built from the columns and not kept in memory
+        words = self.page6.ocr['words']
+        self.assertEqual(words, self.page6.ocr_words.to_dicts())
+        self.assertIsNot(self.page6.ocr['words'], words)
 
     def test___repr__(self):
         self.assertEqual(self.page6.__repr__(), '<Page 6>')
@@ -134,6 +167,15 @@ class TestPage(unittest.TestCase):
                 return_tags=True)[0][0],
             pycognaize.document.tag.extraction_tag.ExtractionTag
         )
+        # Dictionaries are only built for the words of the lines
+        page = deepcopy(self.page6)
+        words = page.ocr_words
+        with mock.patch.object(words, 'to_dicts',
+                               wraps=words.to_dicts) as to_dicts:
+            lines = page._create_lines()
+        (indices,), _ = to_dicts.call_args
+        self.assertEqual(to_dicts.call_count, 1)
+        self.assertEqual(len(indices), sum(len(line) for line in lines))
 
     def test_search_text(self):
         area_dict = {'top': 1000, 'bottom': 1500, 'left': 200, 'right': 500}
@@ -155,6 +197,34 @@ class TestPage(unittest.TestCase):
         self.assertEqual(len(self.page3.search_text('has (Added', area=area_dict)), 1)
         self.assertEqual(self.page3.search_text('has the menaning', area=area_dict), [])
 
+    def test_search_regex(self):
+        matches = self.page6.search_regex(r'Federal\s+Deposit\s+Insurance')
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0]['top'], 2241)
+        self.assertEqual([word['ocr_text']
+                          for word in matches[0]['matched_words']],
+                         ['Federal', 'Deposit', 'Insurance'])
+        self.assertEqual(matches[0]['match'].group(),
+                         'Federal Deposit\nInsurance')
+        # Words covered partially are included
+        matches = self.page6.search_regex(re.compile(r'Section \d+'))
+        self.assertEqual([word['ocr_text']
+                          for word in matches[0]['matched_words']],
+                         ['Section', '2030)'])
+        self.assertEqual(
+            [match['matched_words'] for match in self.page6.search_regex(
+                'federal deposit', flags=re.IGNORECASE)],
+            [match['matched_words'] for match in self.page6.search_regex(
+                'Federal Deposit')])
+        self.assertEqual(self.page6.search_regex('WIRE TRANSFER'), [])
+        self.assertEqual(self.page6.search_regex(r'\s'), [])
+        self.assertIsInstance(
+            self.page6.search_regex(r'\(\w\)', return_tags=True)[0][0],
+            pycognaize.document.tag.extraction_tag.ExtractionTag)
+        self.assertIs(self.page6.page_text, self.page6.page_text)
+        self.assertEqual(self.page6.page_text.text,
+                         self.page6.free_form_text())
+
     def test_extract_area_words(self):
         self.assertIsInstance(
             self.page6.extract_area_words(
@@ -183,6 +253,43 @@ class TestPage(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.page3.extract_area_words(left=200, right=560, top=111, bottom=110)
 
+    def test_extract_area_words_empty_page(self):
+        self.assertEqual(len(self.empty_page.lines), 0)
+        self.assertEqual(self.empty_page.extract_area_words(
+            0, 10, 0, 10, line_by_line=True), [])
+        self.assertEqual(self.empty_page.extract_area_words(0, 10, 0, 10),
+                         [])
+        self.assertEqual(self.empty_page.extract_area_words_many(
+            [dict(left=0, right=10, top=0, bottom=10)] * 2,
+            line_by_line=True), [[], []])
+
+    def test_extract_area_words_many(self):
+        areas = [dict(left=200, right=560, top=1, bottom=1100),
+                 dict(left=258, right=1151, top=594, bottom=635),
+                 dict(left=0.5, right=10.5, top=0, bottom=10)]
+        for line_by_line in (False, True):
+            res = self.page6.extract_area_words_many(
+                areas, threshold=0.3, line_by_line=line_by_line,
+                chunk_size=2)
+            self.assertEqual(len(res), len(areas))
+            for area, indices in zip(areas, res):
+                expected = self.page6.extract_area_words(
+                    **area, threshold=0.3, line_by_line=line_by_line)
+                if line_by_line:
+                    self.assertEqual(
+                        [[self.page6.line_words[i] for i in line]
+                         for line in indices], expected)
+                else:
+                    self.assertEqual(
+                        [self.page6.line_words[i] for i in indices], expected)
+        self.assertEqual(len(self.page6.extract_area_words_many(areas)[1]), 8)
+        self.assertEqual(self.page6.extract_area_words_many([]), [])
+        with self.assertRaises(ValueError):
+            self.page6.extract_area_words_many(areas, threshold=5)
+        with self.assertRaises(ValueError):
+            self.page6.extract_area_words_many(
+                areas + [dict(left=200, right=200, top=69, bottom=110)])
+
     def test_get_ocr(self):
         none_path_page = deepcopy(self.no_path_page)
         none_path_page._path = None
@@ -230,6 +337,15 @@ class TestPage(unittest.TestCase):
         self.assertEqual(formatted_ocr['words'][85]['bottom'], 236)
         self.assertEqual(formatted_ocr['words'][85]['top'], 204)
 
+    def test_ocr_words(self):
+        self.assertListEqual(self.page6.ocr_words.to_dicts(),
+                             self.page6.get_ocr_formatted()['words'])
+        self.assertListEqual(self.page6.ocr['words'],
+                             self.page6.ocr_words.to_dicts())
+        self.assertEqual(len(self.empty_page.ocr_words), 0)
+        _ = self.page6.lines
+        self.assertEqual(len(self.page6.ocr['words']), len(self.page6.ocr_words))
+
     def test_draw(self):
         img_path = os.path.join(self.images_folder_path, 'draw_sample_img.png')
         page = create_dummy_page(page_n=1, path=self.snap_path)
@@ -248,6 +364,47 @@ class TestPage(unittest.TestCase):
     def test_draw_ocr_text(self):
         self.assertIsInstance(self.page6.draw_ocr_text(img=None), np.ndarray)
 
+    def test_lines_regression(self):
+        pages = [self.page6, self.page3]
+        for data_path in sorted(glob.glob(os.path.join(
+                RESOURCE_FOLDER, 'snapshots', '*', 'data', 'page_*.json'))):
+            with open(data_path) as f:
+                page_size = json.load(f)['page']
+            doc_path = os.path.dirname(os.path.dirname(data_path))
+            page_number = int(os.path.basename(data_path)[5:-5])
+            pages.append(Page(page_number=page_number,
+                              document_id=os.path.basename(doc_path),
+                              path=doc_path,
+                              image_width=float(page_size['width']) * 2,
+                              image_height=float(page_size['height']) * 2))
+        for page in pages:
+            words = page.ocr['words']
+            self.assertEqual(page.lines, reference_lines(words))
+            self.assertEqual(page._row_word_groups, page.lines)
+
+    def test_group_words_into_lines(self):
+        rng = random.Random(0)
+        texts = ['word', 'a', '.', '', ' ', '--', 'x.', '|']
+        for _ in range(200):
+            n = rng.randint(0, 60)
+            words = []
+            for word_id in range(n):
+                top = rng.choice([0, 10, 12, 20, 25, 40, 41, 80])
+                left = rng.randint(0, 100)
+                words.append(dict(left=left,
+                                  right=left + rng.randint(0, 40),
+                                  top=top,
+                                  bottom=top + rng.randint(0, 30),
+                                  ocr_text=rng.choice(texts),
+                                  word_id_number=word_id))
+            coords = np.array([(w['left'], w['right'], w['top'], w['bottom'])
+                               for w in words])
+            lines = group_words_into_lines(
+                coords, [w['ocr_text'] for w in words])
+            self.assertEqual(
+                [[words[idx] for idx in line] for line in lines],
+                reference_lines(words))
+
     def test_free_form_text(self):
         self.assertEqual(len(self.page6.free_form_text()), 3543)
         self.assertEqual(len(self.page3.free_form_text()), 3853)
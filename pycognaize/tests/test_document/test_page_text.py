@@ -0,0 +1,58 @@
+import re
+import unittest
+
+from pycognaize.document.page_text import PageText
+
+
+def make_lines(lines):
+    return [[dict(left=10 * n, right=10 * n + 8, top=10 * row,
+                  bottom=10 * row + 8, ocr_text=text, word_id_number=n)
+             for n, text in enumerate(line)]
+            for row, line in enumerate(lines)]
+
+
+class TestPageText(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.page_text = PageText(make_lines([['Total:', '$1,234.50'],
+                                              ['Due', '2024-01-31', '']]))
+
+    def test_offsets(self):
+        self.assertEqual(self.page_text.text,
+                         'Total: $1,234.50\nDue 2024-01-31 ')
+        for word, start, end in zip(self.page_text.words,
+                                    self.page_text.starts,
+                                    self.page_text.ends):
+            self.assertEqual(self.page_text.text[start:end],
+                             word['ocr_text'])
+
+    def test_word_range(self):
+        self.assertEqual(self.page_text.word_range(0, 3), (0, 1))
+        self.assertEqual(self.page_text.word_range(4, 9), (0, 2))
+        # Only the separator
+        self.assertEqual(self.page_text.word_range(6, 7), (1, 1))
+        self.assertEqual(self.page_text.word_range(16, 17), (2, 2))
+        self.assertEqual(self.page_text.word_range(14, 20), (1, 3))
+
+    def test_finditer(self):
+        matches = [(match.group(), positions) for match, positions in
+                   self.page_text.finditer(r'\d{4}-\d\d-\d\d|\$[\d,.]+')]
+        self.assertEqual(matches, [('$1,234.50', [1]),
+                                   ('2024-01-31', [3])])
+        matches = list(self.page_text.finditer(
+            re.compile(r'total:\s+\S+', re.IGNORECASE)))
+        self.assertEqual(matches[0][1], [0, 1])
+        self.assertEqual(list(self.page_text.finditer(r'\s+')), [])
+        self.assertEqual(list(PageText([]).finditer('.*')), [])
+
+    def test_finditer_empty_matches(self):
+        page_text = PageText(make_lines([['hello', '42']]))
+        self.assertEqual([(match.span(), positions) for match, positions
+                          in page_text.finditer(r'\d*')],
+                         [((6, 8), [1])])
+        self.assertEqual(list(page_text.finditer(r'\B')), [])
+        self.assertEqual(list(page_text.finditer(r'(?=l)')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,23 @@
+import hashlib
+import io
+import json
+import tempfile
+import threading
 import unittest
 import os
 from types import GeneratorType
+from unittest import mock
 
 import boto3
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
 
+from pycognaize.common import file_hashes, lazy_dict
+from pycognaize.common.enums import (
+    DOCUMENTS_MANIFEST_FILE, SYNC_MANIFEST_FILE)
+from pycognaize.common.file_hashes import (
+    read_hash_manifest, verify_hash_manifest)
+from pycognaize.document.snapshot import Snapshot
 from pycognaize.document.snapshot_downloader import SnapshotDownloader
 
 
@@ -46,5 +60,214 @@ class TestSnapshotDownloader(unittest.TestCase):
         self.assertEqual(self.pagination_config, {'StartingToken': 'a'})
 
 
+class FakeS3Client:
+    """In-memory S3 client, which fails the first request
+        of each object with an expired token if `expire` is True,
+        and every request of the keys in `fail_keys`"""
+
+    def __init__(self, objects, expire=False, fail_keys=()):
+        self.objects = objects
+        self.expire = expire
+        self.fail_keys = set(fail_keys)
+        self.requested = set()
+        self.lock = threading.Lock()
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix, PaginationConfig):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        contents = [{'Key': key, 'Size': len(self.objects[key]),
+                     'ETag': self.etag(key)} for key in keys]
+        return [{'Contents': contents[:2], 'NextContinuationToken': 'token'},
+                {'Contents': contents[2:]}]
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        contents = [{'Key': key, 'Size': len(self.objects[key]),
+                     'ETag': self.etag(key)} for key in keys]
+        if ContinuationToken is None and len(contents) > 1:
+            return {'Contents': contents[:1], 'NextContinuationToken': 'next'}
+        if ContinuationToken is not None:
+            contents = contents[1:]
+        return {'Contents': contents}
+
+    def etag(self, key):
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            first_request = Key not in self.requested
+            self.requested.add(Key)
+        if self.expire and first_request:
+            raise ClientError({'Error': {'Code': 'ExpiredToken'}},
+                              'GetObject')
+        if Key in self.fail_keys:
+            raise ClientError({'Error': {'Code': 'InternalError'}},
+                              'GetObject')
+        data = self.objects[Key]
+        return {'Body': StreamingBody(io.BytesIO(data), len(data)),
+                'ETag': self.etag(Key)}
+
+
+class TestSnapshotDownloaderStreaming(unittest.TestCase):
+    def setUp(self):
+        self.objects = {
+            f'snapshots/snap/doc{n}/document.json': os.urandom(100 * n)
+            for n in range(1, 6)}
+        self.objects['snapshots/snap/doc1/images/page_1.jpeg'] = b'jpeg'
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _download(self, client, sync=False, **kwargs):
+        downloader = SnapshotDownloader(chunk_size=64, **kwargs)
+        self.downloader = downloader
+
+        def init_s3_objects():
+            downloader._client = client
+            downloader._credentials_version += 1
+
+        with mock.patch.object(downloader, '_init_s3_objects',
+                               init_s3_objects), \
+                mock.patch.object(downloader, '_relogin',
+                                  wraps=init_s3_objects) as relogin:
+            progress = downloader.download(
+                's3://bucket/snapshots/snap', self.tmp_dir.name,
+                exclude=['*/images/*.jpeg'], sync=sync)
+        return progress, relogin
+
+    def _assert_downloaded(self):
+        for key, data in self.objects.items():
+            path = os.path.join(self.tmp_dir.name, key.split('/', 2)[-1])
+            if key.endswith('.jpeg'):
+                self.assertFalse(os.path.exists(path))
+                continue
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_download_concurrently(self):
+        calls = []
+        progress, _ = self._download(FakeS3Client(self.objects),
+                                     max_workers=4,
+                                     progress_callback=calls.append)
+        self._assert_downloaded()
+        self.assertEqual(progress.files_downloaded, 5)
+        self.assertEqual(progress.bytes_downloaded, 1500)
+        self.assertEqual([call.files_downloaded for call in calls],
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(calls[-1].bytes_downloaded, 1500)
+        self.assertGreaterEqual(progress.bytes_per_second, 0)
+        leftovers = [name for _, _, names in os.walk(self.tmp_dir.name)
+                     for name in names
+                     if name.startswith(SnapshotDownloader.TMP_PREFIX)]
+        self.assertEqual(leftovers, [])
+
+    def test_download_sequentially(self):
+        progress, _ = self._download(FakeS3Client(self.objects))
+        self._assert_downloaded()
+        self.assertEqual(progress.files_downloaded, 5)
+
+    def test_expired_token(self):
+        progress, relogin = self._download(
+            FakeS3Client(self.objects, expire=True), max_workers=4)
+        self._assert_downloaded()
+        self.assertEqual(progress.files_downloaded, 5)
+        self.assertGreaterEqual(relogin.call_count, 1)
+
+    def test_sync(self):
+        progress, _ = self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(
+            (progress.files_downloaded, progress.files_skipped), (5, 0))
+
+        progress, _ = self._download(FakeS3Client(self.objects),
+                                     max_workers=4, sync=True)
+        self.assertEqual(
+            (progress.files_downloaded, progress.files_skipped), (0, 5))
+        self.assertEqual(progress.bytes_skipped, 1500)
+
+        self.objects['snapshots/snap/doc2/document.json'] = b'changed'
+        os.remove(os.path.join(self.tmp_dir.name, 'doc3/document.json'))
+        progress, _ = self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(
+            (progress.files_downloaded, progress.files_skipped), (2, 3))
+        self._assert_downloaded()
+
+        with open(os.path.join(self.tmp_dir.name, SYNC_MANIFEST_FILE)) as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_sync_manifests(self):
+        dirname = self.tmp_dir.name
+        self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(len(self.downloader.written_files), 5)
+        Snapshot._update_manifests(dirname, self.downloader.written_files)
+        self.assertEqual(list(read_hash_manifest(dirname)),
+                         [f'doc{n}/document.json' for n in range(1, 6)])
+
+        # A sync without changes does not read the snapshot again
+        self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(self.downloader.written_files, [])
+        with mock.patch.object(file_hashes, '_iter_files') as iter_files, \
+                mock.patch.object(lazy_dict, '_read_documents_info') as read:
+            Snapshot._update_manifests(dirname, self.downloader.written_files)
+        iter_files.assert_not_called()
+        read.assert_not_called()
+
+        self.objects['snapshots/snap/doc2/document.json'] = b'changed'
+        os.remove(os.path.join(dirname, 'doc3/document.json'))
+        self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(
+            sorted(self.downloader.written_files),
+            [os.path.join(dirname, f'doc{n}/document.json') for n in (2, 3)])
+        with mock.patch.object(file_hashes, 'file_hash',
+                               wraps=file_hashes.file_hash) as hash_mock:
+            Snapshot._update_manifests(dirname, self.downloader.written_files)
+        self.assertEqual(hash_mock.call_count, 2)
+        self.assertTrue(verify_hash_manifest(dirname).ok)
+        with open(os.path.join(dirname, DOCUMENTS_MANIFEST_FILE)) as f:
+            documents = json.load(f)['documents']
+        self.assertEqual(sorted(documents), [f'doc{n}' for n in range(1, 6)])
+        self.assertEqual(documents['doc2']['size'], len(b'changed'))
+
+    def test_resume_sync(self):
+        failing_client = FakeS3Client(
+            self.objects, fail_keys=['snapshots/snap/doc4/document.json'])
+        with self.assertRaises(ClientError):
+            self._download(failing_client, sync=True)
+        # An incomplete line of an interrupted write is ignored
+        with open(os.path.join(self.tmp_dir.name, SYNC_MANIFEST_FILE),
+                  'a') as f:
+            f.write('{"key": "snapshots/snap/doc')
+
+        progress, _ = self._download(FakeS3Client(self.objects), sync=True)
+        self.assertEqual(
+            (progress.files_downloaded, progress.files_skipped), (2, 3))
+        self._assert_downloaded()
+
+    def test_download_documents(self):
+        self.objects['snapshots/snap/doc10/document.json'] = b'doc10'
+        downloader = SnapshotDownloader(max_workers=2)
+        downloader.DOCUMENTS_BATCH_SIZE = 1
+        with mock.patch.object(downloader, '_init_s3_objects'):
+            downloader._client = FakeS3Client(self.objects)
+            progress = downloader.download(
+                's3://bucket/snapshots/snap', self.tmp_dir.name,
+                document_ids=['doc1', 'doc3'])
+        self.assertEqual(progress.files_downloaded, 3)
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir.name)), ['doc1', 'doc3'])
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.tmp_dir.name, 'doc1', 'images', 'page_1.jpeg')))
+        with self.assertRaises(ValueError):
+            downloader.download('s3://bucket/snapshots/snap',
+                                self.tmp_dir.name, continue_token='token',
+                                document_ids=['doc1'])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SnapshotDownloader(max_workers=0)
+        with self.assertRaises(ValueError):
+            SnapshotDownloader(chunk_size=0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,6 +4,7 @@ import unittest
 from copy import deepcopy
 
 from pycognaize.common.enums import IqTableTagEnum, IqTagKeyEnum, IqFieldKeyEnum
+from pycognaize.document.tag import ExtractionTag
 from pycognaize.document.tag.table_tag import TableTag
 from pycognaize.document.page import create_dummy_page
 from pycognaize.tests.resources import RESOURCE_FOLDER
@@ -114,10 +115,53 @@ class TestTable(unittest.TestCase):
         self.assertTrue(df[0][0].bottom > df[0][0].top)
         self.assertTrue(df[0][0].right > df[0][0].left)
 
+    def test_lazy_build_df(self):
+        self.assertIsNone(self.tbl_tag._raw_df)
+        raw_df = self.tbl_tag.raw_df
+        self.assertIs(self.tbl_tag.raw_df, raw_df)
+        self.assertEqual(list(raw_df.index), list(range(27)))
+        self.assertEqual(list(raw_df.columns), list(range(3)))
+
+        overlapping_raw_table_tag = deepcopy(self.raw_tbl_tag)
+        overlapping_raw_table_tag["table"]['cells']['1:1']['colspan'] = 2
+        overlapping_tbl_tag = TableTag.construct_from_raw(
+            overlapping_raw_table_tag, self.page)
+        with self.assertRaises(ValueError):
+            overlapping_tbl_tag.raw_df
+
+        spanned_raw_table_tag = deepcopy(self.raw_tbl_tag)
+        spanned_raw_table_tag["table"]['cells']['1:1'].update(colspan=2, value='spanned')
+        spanned_raw_table_tag["table"]['cells'].pop('2:1')
+        spanned_tbl_tag = TableTag.construct_from_raw(spanned_raw_table_tag, self.page)
+        raw_df = spanned_tbl_tag.raw_df
+        self.assertEqual(raw_df[0][0].raw_ocr_value, 'spanned')
+        self.assertEqual(raw_df[1][0].raw_ocr_value, 'spanned')
+        raw_df = spanned_tbl_tag._build_df(duplicate_text_for_spanned_cells=False)
+        self.assertEqual(raw_df[0][0].raw_ocr_value, 'spanned')
+        self.assertEqual(raw_df[1][0].raw_ocr_value, '')
+        self.assertEqual(raw_df[1][0].raw_value, 'spanned')
+
     def test_df(self):
         self.assertEqual(self.tbl_tag.df.shape, (27, 3))
         self.assertEqual(self.tbl_tag.df[2][3], '')
 
+    def test_cells_iou(self):
+        cells = list(self.tbl_tag.cells.values())
+        self.assertEqual(self.tbl_tag.cells_coordinates.shape, (len(cells), 4))
+        tag = ExtractionTag(left=cells[3].left, right=cells[3].right + 1,
+                            top=cells[3].top, bottom=cells[3].bottom + 1,
+                            page=self.page, raw_value='', raw_ocr_value='')
+        ious = self.tbl_tag.cells_iou(tag)
+        for cell, iou in zip(cells, ious):
+            cell = deepcopy(cell)
+            cell.page = self.page
+            self.assertEqual(iou, tag.iou(cell))
+        self.assertGreater(ious[3], 0)
+        other_page_tag = ExtractionTag(
+            left=tag.left, right=tag.right, top=tag.top, bottom=tag.bottom,
+            page=create_dummy_page(page_n=1), raw_value='', raw_ocr_value='')
+        self.assertFalse(self.tbl_tag.cells_iou(other_page_tag).any())
+
     def test_letters_2_num(self):
         self.assertEqual(self.tbl_tag.letter_2_num('AB'), 28)
         self.assertEqual(self.tbl_tag.letter_2_num('OF'), 396)
@@ -3,6 +3,7 @@ from copy import deepcopy
 
 from pycognaize.document.page import create_dummy_page
 from pycognaize.document.tag import ExtractionTag
+from pycognaize.document.tag.tag import BoxTag
 
 
 class TestTag(unittest.TestCase):
@@ -270,5 +271,27 @@ class TestTag(unittest.TestCase):
         self.assertTrue(round(self.valid_arguments_tag.distance(self.valid_arguments_tag_samepage), 2), 0.23)
 
 
+    def test_pairwise_matrices(self):
+        tags = [self.valid_arguments_tag, self.valid_arguments_tag_otherpage,
+                self.valid_arguments_tag_samepage, self.intersection_true_tag,
+                self.intersection_false_tag, self.contains_true_tag,
+                self.contains_true_tag_otherpage]
+        others = tags[::-1]
+        intersection = BoxTag.intersection_matrix(tags, others)
+        iou = BoxTag.iou_matrix(tags, others)
+        containment = BoxTag.containment_matrix(tags, others, thresh=0.5)
+        self.assertEqual(intersection.shape, (len(tags), len(others)))
+        for i, tag in enumerate(tags):
+            for j, other in enumerate(others):
+                self.assertEqual(intersection[i, j], tag & other)
+                self.assertEqual(iou[i, j], tag.iou(other))
+                self.assertEqual(containment[i, j],
+                                 tag.is_in_rectangle(other, 0.5))
+        self.assertEqual(BoxTag.iou_matrix([], others).shape,
+                         (0, len(others)))
+        with self.assertRaises(ValueError):
+            BoxTag.containment_matrix(tags, others, thresh=2)
+
+
 if __name__ == '__main__':
     unittest.main()
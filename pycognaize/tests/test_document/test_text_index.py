@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pycognaize.common.enums import StorageEnum, TEXT_INDEX_FILE
+from pycognaize.common.file_hashes import build_hash_manifest
+from pycognaize.document import Document
+from pycognaize.document.snapshot import Snapshot
+from pycognaize.document.text_index import SnapshotTextIndex
+from pycognaize.tests.resources import RESOURCE_FOLDER
+
+
+class TestSnapshotTextIndex(unittest.TestCase):
+    SNAPSHOT_PATH = os.path.join(RESOURCE_FOLDER, 'snapshots')
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.index = SnapshotTextIndex.build(cls.SNAPSHOT_PATH, max_workers=4)
+
+    def load_document(self, doc_id):
+        path = os.path.join(self.SNAPSHOT_PATH, doc_id)
+        with open(os.path.join(path, 'document.json'), encoding='utf8') as f:
+            return Document.from_dict(json.load(f), data_path=path)
+
+    def test_find(self):
+        doc_id = '60f554497883ab0013d9d906'
+        document = self.load_document(doc_id)
+        for text in ('of the', 'Form', 'The  Company'):
+            candidates = self.index.find(text)
+            pages = sorted({page_n for page_n, _ in
+                            document.search_text(text)})
+            self.assertTrue(set(pages) <= set(candidates.get(doc_id, [])))
+        self.assertEqual(self.index.find('no-such-word-anywhere'), {})
+        self.assertEqual(self.index.documents('Form'),
+                         sorted(self.index.find('Form')))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, TEXT_INDEX_FILE)
+            self.index.save(path)
+            loaded = SnapshotTextIndex.load(path)
+        self.assertEqual(loaded.document_ids, self.index.document_ids)
+        for text in ('of the', 'Form', ''):
+            self.assertEqual(loaded.find(text), self.index.find(text))
+
+    def test_token_storage(self):
+        long_token = 'x' * 10000
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_path = os.path.join(tmp_dir, 'doc',
+                                     StorageEnum.ocr_folder.value)
+            os.makedirs(data_path)
+            with open(os.path.join(data_path, 'page_1.json'), 'w') as f:
+                json.dump({'data': [{'value': value} for value in
+                                    ('Zürich', 'a', long_token, 'b')]}, f)
+            index = SnapshotTextIndex.build(tmp_dir)
+            path = os.path.join(tmp_dir, TEXT_INDEX_FILE)
+            index.save(path)
+            loaded = SnapshotTextIndex.load(path)
+        for text in ('zürich', 'A b', long_token):
+            self.assertEqual(index.find(text), {'doc': [1]})
+            self.assertEqual(loaded.find(text), {'doc': [1]})
+        self.assertEqual(index.find('zurich'), {})
+        self.assertEqual(index.find('x'), {})
+        # The tokens are not padded to the longest one
+        self.assertLess(index.nbytes, 2 * len(long_token))
+
+    def test_snapshot_text_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_id = '60f554497883ab0013d9d906'
+            shutil.copytree(os.path.join(self.SNAPSHOT_PATH, doc_id),
+                            os.path.join(tmp_dir, doc_id))
+            snapshot = Snapshot(path=tmp_dir)
+            index = snapshot.build_text_index()
+            self.assertTrue(os.path.isfile(
+                os.path.join(tmp_dir, TEXT_INDEX_FILE)))
+            self.assertEqual(snapshot.load_text_index().find('of the'),
+                             index.find('of the'))
+            self.assertEqual(index.documents('of the'), [doc_id])
+
+    def test_snapshot_verify(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_id = '60f554497883ab0013d9d906'
+            shutil.copytree(os.path.join(self.SNAPSHOT_PATH, doc_id),
+                            os.path.join(tmp_dir, doc_id))
+            build_hash_manifest(tmp_dir)
+            snapshot = Snapshot(path=tmp_dir)
+            snapshot.build_text_index()
+            snapshot.build_manifest()
+            result = snapshot.verify()
+            self.assertTrue(result.ok)
+            self.assertEqual(result.added, [])
+            # Rebuilding does not modify the snapshot either
+            snapshot.build_text_index()
+            self.assertEqual(snapshot.verify().modified, [])
+
+    def test_stale(self):
+        self.assertFalse(self.index.is_stale(self.SNAPSHOT_PATH))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for doc_id in ('60f554497883ab0013d9d906',
+                           '62eb8e6b28d7ca0012ec8288'):
+                shutil.copytree(os.path.join(self.SNAPSHOT_PATH, doc_id),
+                                os.path.join(tmp_dir, doc_id))
+            snapshot = Snapshot(path=tmp_dir)
+            snapshot.build_text_index()
+            with self.assertNoLogs(level='WARNING'):
+                self.assertFalse(snapshot.load_text_index().is_stale(tmp_dir))
+
+            # A removed document
+            shutil.rmtree(os.path.join(tmp_dir, '62eb8e6b28d7ca0012ec8288'))
+            with self.assertLogs(level='WARNING'):
+                index = snapshot.load_text_index()
+            self.assertIn('62eb8e6b28d7ca0012ec8288', index.documents('Form'))
+            index = snapshot.load_text_index(rebuild=True)
+            self.assertEqual(index.document_ids,
+                             ['60f554497883ab0013d9d906'])
+            self.assertFalse(snapshot.load_text_index().is_stale(tmp_dir))
+
+            # A changed page
+            path = os.path.join(tmp_dir, '60f554497883ab0013d9d906', 'data',
+                                'page_1.json')
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertTrue(index.is_stale(tmp_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
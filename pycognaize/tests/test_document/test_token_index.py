@@ -0,0 +1,55 @@
+import unittest
+
+from pycognaize.document.ocr_words import OCRWords
+from pycognaize.document.page import Page
+from pycognaize.document.token_index import TokenIndex
+
+
+def make_words(texts):
+    return [dict(left=10 * n, right=10 * n + 8, top=0, bottom=10,
+                 ocr_text=text, word_id_number=n)
+            for n, text in enumerate(texts)]
+
+
+class TestTokenIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.words = make_words(['Oil,', 'gas,', 'gas,', 'and', 'GAS', 'and',
+                                 'coal', '|', 'gas', 'and'])
+
+    def test_tokens(self):
+        index = TokenIndex(self.words)
+        self.assertEqual(index.tokens[:5], ['oil,', 'gas,', 'gas,', 'and',
+                                            'gas'])
+        self.assertEqual(index.tokens[7], '')
+        self.assertEqual(TokenIndex(self.words, case_sensitive=True,
+                                    clean=False).tokens[4], 'GAS')
+
+    def test_find(self):
+        index = TokenIndex(self.words)
+        self.assertEqual(index.find('gas and'), [[4, 5], [8, 9]])
+        # The partial match of the first `gas` does not hide the second
+        self.assertEqual(index.find('gas, and'), [[2, 3]])
+        self.assertEqual(index.find('gas,'), [[1], [2]])
+        self.assertEqual(index.find('coal | gas'), [[6, 7, 8]])
+        self.assertEqual(index.find('oil'), [])
+        # Occurrences do not overlap
+        index = TokenIndex(make_words(['a', 'a', 'a', 'a', 'a']))
+        self.assertEqual(index.find('a a'), [[0, 1], [2, 3]])
+        self.assertEqual(TokenIndex(self.words, case_sensitive=True)
+                         .find('gas and'), [[8, 9]])
+
+    def test_page_search_text(self):
+        page = Page(page_number=1, document_id='doc', path=None)
+        page._ocr_words = OCRWords.from_words(self.words)
+        matches = page.search_text('gas and')
+        self.assertEqual(len(matches), 2)
+        self.assertEqual(matches[0]['matched_words'], self.words[4:6])
+        self.assertEqual((matches[0]['left'], matches[0]['right']), (40, 58))
+        self.assertIs(page.token_index(), page.token_index())
+        self.assertIsNot(page.token_index(), page.token_index(sort=True))
+        self.assertEqual(len(page.search_text('gas and', sort=True)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -174,6 +174,27 @@ class TestHTMLTableTag(unittest.TestCase):
         self.assertEqual(raw_df[1][1].raw_value, '')
         self.assertEqual(raw_df[1][1].field_id, '')
 
+    def test_build_df_holes(self):
+        self.assertIsNone(self.tbl_tag._raw_df)
+        raw_tbl_tag = deepcopy(self.raw_tbl_tag)
+        cells = raw_tbl_tag[IqTableTagEnum.table.value][IqTableTagEnum.cells.value]
+        cells.pop('2:2')
+        cells.pop('3:3')
+        tbl_tag = HTMLTableTag.construct_from_raw(raw_tbl_tag, html=self.html)
+        with self.assertLogs(level='WARNING') as logs:
+            raw_df = tbl_tag.raw_df
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('2 empty cells', logs.output[0])
+        self.assertEqual(raw_df.shape, (5, 5))
+        self.assertEqual(raw_df[1][1].html_id, '')
+        self.assertEqual((raw_df[1][1].row_index, raw_df[1][1].col_index),
+                         (1, 1))
+        self.assertEqual((raw_df[2][2].row_index, raw_df[2][2].col_index),
+                         (2, 2))
+        self.assertIsNot(raw_df[1][1], raw_df[2][2])
+        self.assertEqual(tbl_tag.df[1][1], '')
+        self.assertEqual(raw_df[2][1].html_id, ["ee6c660b-b270-4fef-ae4d-60fcf65b7c3a"])
+
     def test_df(self):
         df = self.tbl_tag.df
         self.assertEqual(df.shape, (5, 5))
@@ -2,7 +2,10 @@ import os
 import unittest
 from unittest.mock import Mock, patch
 
+from cloudpathlib import S3Client
+
 from pycognaize.common.exceptions import ServerAPIException
+from pycognaize.file_storage import get_storage, release_storage
 from pycognaize.login import Login
 
 
@@ -51,6 +54,43 @@ class TestIndex(unittest.TestCase):
 
         instance.destroy()
 
+    @patch('requests.Session.post')
+    def test_relogin(self, mock_post):
+        os.environ["API_HOST"] = "test.api_host.com"
+        instance = Login()
+        mock_post.return_value.status_code = 200
+        credentials = {
+            "AccessKeyId": "AccessKeyId",
+            "SecretAccessKey": "SecretAccessKey",
+            "SessionToken": "SessionToken",
+        }
+        mock_post.return_value.json.return_value = \
+            {"credentials": credentials,
+             "snapshotRoot": "s3://test-bucket/snapshots"}
+        instance.login('test@gmail.com', 'test_password')
+        expired_config = instance.storage_config
+        storage = get_storage('s3://test-bucket/snapshots',
+                              config=expired_config)
+
+        credentials["SessionToken"] = "RotatedSessionToken"
+        instance.relogin()
+
+        self.assertEqual(instance.storage_config['aws_session_token'],
+                         'RotatedSessionToken')
+        new_storage = get_storage('s3://test-bucket/snapshots',
+                                  config=instance.storage_config)
+        self.assertIsNot(new_storage, storage)
+        self.assertIsNot(
+            get_storage('s3://test-bucket/snapshots', config=expired_config),
+            storage)
+
+        release_storage(expired_config)
+        release_storage(instance.storage_config)
+        instance.destroy()
+        self.assertIsNone(Login().storage_config)
+        Login.destroy()
+        S3Client._default_client = None
+
     def test_api_host(self):
         os.unsetenv("API_HOST")
         instance = Login()
@@ -228,6 +228,15 @@ class TestModel(unittest.TestCase):
                                                  'accuracy': 0.5}}
         self.assertDictEqual(result_multi_tag, act_multi_tag)
 
+    def test_match_matrix(self):
+        tags = [ExtractionTag(left=left, right=left + 7, top=top, bottom=top + 2,
+                              page=create_dummy_page(page_n=page_n), raw_value='', raw_ocr_value='')
+                for left, top, page_n in [(41, 14, 1), (43, 15, 1), (41, 14, 2), (60, 30, 1), (41.5, 14.5, 1)]]
+        match_matrix = Model.match_matrix(tags, tags[::-1])
+        for i, act_tag in enumerate(tags):
+            for j, pred_tag in enumerate(tags[::-1]):
+                self.assertEqual(match_matrix[i, j], Model.matches(act_tag, pred_tag))
+
     def test_eval_field_level(self):
         page = create_dummy_page(page_n=1)
         mock_act = Mock()
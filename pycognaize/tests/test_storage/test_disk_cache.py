@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from pycognaize.file_storage.disk_cache import DiskCache
+
+
+class DiskCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_should_cache_content_by_uri_and_version(self):
+        cache = DiskCache(self.directory, max_bytes=1000)
+        cache.put('s3://bucket/a.json', 'etag_1', b'version 1')
+
+        assert cache.get('s3://bucket/a.json', 'etag_1') == b'version 1'
+        assert cache.get('s3://bucket/a.json', 'etag_2') is None
+        assert cache.get('s3://bucket/b.json', 'etag_1') is None
+        assert (cache.hits, cache.misses) == (1, 2)
+        assert cache.size == len(b'version 1')
+
+        # Another cache on the same directory sees the same entries
+        other_cache = DiskCache(self.directory, max_bytes=1000)
+        assert other_cache.get('s3://bucket/a.json', 'etag_1') == b'version 1'
+
+    def test_should_evict_least_recently_used(self):
+        cache = DiskCache(self.directory, max_bytes=350)
+        for n in range(3):
+            cache.put(f's3://bucket/{n}', 'etag', bytes(100))
+            # Make sure the modification times differ
+            path = cache._path(cache._key(f's3://bucket/{n}', 'etag'))
+            os.utime(path, (time.time() - 100 + n, time.time() - 100 + n))
+        cache.get('s3://bucket/0', 'etag')
+
+        cache.put('s3://bucket/3', 'etag', bytes(100))
+
+        assert cache.get('s3://bucket/0', 'etag') is not None
+        assert cache.get('s3://bucket/1', 'etag') is None
+        assert cache.get('s3://bucket/2', 'etag') is not None
+        assert cache.get('s3://bucket/3', 'etag') is not None
+        assert cache.size == 300
+
+    def test_should_skip_content_larger_than_budget(self):
+        cache = DiskCache(self.directory, max_bytes=10)
+        cache.put('s3://bucket/large', 'etag', bytes(11))
+
+        assert cache.get('s3://bucket/large', 'etag') is None
+        with self.assertRaises(ValueError):
+            DiskCache(self.directory, max_bytes=0)
+
+    def test_should_support_concurrent_writers(self):
+        cache = DiskCache(self.directory, max_bytes=10 ** 6)
+
+        def put(n):
+            cache.put(f's3://bucket/{n % 10}', 'etag', bytes([n % 10]) * 1000)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(put, range(200)))
+
+        for n in range(10):
+            assert cache.get(f's3://bucket/{n}', 'etag') == bytes([n]) * 1000
+        assert cache.size == 10 * 1000
+
+        cache.clear()
+        assert cache.size == 0
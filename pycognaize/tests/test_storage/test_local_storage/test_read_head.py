@@ -0,0 +1,36 @@
+import shutil
+from pathlib import Path
+from unittest import TestCase
+
+from pycognaize.file_storage import get_storage
+
+
+class ReadHeadTestCase(TestCase):
+    dir_path = Path(__file__).parent.parent.parent / 'resources' / 'local_read_head'
+
+    @classmethod
+    def setUpClass(cls):
+        if not cls.dir_path.is_dir():
+            cls.dir_path.mkdir()
+
+    def test_should_read_beginning_of_file(self):
+        file_path = self.dir_path / 'file.txt'
+        file_path.write_bytes(b'0123456789')
+
+        local_storage = get_storage(file_path)
+
+        assert local_storage.read_head(file_path, 4) == b'0123'
+        assert local_storage.read_head(str(file_path), 100) == b'0123456789'
+
+    def test_should_raise_exception_when_file_does_not_exist(self):
+        file_path = self.dir_path / 'missing.txt'
+
+        local_storage = get_storage(file_path)
+
+        with self.assertRaises(FileNotFoundError):
+            local_storage.read_head(file_path, 4)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.dir_path.is_dir():
+            shutil.rmtree(cls.dir_path)
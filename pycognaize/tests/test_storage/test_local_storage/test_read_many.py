@@ -0,0 +1,57 @@
+import shutil
+from pathlib import Path
+from unittest import TestCase
+
+from pycognaize.file_storage import get_storage
+
+
+class ReadManyTestCase(TestCase):
+    dir_path = Path(__file__).parent.parent.parent / 'resources' / 'local_read_many'
+
+    @classmethod
+    def setUpClass(cls):
+        if not cls.dir_path.is_dir():
+            cls.dir_path.mkdir()
+        for n in range(20):
+            (cls.dir_path / f'file_{n}.txt').write_text(f'content {n}')
+
+    def test_should_read_files_in_order(self):
+        paths = [self.dir_path / f'file_{n}.txt' for n in reversed(range(20))]
+
+        local_storage = get_storage(self.dir_path)
+        res = local_storage.read_many(paths, max_workers=3)
+
+        assert [r.path for r in res] == paths
+        assert all(r.ok for r in res)
+        assert [r.data for r in res] == [f'content {n}'.encode()
+                                         for n in reversed(range(20))]
+
+    def test_should_return_errors_per_path(self):
+        paths = [self.dir_path / 'file_0.txt',
+                 self.dir_path / 'missing.txt',
+                 str(self.dir_path / 'file_1.txt')]
+
+        local_storage = get_storage(self.dir_path)
+        res = local_storage.read_many(paths, mode='r', encoding='utf8')
+
+        assert [r.ok for r in res] == [True, False, True]
+        assert isinstance(res[1].error, FileNotFoundError)
+        assert res[1].data is None
+        assert res[2].data == 'content 1'
+
+    def test_should_stream_results(self):
+        paths = (self.dir_path / f'file_{n}.txt' for n in range(20))
+
+        local_storage = get_storage(self.dir_path)
+        res = local_storage.iter_read(paths, max_workers=2)
+
+        assert next(res).data == b'content 0'
+        assert [r.data for r in res] == [f'content {n}'.encode()
+                                         for n in range(1, 20)]
+        with self.assertRaises(ValueError):
+            list(local_storage.iter_read(paths, max_workers=0))
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.dir_path.is_dir():
+            shutil.rmtree(cls.dir_path)
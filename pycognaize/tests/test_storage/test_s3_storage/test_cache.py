@@ -0,0 +1,83 @@
+import io
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pycognaize.file_storage.disk_cache import DiskCache
+from pycognaize.file_storage.s3_storage import S3Storage
+
+
+class FakeS3Client:
+    """Minimal boto3 client with a single object"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+        class ClientError(Exception):
+            def __init__(self, code):
+                self.response = {'Error': {'Code': code}}
+
+    def __init__(self):
+        self.objects = {'doc/document.json': (b'{"a": 1}', '"etag_1"')}
+        self.get_requests = 0
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.ClientError('404')
+        return {'ETag': self.objects[Key][1]}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey()
+        self.get_requests += 1
+        data, etag = self.objects[Key]
+        return {'Body': io.BytesIO(data), 'ETag': etag}
+
+
+class S3CacheTestCase(TestCase):
+    path = 's3://test-bucket/doc/document.json'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.client = FakeS3Client()
+        patcher = patch.object(S3Storage, '_boto3_client',
+                               return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        S3Storage.set_cache(DiskCache(self.directory, max_bytes=1000))
+        self.addCleanup(S3Storage.set_cache, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_should_serve_unchanged_objects_from_cache(self):
+        storage = S3Storage()
+
+        with storage.open(self.path, 'r', encoding='utf8') as f:
+            assert f.read() == '{"a": 1}'
+        with storage.open(self.path, 'rb') as f:
+            assert f.read() == b'{"a": 1}'
+        assert storage.read(self.path) == b'{"a": 1}'
+        assert self.client.get_requests == 1
+
+        self.client.objects['doc/document.json'] = (b'{"a": 2}', '"etag_2"')
+        assert storage.read(self.path, 'r') == '{"a": 2}'
+        assert self.client.get_requests == 2
+
+    def test_should_raise_file_not_found(self):
+        storage = S3Storage()
+
+        with self.assertRaises(FileNotFoundError):
+            storage.open('s3://test-bucket/missing.json', 'r')
+        with self.assertRaises(FileNotFoundError):
+            storage.read('s3://test-bucket/missing.json')
+
+    def test_should_read_without_cache(self):
+        S3Storage.set_cache(None)
+        storage = S3Storage()
+
+        assert storage.read(self.path) == b'{"a": 1}'
+        assert storage.read(self.path) == b'{"a": 1}'
+        assert self.client.get_requests == 2
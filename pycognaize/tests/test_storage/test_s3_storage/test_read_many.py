@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+import pytest
+from cloudpathlib import implementation_registry
+from cloudpathlib.local import LocalS3Path, local_s3_implementation, LocalS3Client
+
+from pycognaize.file_storage import get_storage
+
+
+class ReadManyTestCase(TestCase):
+    dir_path = LocalS3Path('s3://test-bucket') / 'resources' / 'local_read_many'
+
+    @pytest.fixture(autouse=True)
+    def patch_cloudpathlib(self, monkeypatch):
+        monkeypatch.setitem(implementation_registry, "s3", local_s3_implementation)
+
+        if not self.dir_path.is_dir():
+            self.dir_path.mkdir()
+
+        yield
+
+        LocalS3Client.reset_default_storage_dir()
+
+    def test_should_read_files_in_order(self):
+        paths = [self.dir_path / f'file_{n}.json' for n in range(5)]
+        for n, path in enumerate(paths):
+            path.write_text(f'{{"n": {n}}}')
+
+        s3_storage = get_storage(self.dir_path)
+        res = s3_storage.read_many(
+            paths + [self.dir_path / 'missing.json'], mode='r')
+
+        assert [r.data for r in res[:5]] == [f'{{"n": {n}}}' for n in range(5)]
+        assert isinstance(res[5].error, FileNotFoundError)
+        assert s3_storage.read_head(paths[0], 4) == b'{"n"'
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from cloudpathlib import S3Client
+
+from pycognaize.file_storage import get_storage, release_storage
+from pycognaize.file_storage.s3_storage import (MAX_POOL_CONNECTIONS,
+                                                S3ClientPool)
+
+
+class StoragePoolTestCase(TestCase):
+    path = 's3://test-bucket/resources'
+    config_1 = {'aws_access_key_id': 'key_1',
+                'aws_session_token': 'token_1',
+                'aws_secret_access_key': 'secret_1'}
+    config_2 = {'aws_access_key_id': 'key_2',
+                'aws_session_token': 'token_2',
+                'aws_secret_access_key': 'secret_2'}
+
+    def tearDown(self):
+        release_storage(self.config_1)
+        release_storage(self.config_2)
+        S3Client._default_client = None
+
+    def test_should_reuse_storage_for_same_credentials(self):
+        storage = get_storage(self.path, config=self.config_1)
+
+        assert get_storage(self.path, config=dict(self.config_1)) is storage
+        assert get_storage(self.path) is storage
+        assert S3ClientPool.get(self.config_1) is storage._client
+        assert S3Client._default_client is storage._client
+
+    def test_should_switch_default_client_between_credentials(self):
+        storage_1 = get_storage(self.path, config=self.config_1)
+        storage_2 = get_storage(self.path, config=self.config_2)
+
+        assert storage_1 is not storage_2
+        assert S3Client._default_client is storage_2._client
+
+        assert get_storage(self.path, config=self.config_1) is storage_1
+        assert S3Client._default_client is storage_1._client
+
+    def test_should_configure_connection_pool(self):
+        storage = get_storage(self.path, config=self.config_1)
+
+        assert (storage._client.client.meta.config.max_pool_connections
+                == MAX_POOL_CONNECTIONS)
+
+    def test_should_create_new_storage_after_release(self):
+        storage = get_storage(self.path, config=self.config_1)
+        client = storage._client
+
+        release_storage(self.config_1)
+
+        new_storage = get_storage(self.path, config=self.config_1)
+        assert new_storage is not storage
+        assert new_storage._client is not client